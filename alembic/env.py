@@ -5,6 +5,9 @@ from sqlalchemy import pool
 
 from alembic import context
 from app.models.user_model import Base  # adjust "myapp.models" to the actual location of your Base
+import app.models.idempotency_model  # noqa: F401, registers the table on Base.metadata
+import app.models.job_model  # noqa: F401
+import app.models.webhook_model  # noqa: F401
 
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,40 @@
+"""hash verification tokens
+
+Revision ID: 3f1c9a7b2d40
+Revises: 25d814bc83ed
+Create Date: 2026-10-19 09:12:31.402115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7b2d40'
+down_revision: Union[str, None] = '25d814bc83ed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('verification_token_hash', sa.String(length=64), nullable=True))
+    op.add_column('users', sa.Column('verification_token_expires_at', sa.DateTime(timezone=True), nullable=True))
+    # Carry pending tokens over so links that were already emailed keep working.
+    op.execute(
+        "UPDATE users SET verification_token_hash = encode(sha256(convert_to(verification_token, 'UTF8')), 'hex'), "
+        "verification_token_expires_at = now() + interval '2 days' "
+        "WHERE verification_token IS NOT NULL"
+    )
+    op.drop_column('users', 'verification_token')
+    op.create_index('ix_users_verification_token_hash', 'users', ['verification_token_hash'], unique=False,
+                    postgresql_where=sa.text('NOT email_verified'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_verification_token_hash', table_name='users',
+                  postgresql_where=sa.text('NOT email_verified'))
+    op.add_column('users', sa.Column('verification_token', sa.String(), nullable=True))
+    op.drop_column('users', 'verification_token_expires_at')
+    op.drop_column('users', 'verification_token_hash')
@@ -0,0 +1,50 @@
+"""jobs
+
+Revision ID: c47a19e0b3d2
+Revises: 8b2e4d61c5a9
+Create Date: 2026-10-19 16:27:08.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47a19e0b3d2'
+down_revision: Union[str, None] = '8b2e4d61c5a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('jobs',
+    sa.Column('id', sa.BigInteger(), sa.Identity(always=False), nullable=False),
+    sa.Column('type', sa.String(length=100), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'{}'::jsonb"), nullable=False),
+    sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'SUCCEEDED', 'FAILED', name='JobStatus', create_constraint=True), server_default='QUEUED', nullable=False),
+    sa.Column('unique_key', sa.String(length=255), nullable=True),
+    sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_ready', 'jobs', ['type', 'run_at'], unique=False,
+                    postgresql_where=sa.text("status = 'QUEUED'"))
+    op.create_index('ix_jobs_unique_key', 'jobs', ['type', 'unique_key'], unique=True,
+                    postgresql_where=sa.text("unique_key IS NOT NULL AND status IN ('QUEUED', 'RUNNING')"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_unique_key', table_name='jobs',
+                  postgresql_where=sa.text("unique_key IS NOT NULL AND status IN ('QUEUED', 'RUNNING')"))
+    op.drop_index('ix_jobs_ready', table_name='jobs', postgresql_where=sa.text("status = 'QUEUED'"))
+    op.drop_table('jobs')
+    sa.Enum(name='JobStatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,67 @@
+"""webhooks
+
+Revision ID: d925729cb489
+Revises: c47a19e0b3d2
+Create Date: 2026-10-19 10:13:46.822657
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'd925729cb489'
+down_revision: Union[str, None] = 'c47a19e0b3d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('outbox_events',
+    sa.Column('id', sa.BigInteger(), sa.Identity(always=False), nullable=False),
+    sa.Column('type', sa.String(length=50), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('webhook_endpoints',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('url', sa.String(length=2048), nullable=False),
+    sa.Column('secret', sa.String(length=255), nullable=False),
+    sa.Column('events', postgresql.ARRAY(sa.String(length=50)), server_default=sa.text("'{}'"), nullable=False),
+    sa.Column('max_concurrency', sa.Integer(), server_default=sa.text('1'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('webhook_deliveries',
+    sa.Column('id', sa.BigInteger(), sa.Identity(always=False), nullable=False),
+    sa.Column('endpoint_id', sa.UUID(), nullable=False),
+    sa.Column('event_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'DELIVERED', 'FAILED', name='DeliveryStatus', create_constraint=True), server_default='PENDING', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('batch_id', sa.UUID(), nullable=True),
+    sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('delivered_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['endpoint_id'], ['webhook_endpoints.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['event_id'], ['outbox_events.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_webhook_deliveries_event_id', 'webhook_deliveries', ['event_id'], unique=False)
+    op.create_index('ix_webhook_deliveries_pending', 'webhook_deliveries', ['endpoint_id', 'event_id'], unique=False, postgresql_where=sa.text("status = 'PENDING'"))
+    op.create_index('ix_webhook_deliveries_pending_user', 'webhook_deliveries', ['endpoint_id', 'user_id', 'event_id'], unique=False, postgresql_where=sa.text("status = 'PENDING'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_deliveries_pending_user', table_name='webhook_deliveries', postgresql_where=sa.text("status = 'PENDING'"))
+    op.drop_index('ix_webhook_deliveries_pending', table_name='webhook_deliveries', postgresql_where=sa.text("status = 'PENDING'"))
+    op.drop_index('ix_webhook_deliveries_event_id', table_name='webhook_deliveries')
+    op.drop_table('webhook_deliveries')
+    op.drop_table('webhook_endpoints')
+    op.drop_table('outbox_events')
+    sa.Enum(name='DeliveryStatus').drop(op.get_bind(), checkfirst=True)
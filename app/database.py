@@ -9,17 +9,41 @@ class Database:
     _session_factory = None
 
     @classmethod
-    def initialize(cls, database_url: str, echo: bool = False):
-        """Initialize the async engine and sessionmaker."""
+    def initialize(cls, database_url: str, echo: bool = False, prepared_statement_cache_size: int = 100):
+        """Initialize the async engine and sessionmaker.
+
+        A ``prepared_statement_cache_size`` of 0 disables asyncpg's prepared statement
+        cache, which is required behind PgBouncer in transaction pooling mode.
+        """
         if cls._engine is None:  # Ensure engine is created once
-            cls._engine = create_async_engine(database_url, echo=echo, future=True)
+            connect_args = {}
+            if database_url.startswith("postgresql+asyncpg"):
+                connect_args["prepared_statement_cache_size"] = prepared_statement_cache_size
+                if prepared_statement_cache_size == 0:
+                    connect_args["statement_cache_size"] = 0
+            cls._engine = create_async_engine(database_url, echo=echo, future=True, connect_args=connect_args)
             cls._session_factory = sessionmaker(
                 bind=cls._engine, class_=AsyncSession, expire_on_commit=False, future=True
             )
 
+    @classmethod
+    def get_engine(cls):
+        """Returns the engine, ensuring it's initialized."""
+        if cls._engine is None:
+            raise ValueError("Database not initialized. Call `initialize()` first.")
+        return cls._engine
+
     @classmethod
     def get_session_factory(cls):
         """Returns the session factory, ensuring it's initialized."""
         if cls._session_factory is None:
             raise ValueError("Database not initialized. Call `initialize()` first.")
         return cls._session_factory
+
+    @classmethod
+    async def dispose(cls):
+        """Close all pooled connections, e.g. when a worker shuts down."""
+        if cls._engine is not None:
+            await cls._engine.dispose()
+            cls._engine = None
+            cls._session_factory = None
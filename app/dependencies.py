@@ -1,17 +1,29 @@
-from builtins import Exception, dict, str
-from fastapi import Depends, HTTPException
+from builtins import Exception, dict, isinstance, str, tuple
+import json
+import math
+import secrets
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException, Query, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import Database
 from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
 from app.services.jwt_service import decode_token
-from settings.config import Settings
+from app.utils.profiler import ProfileStore
+from app.utils.rate_limit import rate_limiter
+from app.utils.serialization import USER_RESPONSE_FIELDS
+from settings.config import Settings, settings
 from fastapi import Depends
 
 def get_settings() -> Settings:
-    """Return application settings."""
-    return Settings()
+    """Return the application settings singleton, read from the environment once at import."""
+    return settings
+
+_profile_store = ProfileStore(settings.profiler_dir, settings.profiler_max_profiles)
+
+def get_profile_store() -> ProfileStore:
+    return _profile_store
 
 def get_email_service() -> EmailService:
     template_manager = TemplateManager()
@@ -26,6 +38,55 @@ async def get_db() -> AsyncSession:
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
         
+def get_fields(
+    fields: Optional[str] = Query(None, description="Comma-separated list of user fields to return, e.g. id,nickname,email,role")
+) -> Optional[Tuple[str, ...]]:
+    """Dependency that validates a sparse fieldset against ``UserResponse``, in model field order."""
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(USER_RESPONSE_FIELDS)
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(sorted(unknown))}. Valid fields are: {', '.join(USER_RESPONSE_FIELDS)}")
+    return tuple(field for field in USER_RESPONSE_FIELDS if field in requested)
+
+RATE_LIMITED_DETAIL = "Too many requests, try again later."
+# Set in the request's state by IdempotencyMiddleware, which checks the limits before it claims a key.
+RATE_LIMIT_CHECKED = "rate_limit_checked"
+
+def register_account(content_type: Optional[str], body: bytes) -> Optional[str]:
+    """
+    The email of a /register/ body, the account it is limited by. Bodies FastAPI would not read as
+    JSON have none; validation rejects them with 422.
+    """
+    content_type = (content_type or "").partition(";")[0].strip().lower()
+    if content_type and content_type != "application/json" and not content_type.endswith("+json"):
+        return None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    email = data.get("email") if isinstance(data, dict) else None
+    return email if isinstance(email, str) else None
+
+async def _rate_limit(request: Request, route: str, account: Optional[str]) -> None:
+    if request.scope.get("state", {}).get(RATE_LIMIT_CHECKED):
+        return
+    rejected = await rate_limiter.hit(route, request.client.host if request.client else None, account)
+    if rejected:
+        raise HTTPException(status_code=429, detail=RATE_LIMITED_DETAIL,
+                            headers={"Retry-After": str(math.ceil(rejected[1]))})
+
+async def login_rate_limit(request: Request) -> None:
+    """Route dependency of /login/, resolved before the session and the password check."""
+    # Starlette caches the parsed form, the endpoint's OAuth2PasswordRequestForm reads the same one.
+    form = await request.form()
+    username = form.get("username")
+    await _rate_limit(request, "login", username if isinstance(username, str) else None)
+
+async def register_rate_limit(request: Request) -> None:
+    """Route dependency of /register/, resolved before the session and the password hash."""
+    await _rate_limit(request, "register", register_account(request.headers.get("content-type"), await request.body()))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
@@ -50,3 +111,9 @@ def require_role(role: str):
             raise HTTPException(status_code=403, detail="Operation not permitted")
         return current_user
     return role_checker
+
+def require_metrics_access(token: str = Depends(oauth2_scheme)):
+    """Dependency of /metrics: the scraper's ``metrics_token`` or an administrator's access token."""
+    if settings.metrics_token and secrets.compare_digest(token.encode(), settings.metrics_token.encode()):
+        return None
+    return require_role(["ADMIN"])(get_current_user(token))
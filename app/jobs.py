@@ -0,0 +1,38 @@
+"""
+Built-in background jobs, registered with the job runner when this module is imported.
+
+Further job types are declared the same way, next to the code that enqueues them.
+"""
+from builtins import dict
+import logging
+
+from app.database import Database
+from app.dependencies import get_settings
+from app.services.idempotency_service import IdempotencyService
+from app.services.job_service import JobService
+from app.services.webhook_service import WebhookService
+from app.utils.job_runner import job_type
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@job_type("purge_idempotency_keys", every=3600)
+async def purge_idempotency_keys(payload: dict) -> None:
+    """Delete idempotency keys whose stored response has expired."""
+    async with Database.get_session_factory()() as session:
+        logger.info("Purged %d expired idempotency keys", await IdempotencyService.purge_expired(session))
+
+@job_type("purge_finished_jobs", every=86400)
+async def purge_finished_jobs(payload: dict) -> None:
+    """Delete jobs that finished more than ``jobs_retention_days`` ago."""
+    async with Database.get_session_factory()() as session:
+        purged = await JobService.purge_finished(session, settings.jobs_retention_days * 86400)
+        logger.info("Purged %d finished jobs", purged)
+
+@job_type("purge_webhook_events", every=3600)
+async def purge_webhook_events(payload: dict) -> None:
+    """Delete outbox events older than ``webhook_retention_days`` that were delivered or failed everywhere."""
+    async with Database.get_session_factory()() as session:
+        purged = await WebhookService.purge(session, settings.webhook_retention_days * 86400)
+        logger.info("Purged %d webhook events", purged)
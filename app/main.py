@@ -1,11 +1,33 @@
 from builtins import Exception
+import asyncio
 from fastapi import FastAPI
 from starlette.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware  # Import the CORSMiddleware
 from app.database import Database
-from app.dependencies import get_settings
-from app.routers import user_routes
+from app.dependencies import get_profile_store, get_settings, register_account
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.query_count import QueryCountMiddleware
+from app.middleware.request_context import RequestContextMiddleware
+from app.middleware.timing import ServerTimingMiddleware
+from app import jobs  # noqa: F401, registers the built-in job types
+from app.routers import admin_routes, docs_routes, metrics_routes, user_routes
 from app.utils.api_description import getDescription
+from app.utils.common import setup_logging
+from app.utils.job_runner import job_runner
+from app.utils.loop_monitor import loop_monitor
+from app.utils.memory import memory_sampler, tracemalloc_profiler
+from app.utils.metrics import DB_POOL_CAPACITY, instrument_pool
+from app.utils.openapi_cache import prepare_openapi_schema
+from app.utils.query_counter import install_query_counter
+from app.utils.rate_limit import create_backend, rate_limiter
+from app.utils.slow_queries import slow_query_recorder
+from app.utils.structured_logging import stop_log_queue
+from app.utils.timing import install_sql_timing
+from app.utils.webhook_dispatcher import webhook_dispatcher
+settings = get_settings()
 app = FastAPI(
     title="User Management",
     description=getDescription(),
@@ -16,7 +38,24 @@ app = FastAPI(
         "email": "support@example.com",
     },
     license_info={"name": "MIT", "url": "https://opensource.org/licenses/MIT"},
+    # Served from precomputed bytes by docs_routes instead
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
 )
+# Middleware added later wraps the earlier ones. From the outside in:
+#   ServerTiming -> QueryCount -> Profiling -> Metrics -> Compression -> RequestContext -> CORS -> Idempotency
+# Idempotency is innermost, so the stored responses are the routes' own: without CORS, compression or
+# diagnostic headers, and a replay is compressed (and gets its encoded ETag) like a fresh response.
+if settings.idempotency_enabled:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        paths={"/register/", "/users/"},
+        ttl=settings.idempotency_ttl_hours * 3600,
+        lock_timeout=settings.idempotency_lock_timeout_seconds,
+        wait_timeout=settings.idempotency_wait_seconds,
+        rate_limits={"/register/": ("register", register_account)},
+    )
 # CORS middleware configuration
 # This middleware will enable CORS and allow requests from any origin
 # It can be configured to allow specific methods, headers, and origins
@@ -27,16 +66,91 @@ app.add_middleware(
     allow_methods=["*"],  # Allowed HTTP methods
     allow_headers=["*"],  # Allowed HTTP headers
 )
+app.add_middleware(RequestContextMiddleware)
+# Compression wraps the application's middleware, so it sees their final bodies (including streams) and
+# suffixes the routes' strong ETags; the diagnostic middleware below see the compressed response.
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        level=settings.compression_level,
+        offload_size=settings.compression_offload_size,
+        flush_size=settings.compression_flush_size,
+        flush_interval=settings.compression_flush_interval,
+    )
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+if settings.profiler_enabled:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=get_profile_store(),
+        secret=settings.secret_key,
+        sample_rate=settings.profiler_sample_rate,
+        interval=settings.profiler_interval_ms / 1000,
+        max_concurrent=settings.profiler_max_concurrent,
+    )
+if settings.query_count_enabled:
+    install_query_counter()
+    app.add_middleware(QueryCountMiddleware, warn_threshold=settings.query_count_warning_threshold)
+# Outermost, so the reported total includes compression and the other middleware, and the
+# Server-Timing header is added to the response as it leaves the app
+if settings.server_timing_enabled:
+    install_sql_timing()
+    app.add_middleware(ServerTimingMiddleware)
 
 @app.on_event("startup")
 async def startup_event():
-    settings = get_settings()
-    Database.initialize(settings.database_url, settings.debug)
+    # Per worker: the log writer thread would not survive gunicorn forking a preloaded app.
+    setup_logging()
+    Database.initialize(settings.database_url, settings.debug, settings.db_prepared_statement_cache_size)
+    if settings.metrics_enabled:
+        instrument_pool(Database.get_engine())
+    if settings.slow_query_log_enabled:
+        slow_query_recorder.configure(settings.slow_query_threshold_ms, settings.slow_query_buffer_size,
+                                      settings.slow_query_explain, settings.slow_query_explain_timeout_ms)
+        slow_query_recorder.install(Database.get_engine())
+    if settings.loop_monitor_enabled:
+        loop_monitor.configure(settings.loop_monitor_interval_ms / 1000, settings.loop_monitor_threshold_ms / 1000,
+                               settings.loop_monitor_buffer_size)
+        loop_monitor.start()
+    rate_limiter.configure(
+        settings.rate_limit_enabled,
+        create_backend(settings.rate_limit_backend, settings.rate_limit_sqlite_path, settings.rate_limit_max_keys),
+        settings.rate_limit_per_ip, settings.rate_limit_per_account, settings.rate_limit_global,
+    )
+    tracemalloc_profiler.capacity = settings.memory_max_snapshots
+    if settings.memory_sampler_enabled:
+        memory_sampler.configure(settings.memory_sampler_interval_seconds, settings.memory_sampler_history)
+        memory_sampler.start()
+    if settings.jobs_in_app:
+        job_runner.configure(settings.jobs_poll_interval_seconds, settings.jobs_lease_seconds, settings.jobs_concurrency)
+        job_runner.start()
+        webhook_dispatcher.configure(settings.webhook_poll_interval_seconds, settings.webhook_batch_size,
+                                     settings.webhook_timeout_seconds, settings.webhook_max_attempts,
+                                     settings.webhook_backoff_seconds, settings.webhook_max_backoff_seconds)
+        webhook_dispatcher.start()
+    prepare_openapi_schema(app, settings.openapi_schema_file or None)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await asyncio.gather(job_runner.stop(settings.jobs_shutdown_timeout_seconds),
+                         webhook_dispatcher.stop(settings.jobs_shutdown_timeout_seconds))
+    slow_query_recorder.uninstall()
+    await memory_sampler.stop()
+    await loop_monitor.stop()
+    await rate_limiter.backend.close()
+    await Database.dispose()
+    DB_POOL_CAPACITY.set(0)
+    stop_log_queue()
 
 @app.exception_handler(Exception)
 async def exception_handler(request, exc):
     return JSONResponse(status_code=500, content={"message": "An unexpected error occurred."})
 
+app.include_router(docs_routes.router)
+if settings.metrics_enabled:
+    app.include_router(metrics_routes.router)
 app.include_router(user_routes.router)
+app.include_router(admin_routes.router)
 
 
@@ -0,0 +1,169 @@
+from builtins import bool, bytes, float, int, len, str
+import time
+import zlib
+
+import anyio
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.conditional import ENCODINGS, encoded_etag
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml")
+
+class _Encoder:
+    """Incremental gzip or brotli encoder; ``flush`` makes everything compressed so far decodable."""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=min(level, 11))
+        else:
+            self._compressor = zlib.compressobj(min(level, 9), zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + (self._compressor.flush() if flush else b"")
+        return self._compressor.compress(data) + (self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.finish()
+        return self._compressor.compress(data) + self._compressor.flush()
+
+class CompressionMiddleware:
+    """
+    Compresses responses with brotli or gzip, whichever the client prefers and accepts.
+
+    A compressed response's strong ETag gets the encoding as a suffix (``encoded_etag``), as does
+    that of a 304 answering an If-None-Match with the suffixed form, so the identity and the
+    encoded bytes never share a strong validator.
+
+    Bodies smaller than ``minimum_size`` are sent as is. Streaming responses are compressed
+    chunk by chunk and flushed once ``flush_size`` bytes arrived or ``flush_interval`` seconds
+    passed since the last flush, checked as chunks arrive: flushing after every small chunk
+    (an NDJSON line) would cost most of the compression ratio, never flushing would keep clients
+    waiting. Compressing ``offload_size`` bytes or more runs in a worker thread so the event
+    loop stays free.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500, level: int = 6, offload_size: int = 256 * 1024,
+                 flush_size: int = 64 * 1024, flush_interval: float = 1.0):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.offload_size = offload_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = self._negotiate(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self, encoding, send, request_headers.get("if-none-match", "")).run(
+            self.app, scope, receive)
+
+    @staticmethod
+    def _negotiate(accept_encoding: str):
+        accepted = {}
+        for part in accept_encoding.lower().split(","):
+            name, _, params = part.strip().partition(";")
+            quality = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    quality = float(params.strip()[2:])
+                except ValueError:
+                    quality = 0.0
+            if name:
+                accepted[name] = quality
+        for encoding in ENCODINGS:
+            if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return encoding
+        return None
+
+    async def _run(self, function, data: bytes) -> bytes:
+        if len(data) >= self.offload_size:
+            return await anyio.to_thread.run_sync(function, data)
+        return function(data)
+
+class _CompressedResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send, if_none_match: str = ""):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.if_none_match = if_none_match
+        self.start_message: Message = None
+        self.encoder: _Encoder = None
+        self.passthrough = False
+        self.unflushed = 0
+        self.flushed_at = 0.0
+
+    async def run(self, app: ASGIApp, scope: Scope, receive: Receive) -> None:
+        await app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] < 200 or message["status"] in (204, 304)
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            self.start_message = message
+            if self.passthrough:
+                etag = headers.get("etag")
+                if message["status"] == 304 and etag:
+                    # The client revalidated the compressed representation: answer with its ETag.
+                    encoded = encoded_etag(etag, self.encoding)
+                    if encoded != etag and encoded in self.if_none_match:
+                        MutableHeaders(raw=message["headers"])["ETag"] = encoded
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Small complete body: not worth compressing.
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.encoder = _Encoder(self.encoding, self.middleware.level)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                compressed = await self.middleware._run(self.encoder.finish, body)
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            await self.send(self.start_message)
+            self.flushed_at = time.monotonic()
+
+        if more_body:
+            self.unflushed += len(body)
+            flush = (self.unflushed >= self.middleware.flush_size
+                     or time.monotonic() - self.flushed_at >= self.middleware.flush_interval)
+            if flush:
+                self.unflushed = 0
+                self.flushed_at = time.monotonic()
+            chunk = await self.middleware._run(lambda data: self.encoder.compress(data, flush=flush), body)
+            if chunk:
+                await self.send({"type": "http.response.body", "body": chunk, "more_body": True})
+        else:
+            chunk = await self.middleware._run(self.encoder.finish, body)
+            await self.send({"type": "http.response.body", "body": chunk})
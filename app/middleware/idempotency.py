@@ -0,0 +1,179 @@
+from builtins import bytes, dict, float, len, str
+import asyncio
+import hashlib
+import math
+import time
+from typing import Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import Database
+from app.dependencies import RATE_LIMIT_CHECKED, RATE_LIMITED_DETAIL
+from app.services.idempotency_service import ClaimState, IdempotencyService
+from app.services.jwt_service import decode_token
+from app.utils.metrics import IDEMPOTENT_REQUESTS
+from app.utils.rate_limit import rate_limiter
+
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+
+def _client(scope: Scope) -> str:
+    """Keys are scoped to the bearer token's subject, or to the client address without one."""
+    scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        payload = decode_token(token)
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}"
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "anonymous"
+
+def _fingerprint(scope: Scope, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    """
+    Runs a POST sent with an ``Idempotency-Key`` header once per client and key.
+
+    The first request claims the key in the ``idempotency_keys`` table and its response (status,
+    headers and body) is stored there for ``ttl`` seconds. Retries with the same key and the same
+    request get the stored response back with an ``Idempotent-Replayed: true`` header, without
+    running the route again. A duplicate arriving while the first request is still running waits
+    up to ``wait_timeout`` seconds for its response, then gets a 409 with Retry-After.
+
+    Server errors and 429 responses are not stored: the key is released and a retry runs the
+    request again. So is a claim still in flight after ``lock_timeout`` seconds, whose worker is
+    presumed dead. Reusing a key for a different request is rejected with 422. Expired keys are
+    deleted by the ``purge_idempotency_keys`` job.
+
+    Paths in ``rate_limits`` map to the limiter's route name and a function returning the account
+    from the content type and body. Their limits are checked before the key is claimed, so a flood
+    of keyed requests is turned away without writing to the database; the route's own rate limit
+    dependency then lets the request through.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], ttl: float = 86400, lock_timeout: float = 60,
+                 wait_timeout: float = 10,
+                 rate_limits: Optional[Mapping[str, Tuple[str, Callable[[Optional[str], bytes], Optional[str]]]]] = None):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.rate_limits = dict(rate_limits or {})
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        # Requests of this worker holding a claim, so local duplicates wait without polling.
+        self._in_flight: Dict[Tuple[str, str], asyncio.Event] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        key = Headers(scope=scope).get("idempotency-key")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters."}, 400)
+            await response(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        if scope["path"] in self.rate_limits:
+            route, account = self.rate_limits[scope["path"]]
+            address = scope.get("client")
+            rejected = await rate_limiter.hit(route, address[0] if address else None,
+                                              account(Headers(scope=scope).get("content-type"), body))
+            if rejected:
+                response = JSONResponse({"detail": RATE_LIMITED_DETAIL}, 429,
+                                        headers={"Retry-After": str(math.ceil(rejected[1]))})
+                await response(scope, receive, send)
+                return
+            scope.setdefault("state", {})[RATE_LIMIT_CHECKED] = True
+        client, fingerprint = _client(scope), _fingerprint(scope, body)
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            async with Database.get_session_factory()() as session:
+                state, record = await IdempotencyService.claim(session, client, key, fingerprint, self.ttl,
+                                                               self.lock_timeout)
+            if state is ClaimState.CLAIMED:
+                IDEMPOTENT_REQUESTS.labels("executed").inc()
+                await self._run(scope, receive, send, client, key, body)
+                return
+            if state is ClaimState.COMPLETED:
+                IDEMPOTENT_REQUESTS.labels("replayed").inc()
+                await send({"type": "http.response.start", "status": record.status_code, "headers": [
+                    (name.encode("latin-1"), value.encode("latin-1")) for name, value in record.headers
+                ] + [(b"idempotent-replayed", b"true")]})
+                await send({"type": "http.response.body", "body": record.body})
+                return
+            if state is ClaimState.MISMATCH:
+                IDEMPOTENT_REQUESTS.labels("mismatch").inc()
+                response = JSONResponse({"detail": "Idempotency-Key was already used for a different request."}, 422)
+                await response(scope, receive, send)
+                return
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                IDEMPOTENT_REQUESTS.labels("in_flight").inc()
+                response = JSONResponse({"detail": "A request with this Idempotency-Key is still in progress."}, 409,
+                                        headers={"Retry-After": "1"})
+                await response(scope, receive, send)
+                return
+            event = self._in_flight.get((client, key))
+            if event is None:
+                await asyncio.sleep(min(POLL_INTERVAL, remaining))
+            else:
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _run(self, scope: Scope, receive: Receive, send: Send, client: str, key: str, body: bytes) -> None:
+        event = self._in_flight[(client, key)] = asyncio.Event()
+        status_code, headers, chunks, finished = None, [], [], False
+        replayed_body = False
+
+        async def receive_body() -> Message:
+            nonlocal replayed_body
+            if replayed_body:
+                return await receive()
+            replayed_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture(message: Message) -> None:
+            nonlocal status_code, headers, finished
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [[name.decode("latin-1"), value.decode("latin-1")] for name, value in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                finished = not message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, capture)
+        finally:
+            try:
+                async with Database.get_session_factory()() as session:
+                    if finished and status_code < 500 and status_code != 429:
+                        await IdempotencyService.complete(session, client, key, status_code, headers, b"".join(chunks))
+                    else:
+                        await IdempotencyService.release(session, client, key)
+            finally:
+                del self._in_flight[(client, key)]
+                event.set()
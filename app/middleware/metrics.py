@@ -0,0 +1,42 @@
+from builtins import str
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS, HTTP_REQUESTS_IN_PROGRESS
+
+class MetricsMiddleware:
+    """
+    Records request count, latency and concurrency per route.
+
+    Requests are labelled with the matched route template (``/users/{user_id}``), never the raw
+    path, so the number of series stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            # The router records the matched route in the (shared) scope.
+            route = scope.get("route")
+            path = route.path if route is not None else "<unmatched>"
+            HTTP_REQUESTS.labels(scope["method"], path, str(status_code)).inc()
+            HTTP_REQUEST_DURATION.labels(scope["method"], path).observe(elapsed)
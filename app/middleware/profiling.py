@@ -0,0 +1,57 @@
+from builtins import int, str
+import asyncio
+import random
+import time
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.utils.profiler import ProfileStore, RequestSampler, verify_profile_token
+
+PROFILE_HEADER = "x-profile"
+
+class ProfilingMiddleware:
+    """
+    Profiles selected requests with a ``RequestSampler`` and stores the result in ``store``.
+
+    A request is selected when it carries a valid signed ``X-Profile`` header (see
+    ``sign_profile_token``) or, failing that, with probability ``sample_rate``. At most
+    ``max_concurrent`` requests per worker are profiled at once. Installed only when profiling is
+    enabled, so it costs nothing otherwise.
+    """
+
+    def __init__(self, app: ASGIApp, store: ProfileStore, secret: str, sample_rate: float = 0.0,
+                 interval: float = 0.002, max_concurrent: int = 2):
+        self.app = app
+        self.store = store
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_concurrent = max_concurrent
+        self._active = 0
+
+    def _selected(self, scope: Scope) -> bool:
+        token = Headers(scope=scope).get(PROFILE_HEADER)
+        if token is not None:
+            return verify_profile_token(self.secret, token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._active >= self.max_concurrent or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+        sampler = RequestSampler(asyncio.current_task(), asyncio.get_running_loop(), self.interval)
+        self._active += 1
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            samples = await anyio.to_thread.run_sync(sampler.stop)
+            self._active -= 1
+            if samples:
+                route = scope.get("route")
+                path = route.path if route is not None else scope["path"]
+                await anyio.to_thread.run_sync(self.store.save, scope["method"], path, duration_ms, samples)
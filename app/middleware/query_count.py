@@ -0,0 +1,44 @@
+from builtins import int, str
+import logging
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.query_counter import count_queries
+
+logger = logging.getLogger(__name__)
+
+class QueryCountMiddleware:
+    """
+    Debug aid: counts the database round trips of each request.
+
+    The count so far is sent in an ``X-Query-Count`` header. The final count is logged after the
+    response, as a warning with the statements when it exceeds ``warn_threshold``.
+    """
+
+    def __init__(self, app: ASGIApp, warn_threshold: int = 10):
+        self.app = app
+        self.warn_threshold = warn_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with count_queries() as counter:
+            status_code = 500
+
+            async def send_with_count(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    MutableHeaders(scope=message).append("X-Query-Count", str(counter.count))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_count)
+            finally:
+                if counter.count > self.warn_threshold:
+                    logger.warning('"%s %s" %s issued %d queries:\n%s',
+                                   scope["method"], scope["path"], status_code, counter.count, counter.report())
+                else:
+                    logger.info('"%s %s" %s issued %d queries', scope["method"], scope["path"], status_code, counter.count)
@@ -0,0 +1,16 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.utils.request_context import request_scope
+
+class RequestContextMiddleware:
+    """Makes the current request available to ``app.utils.request_context`` for the rest of the task."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with request_scope(scope):
+            await self.app(scope, receive, send)
@@ -0,0 +1,39 @@
+from builtins import str
+import logging
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.timing import request_timings
+
+logger = logging.getLogger(__name__)
+
+class ServerTimingMiddleware:
+    """
+    Collects the timing spans of each request and reports them in a ``Server-Timing`` header.
+
+    The header carries the spans recorded before the response starts. Once the response has been
+    sent, the final breakdown is also written to the log next to the method, path and status.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with request_timings() as timings:
+            status_code = 500
+
+            async def send_with_timing(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    MutableHeaders(scope=message).append("Server-Timing", timings.header())
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                logger.info('"%s %s" %s server-timing: %s', scope["method"], scope["path"], status_code, timings.header())
@@ -0,0 +1,38 @@
+from builtins import bytes, int, list, str
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped
+from app.database import Base
+
+class IdempotencyKey(Base):
+    """
+    The outcome of a request sent with an ``Idempotency-Key`` header, corresponding to the
+    'idempotency_keys' table.
+
+    Attributes:
+        client (str): Who sent the key, ``user:<sub>`` for a bearer token or ``ip:<address>``.
+        key (str): The Idempotency-Key header value.
+        fingerprint (str): SHA-256 of the method, path, query string and body of the first request.
+        status_code (int): Status of the stored response, NULL while the first request is in flight.
+        headers (list): Stored response headers as ``[name, value]`` pairs.
+        body (bytes): Stored response body.
+        locked_until (datetime): An in-flight claim older than this is abandoned and may be taken over.
+        expires_at (datetime): The key can be reused for a new request after this.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    client: Mapped[str] = Column(String(255), primary_key=True)
+    key: Mapped[str] = Column(String(255), primary_key=True)
+    fingerprint: Mapped[str] = Column(String(64), nullable=False)
+    status_code: Mapped[int] = Column(Integer, nullable=True)
+    headers: Mapped[list] = Column(JSONB, nullable=True)
+    body: Mapped[bytes] = Column(LargeBinary, nullable=True)
+    locked_until: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<IdempotencyKey {self.client} {self.key}, status: {self.status_code}>"
@@ -0,0 +1,60 @@
+from builtins import dict, int, str
+from datetime import datetime
+from enum import Enum
+from sqlalchemy import BigInteger, Column, DateTime, Enum as SQLAlchemyEnum, Identity, Index, Integer, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped
+from app.database import Base
+
+class JobStatus(Enum):
+    """Lifecycle of a background job, stored as ENUM in the database."""
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+class Job(Base):
+    """
+    A unit of deferred work, corresponding to the 'jobs' table. Workers claim ready jobs with
+    ``SELECT ... FOR UPDATE SKIP LOCKED``.
+
+    Attributes:
+        id (int): Identifier, increasing in enqueue order.
+        type (str): Name of the registered handler that runs the job.
+        payload (dict): JSON arguments of the handler.
+        status (JobStatus): Where the job is in its lifecycle.
+        unique_key (str): Optional; at most one queued or running job per type has a given key.
+        attempts (int): Number of times the job was claimed.
+        max_attempts (int): The job fails for good after this many attempts.
+        run_at (datetime): Not claimed before this time: the schedule, or the backoff of a retry.
+        locked_by (str): Worker running the job.
+        locked_until (datetime): Lease of the running attempt; an expired lease is requeued.
+        last_error (str): Error of the latest failed attempt.
+        created_at (datetime): Timestamp when the job was enqueued.
+        finished_at (datetime): Timestamp when the job succeeded or failed for good.
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Only the queued jobs are indexed, so claiming stays cheap however much history is kept.
+        Index("ix_jobs_ready", "type", "run_at", postgresql_where=text("status = 'QUEUED'")),
+        Index("ix_jobs_unique_key", "type", "unique_key", unique=True,
+              postgresql_where=text("unique_key IS NOT NULL AND status IN ('QUEUED', 'RUNNING')")),
+    )
+
+    id: Mapped[int] = Column(BigInteger, Identity(), primary_key=True)
+    type: Mapped[str] = Column(String(100), nullable=False)
+    payload: Mapped[dict] = Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+    status: Mapped[JobStatus] = Column(SQLAlchemyEnum(JobStatus, name='JobStatus', create_constraint=True),
+                                       nullable=False, server_default=JobStatus.QUEUED.value)
+    unique_key: Mapped[str] = Column(String(255), nullable=True)
+    attempts: Mapped[int] = Column(Integer, nullable=False, server_default=text("0"))
+    max_attempts: Mapped[int] = Column(Integer, nullable=False)
+    run_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_by: Mapped[str] = Column(String(100), nullable=True)
+    locked_until: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str] = Column(Text, nullable=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<Job {self.id} {self.type}, status: {self.status.name}>"
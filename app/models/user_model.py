@@ -1,13 +1,15 @@
 from builtins import bool, int, str
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 import uuid
 from sqlalchemy import (
-    Column, String, Integer, DateTime, Boolean, func, Enum as SQLAlchemyEnum
+    Column, String, Integer, DateTime, Boolean, Index, func, text, Enum as SQLAlchemyEnum
 )
 from sqlalchemy.dialects.postgresql import UUID, ENUM
 from sqlalchemy.orm import Mapped, mapped_column
 from app.database import Base
+from app.utils.security import hash_verification_token
+from settings.config import settings
 
 class UserRole(Enum):
     """Enumeration of user roles within the application, stored as ENUM in the database."""
@@ -42,6 +44,9 @@ class User(Base):
         is_locked (bool): Flag indicating if the account is locked.
         created_at (datetime): Timestamp when the user was created, set by the server.
         updated_at (datetime): Timestamp of the last update, set by the server.
+        verification_token_hash (str): SHA-256 digest of the pending email verification token.
+        verification_token_expires_at (datetime): Expiry of the pending email verification token.
+        verification_token (str): Plain pending token, held in memory only so it can be emailed.
 
     Methods:
         lock_account(): Locks the user account.
@@ -52,6 +57,11 @@ class User(Base):
     """
     __tablename__ = "users"
     __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Only users with a pending verification are indexed, so the index stays small.
+        Index("ix_users_verification_token_hash", "verification_token_hash",
+              postgresql_where=text("NOT email_verified")),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nickname: Mapped[str] = Column(String(50), unique=True, nullable=False, index=True)
@@ -70,7 +80,8 @@ class User(Base):
     is_locked: Mapped[bool] = Column(Boolean, default=False)
     created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    verification_token = Column(String, nullable=True)
+    verification_token_hash: Mapped[str] = Column(String(64), nullable=True)
+    verification_token_expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
     email_verified: Mapped[bool] = Column(Boolean, default=False, nullable=False)
     hashed_password: Mapped[str] = Column(String(255), nullable=False)
 
@@ -79,6 +90,26 @@ class User(Base):
         """Provides a readable representation of a user object."""
         return f"<User {self.nickname}, Role: {self.role.name}>"
 
+    @property
+    def verification_token(self):
+        """The plain verification token, available only while it is still the pending one."""
+        token = self.__dict__.get("_verification_token")
+        if token is not None and not self.email_verified and self.verification_token_hash == hash_verification_token(token):
+            return token
+        return None
+
+    @verification_token.setter
+    def verification_token(self, token):
+        """Stores only the hash and expiry of a new verification token."""
+        self._verification_token = token
+        if token is None:
+            self.verification_token_hash = None
+            self.verification_token_expires_at = None
+        else:
+            self.verification_token_hash = hash_verification_token(token)
+            self.verification_token_expires_at = datetime.now(timezone.utc) + timedelta(
+                minutes=settings.verification_token_expire_minutes)
+
     def lock_account(self):
         self.is_locked = True
 
@@ -0,0 +1,108 @@
+from builtins import dict, int, list, str
+from datetime import datetime
+from enum import Enum
+import uuid
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Enum as SQLAlchemyEnum, ForeignKey, Identity, Index, Integer, String, Text,
+    func, text
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class UserEvent(Enum):
+    """User lifecycle events sent to webhook endpoints; the value is the event type on the wire."""
+    CREATED = "user.created"
+    UPDATED = "user.updated"
+    DELETED = "user.deleted"
+    LOCKED = "user.locked"
+    EMAIL_VERIFIED = "user.email_verified"
+
+class DeliveryStatus(Enum):
+    """State of an event's delivery to one endpoint, stored as ENUM in the database."""
+    PENDING = "PENDING"
+    DELIVERED = "DELIVERED"
+    FAILED = "FAILED"
+
+class WebhookEndpoint(Base):
+    """
+    A receiver of user events, corresponding to the 'webhook_endpoints' table.
+
+    Attributes:
+        id (UUID): Unique identifier of the endpoint.
+        url (str): Where batches of events are POSTed.
+        secret (str): Key of the HMAC-SHA256 signature of every request.
+        events (list): Event types sent to the endpoint; empty for all of them.
+        max_concurrency (int): Batches in flight to the endpoint at the same time, across all workers.
+        created_at (datetime): Timestamp when the endpoint was registered.
+    """
+    __tablename__ = "webhook_endpoints"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    url: Mapped[str] = Column(String(2048), nullable=False)
+    secret: Mapped[str] = Column(String(255), nullable=False)
+    events: Mapped[list] = Column(ARRAY(String(50)), nullable=False, server_default=text("'{}'"))
+    max_concurrency: Mapped[int] = Column(Integer, nullable=False, server_default=text("1"))
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self) -> str:
+        return f"<WebhookEndpoint {self.url}>"
+
+class OutboxEvent(Base):
+    """
+    A user event, written in the same transaction as the change it describes ('outbox_events' table).
+
+    Attributes:
+        id (int): Identifier; the events of a user are numbered in commit order, as the change locks the user first.
+        type (str): A ``UserEvent`` value.
+        user_id (UUID): The user the event is about; not a foreign key, deleted users have events too.
+        payload (dict): JSON representation of the user after the change.
+        created_at (datetime): Timestamp of the change.
+    """
+    __tablename__ = "outbox_events"
+
+    id: Mapped[int] = Column(BigInteger, Identity(), primary_key=True)
+    type: Mapped[str] = Column(String(50), nullable=False)
+    user_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), nullable=False)
+    payload: Mapped[dict] = Column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+class WebhookDelivery(Base):
+    """
+    Delivery of one event to one endpoint ('webhook_deliveries' table), created with the event.
+
+    Attributes:
+        id (int): Identifier of the delivery.
+        endpoint_id (UUID): The receiving endpoint.
+        event_id (int): The event delivered.
+        user_id (UUID): Copied from the event: deliveries of one user to one endpoint are made in event order.
+        status (DeliveryStatus): Pending until the endpoint accepted it, or failed for good.
+        attempts (int): Number of times the delivery was sent.
+        next_attempt_at (datetime): Not sent before this time, the backoff of a retry.
+        batch_id (UUID): The batch of the latest attempt, sent as ``Webhook-Id``.
+        locked_until (datetime): Lease of the attempt in flight; an expired lease is sent again.
+        last_error (str): Error of the latest failed attempt.
+        delivered_at (datetime): Timestamp when the endpoint accepted the delivery.
+    """
+    __tablename__ = "webhook_deliveries"
+    __table_args__ = (
+        # Only pending deliveries are indexed, so finding work stays cheap however much history is kept.
+        Index("ix_webhook_deliveries_pending", "endpoint_id", "event_id", postgresql_where=text("status = 'PENDING'")),
+        Index("ix_webhook_deliveries_pending_user", "endpoint_id", "user_id", "event_id",
+              postgresql_where=text("status = 'PENDING'")),
+        Index("ix_webhook_deliveries_event_id", "event_id"),
+    )
+
+    id: Mapped[int] = Column(BigInteger, Identity(), primary_key=True)
+    endpoint_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), ForeignKey("webhook_endpoints.id", ondelete="CASCADE"),
+                                            nullable=False)
+    event_id: Mapped[int] = Column(BigInteger, ForeignKey("outbox_events.id", ondelete="CASCADE"), nullable=False)
+    user_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), nullable=False)
+    status: Mapped[DeliveryStatus] = Column(SQLAlchemyEnum(DeliveryStatus, name='DeliveryStatus', create_constraint=True),
+                                            nullable=False, server_default=DeliveryStatus.PENDING.value)
+    attempts: Mapped[int] = Column(Integer, nullable=False, server_default=text("0"))
+    next_attempt_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    batch_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), nullable=True)
+    locked_until: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str] = Column(Text, nullable=True)
+    delivered_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,209 @@
+"""Diagnostics for administrators."""
+
+from builtins import KeyError, ValueError, dict, int, round, str
+import os
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies import get_db, get_profile_store, get_settings, require_role
+from app.middleware.profiling import PROFILE_HEADER
+from app.schemas.webhook_schemas import WebhookEndpointCreate, WebhookEndpointResponse
+from app.services.job_service import JobService
+from app.services.webhook_service import WebhookService
+from app.utils.job_runner import job_runner
+from app.utils.loop_monitor import loop_monitor
+from app.utils.memory import GROUPINGS, memory_sampler, tracemalloc_profiler
+from app.utils.profiler import ProfileStore, sign_profile_token
+from app.utils.slow_queries import slow_query_recorder
+from app.utils.webhook_dispatcher import webhook_dispatcher
+
+router = APIRouter(prefix="/admin", tags=["Administration Requires (Admin Role)"])
+settings = get_settings()
+
+@router.get("/slow-queries")
+async def list_slow_queries(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Recent statements slower than the configured threshold, newest first, with redacted parameters,
+    the originating route and the captured query plan (null while it is still being captured).
+    """
+    return {
+        "enabled": slow_query_recorder.enabled,
+        "threshold_ms": slow_query_recorder.threshold * 1000,
+        "entries": slow_query_recorder.recent(),
+    }
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_queries(current_user: dict = Depends(require_role(["ADMIN"]))):
+    slow_query_recorder.clear()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.get("/event-loop")
+async def list_event_loop_blocks(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Times this worker's event loop was held longer than the threshold, newest first, with the
+    route being served and the stack of the blocking call.
+    """
+    return {
+        "pid": os.getpid(),
+        "enabled": loop_monitor.running,
+        "threshold_ms": loop_monitor.threshold * 1000,
+        "max_lag_ms": round(loop_monitor.max_lag * 1000, 1),
+        "events": loop_monitor.recent(),
+    }
+
+@router.delete("/event-loop", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_event_loop_blocks(current_user: dict = Depends(require_role(["ADMIN"]))):
+    loop_monitor.clear()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/profiles/token")
+async def create_profile_token(ttl_seconds: int = Query(300, ge=1, le=86400),
+                               current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Signed value for the ``X-Profile`` header: every request sent with it before it expires is
+    profiled (requires ``profiler_enabled``).
+    """
+    return {
+        "enabled": settings.profiler_enabled,
+        "header": PROFILE_HEADER,
+        "value": sign_profile_token(settings.secret_key, ttl_seconds),
+        "expires_in": ttl_seconds,
+    }
+
+@router.get("/profiles")
+async def list_profiles(store: ProfileStore = Depends(get_profile_store),
+                        current_user: dict = Depends(require_role(["ADMIN"]))):
+    """Stored request profiles, newest first."""
+    return {"profiles": store.list()}
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str, store: ProfileStore = Depends(get_profile_store),
+                           current_user: dict = Depends(require_role(["ADMIN"]))):
+    """A profile as collapsed stacks, ready for flamegraph.pl or speedscope."""
+    path = store.path(name)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+# The memory endpoints describe the worker that serves them; responses carry its pid. Statistics
+# are computed in plain ``def`` endpoints, which FastAPI runs in its thread pool.
+
+def _grouping(group_by: str = Query("module", pattern="^(" + "|".join(GROUPINGS) + ")$",
+                                    description="module, filename or lineno"),
+              depth: Optional[int] = Query(None, ge=1, description="Module name components kept, e.g. 1 for top-level packages"),
+              limit: int = Query(20, ge=1, le=500)) -> dict:
+    return {"group_by": group_by, "depth": depth, "limit": limit}
+
+@router.get("/memory/stats")
+async def memory_stats(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """RSS and garbage collector statistics: current figures and the periodic samples."""
+    return memory_sampler.report()
+
+@router.get("/memory/tracemalloc")
+async def tracemalloc_status(current_user: dict = Depends(require_role(["ADMIN"]))):
+    return tracemalloc_profiler.status()
+
+@router.post("/memory/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(1, ge=1, le=50, description="Frames stored per allocation"),
+                            current_user: dict = Depends(require_role(["ADMIN"]))):
+    """Start tracing allocations. Tracing slows the worker down, so stop it when done."""
+    return tracemalloc_profiler.start(frames)
+
+@router.post("/memory/tracemalloc/stop")
+async def stop_tracemalloc(current_user: dict = Depends(require_role(["ADMIN"]))):
+    return tracemalloc_profiler.stop()
+
+@router.post("/memory/snapshots", status_code=status.HTTP_201_CREATED)
+def take_memory_snapshot(current_user: dict = Depends(require_role(["ADMIN"]))):
+    try:
+        return tracemalloc_profiler.take_snapshot()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.get("/memory/snapshots")
+async def list_memory_snapshots(current_user: dict = Depends(require_role(["ADMIN"]))):
+    return {"snapshots": tracemalloc_profiler.list()}
+
+@router.delete("/memory/snapshots", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_memory_snapshots(current_user: dict = Depends(require_role(["ADMIN"]))):
+    tracemalloc_profiler.clear()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.get("/memory/snapshots/{snapshot_id}/top")
+def top_allocations(snapshot_id: int, grouping: dict = Depends(_grouping),
+                    current_user: dict = Depends(require_role(["ADMIN"]))):
+    """Largest allocation sites alive when the snapshot was taken."""
+    try:
+        return {"snapshot": snapshot_id, "statistics": tracemalloc_profiler.top(snapshot_id, **grouping)}
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Snapshot not found")
+
+@router.get("/memory/snapshots/{snapshot_id}/diff/{base_id}")
+def diff_allocations(snapshot_id: int, base_id: int, grouping: dict = Depends(_grouping),
+                     current_user: dict = Depends(require_role(["ADMIN"]))):
+    """Allocation sites whose live memory changed most since snapshot ``base_id``, by absolute change."""
+    try:
+        statistics = tracemalloc_profiler.diff(base_id, snapshot_id, **grouping)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Snapshot not found")
+    return {"snapshot": snapshot_id, "base": base_id, "statistics": statistics}
+
+@router.get("/jobs")
+async def job_queues(failures: int = Query(20, ge=0, le=200, description="Number of recent failed jobs listed"),
+                     db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Depth of the background job queue per type (ready, scheduled, running, finished and the age of
+    the oldest ready job), the jobs this worker is running, and the most recent permanent failures.
+    """
+    return {
+        "runner": {"pid": os.getpid(), "running": job_runner.running, "in_flight": job_runner.in_flight},
+        "queues": await JobService.queue_stats(db),
+        "failures": [
+            {"id": job.id, "type": job.type, "payload": job.payload, "attempts": job.attempts,
+             "created_at": job.created_at, "finished_at": job.finished_at, "last_error": job.last_error}
+            for job in await JobService.recent_failures(db, failures)
+        ],
+    }
+
+@router.post("/jobs/{job_id}/retry", status_code=status.HTTP_204_NO_CONTENT)
+async def retry_job(job_id: int, db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """Queue a failed job again with a fresh set of attempts."""
+    if not await JobService.retry(db, job_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No failed job with this id")
+    job_runner.notify()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/webhooks", response_model=WebhookEndpointResponse, status_code=status.HTTP_201_CREATED)
+async def create_webhook(endpoint: WebhookEndpointCreate, db: AsyncSession = Depends(get_db),
+                         current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Register an endpoint for user lifecycle events. Its signing secret is only returned here: receivers
+    check ``Webhook-Signature`` against it.
+    """
+    created = await WebhookService.create_endpoint(db, endpoint.url, endpoint.events, endpoint.max_concurrency)
+    return WebhookEndpointResponse.model_validate(created)
+
+@router.get("/webhooks")
+async def list_webhooks(db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """Registered endpoints with their pending and failed deliveries and the age of the oldest pending event."""
+    return [
+        {**WebhookEndpointResponse.model_validate(endpoint).model_dump(exclude={"secret"}), **stats}
+        for endpoint, stats in await WebhookService.list_endpoints(db)
+    ]
+
+@router.delete("/webhooks/{endpoint_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_webhook(endpoint_id: UUID, db: AsyncSession = Depends(get_db),
+                         current_user: dict = Depends(require_role(["ADMIN"]))):
+    if not await WebhookService.delete_endpoint(db, endpoint_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook endpoint not found")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/webhooks/{endpoint_id}/retry")
+async def retry_webhook_deliveries(endpoint_id: UUID, db: AsyncSession = Depends(get_db),
+                                   current_user: dict = Depends(require_role(["ADMIN"]))):
+    """Send the deliveries that failed for good to the endpoint again, e.g. after it was fixed."""
+    retried = await WebhookService.retry_failed(db, endpoint_id)
+    webhook_dispatcher.notify()
+    return {"retried": retried}
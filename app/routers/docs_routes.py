@@ -0,0 +1,55 @@
+"""
+Serves the OpenAPI schema and the interactive docs from precomputed bytes.
+
+FastAPI's own routes regenerate the schema lazily in every worker and re-encode it on every request;
+these serve the bytes prepared by ``app.utils.openapi_cache`` with an ETag and long cache headers.
+"""
+
+from builtins import bytes, dict, str
+from functools import lru_cache
+
+from fastapi import APIRouter, Request, Response
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html
+from app.dependencies import get_settings
+from app.utils.conditional import etag_matches
+from app.utils.metrics import record_cache
+from app.utils.openapi_cache import prepare_openapi_schema
+
+OPENAPI_URL = "/openapi.json"
+OAUTH2_REDIRECT_URL = "/docs/oauth2-redirect"
+router = APIRouter(include_in_schema=False)
+settings = get_settings()
+
+def _cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": f"public, max-age={settings.openapi_cache_max_age}"}
+
+@lru_cache(maxsize=None)
+def _html(page: str, title: str, root_path: str) -> bytes:
+    openapi_url = root_path + OPENAPI_URL
+    if page == "redoc":
+        return get_redoc_html(openapi_url=openapi_url, title=f"{title} - ReDoc").body
+    return get_swagger_ui_html(
+        openapi_url=openapi_url, title=f"{title} - Swagger UI", oauth2_redirect_url=root_path + OAUTH2_REDIRECT_URL,
+    ).body
+
+@router.api_route(OPENAPI_URL, methods=["GET", "HEAD"])
+async def openapi(request: Request):
+    schema = prepare_openapi_schema(request.app, settings.openapi_schema_file or None)
+    headers = _cache_headers(schema.etag)
+    if etag_matches(request, schema.etag):
+        record_cache("openapi", hit=True)
+        return Response(status_code=304, headers=headers)
+    record_cache("openapi", hit=False)
+    return Response(content=schema.body, media_type="application/json", headers=headers)
+
+@router.api_route("/docs", methods=["GET", "HEAD"])
+async def swagger_ui(request: Request):
+    return Response(_html("swagger", request.app.title, request.scope.get("root_path", "")), media_type="text/html")
+
+@router.api_route(OAUTH2_REDIRECT_URL, methods=["GET", "HEAD"])
+async def swagger_ui_redirect():
+    return get_swagger_ui_oauth2_redirect_html()
+
+@router.api_route("/redoc", methods=["GET", "HEAD"])
+async def redoc(request: Request):
+    return Response(_html("redoc", request.app.title, request.scope.get("root_path", "")), media_type="text/html")
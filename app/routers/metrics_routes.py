@@ -0,0 +1,14 @@
+"""Prometheus scrape endpoint, for the ``metrics_token`` bearer token or administrators; the proxy does not expose it."""
+
+from fastapi import APIRouter, Depends, Response
+from app.dependencies import require_metrics_access
+from app.utils.metrics import render_metrics
+
+router = APIRouter(include_in_schema=False)
+
+@router.get("/metrics", dependencies=[Depends(require_metrics_access)])
+def metrics():
+    # A plain function: FastAPI runs it in the threadpool, so reading the multiprocess files
+    # never blocks the event loop.
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
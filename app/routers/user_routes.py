@@ -18,27 +18,35 @@ Key Highlights:
 - Utilizes OAuth2PasswordBearer for securing API endpoints, requiring valid access tokens for operations.
 """
 
-from builtins import dict, int, len, str
+from builtins import dict, int, len, str, tuple
 from datetime import timedelta,datetime
 from uuid import UUID
-from typing import Optional
+from typing import Optional, Tuple
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, Response, status, Request, Query
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from app.dependencies import get_current_user, get_db, get_email_service, require_role
+from app.dependencies import (get_current_user, get_db, get_email_service, get_fields, login_rate_limit, register_rate_limit,
+                              require_role)
 from app.models.user_model import User, UserRole
+from app.schemas.link_schema import LinkMode
 from app.schemas.pagination_schema import EnhancedPagination
 from app.schemas.token_schema import TokenResponse
 from app.schemas.user_schemas import LoginRequest, UserBase, UserCreate, UserListResponse, UserResponse, UserUpdate
 from app.services.user_service import UserService
 from app.services.jwt_service import create_access_token
-from app.utils.link_generation import create_user_links, generate_pagination_links
+from app.utils.conditional import CACHE_HEADERS, etag_matches, list_etag, not_modified, user_etag
+from app.utils.metrics import LOGIN_ATTEMPTS, record_cache
+from app.utils.link_generation import build_pagination_links, user_link_builder
+from app.utils.serialization import UserJSONResponse, serialize_user, serialize_user_list, user_response_plan
 from app.dependencies import get_settings
 from app.services.email_service import EmailService
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 settings = get_settings()
+LINKS_QUERY = Query(LinkMode.FULL, description="Hypermedia to include: none, minimal (self link only) or full")
 
 @router.get("/users/search", response_model=UserListResponse, tags=["User Management Requires (Admin or Manager Roles)"])
 async def search_users(
@@ -52,6 +60,8 @@ async def search_users(
     registration_end: Optional[datetime] = Query(None, description="Filter by registration end date(YYYY-MM-DD)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1),
+    links: LinkMode = LINKS_QUERY,
+    fields: Optional[Tuple[str, ...]] = Depends(get_fields),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(require_role(["ADMIN"]))
 ):
@@ -88,30 +98,47 @@ async def search_users(
         registration_start=registration_start,
         registration_end=registration_end,
         skip=skip,
-        limit=limit
+        limit=limit,
+        columns=fields
     )
 
     # Check if no users were found
     if total_users == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    # Convert the users to UserResponse objects
-    user_responses = [UserResponse.model_validate(user) for user in users]
+    # Serialize the trusted rows straight to JSON along with pagination details
+    return UserJSONResponse(serialize_user_list(
+        users, total_users, skip, limit, user_response_plan(fields),
+        user_links=user_link_builder(request, links),
+        links=build_pagination_links(request, skip, limit, total_users, links)
+    ))
 
-    # Generate pagination links
-    pagination_links = generate_pagination_links(request, skip, limit, total_users)
+@router.get("/users/export", tags=["User Management Requires (Admin or Manager Roles)"])
+async def export_users(
+    fields: Optional[Tuple[str, ...]] = Depends(get_fields),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_role(["ADMIN"]))
+):
+    """
+    Export every user as newline-delimited JSON, streamed in primary key order.
 
-    # Return the list of users along with pagination details
-    return UserListResponse(
-        items=user_responses,
-        total=total_users,
-        page=skip // limit + 1,
-        size=len(user_responses),
-        links=pagination_links
-    )
+    - **fields**: optional sparse fieldset; only these columns are selected and returned.
+    """
+    plan = user_response_plan(fields)
+
+    async def export_lines():
+        # The request's session is released before a streaming body is sent, so the
+        # export reuses it for its own transaction and closes it when done.
+        try:
+            async for user in UserService.stream_users(db, columns=fields):
+                yield orjson.dumps(serialize_user(user, plan)) + b"\n"
+        finally:
+            await db.close()
+
+    return StreamingResponse(export_lines(), media_type="application/x-ndjson")
 
 @router.get("/users/{user_id}", response_model=UserResponse, name="get_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def get_user(user_id: UUID, request: Request, links: LinkMode = LINKS_QUERY, fields: Optional[Tuple[str, ...]] = Depends(get_fields), db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Endpoint to fetch a user by their unique identifier (UUID).
 
@@ -124,27 +151,24 @@ async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(g
         db: Dependency that provides an AsyncSession for database access.
         token: The OAuth2 access token obtained through OAuth2PasswordBearer dependency.
     """
-    user = await UserService.get_by_id(db, user_id)
+    if request.headers.get("if-none-match"):
+        # Revalidation: compare against a probe of updated_at before loading and serializing the row
+        updated_at = await UserService.get_version(db, user_id)
+        if updated_at is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        etag = user_etag(user_id, updated_at)
+        if etag_matches(request, etag):
+            record_cache("user", hit=True)
+            return not_modified(etag)
+
+    # updated_at is always loaded for the ETag, even when it is not part of the fieldset
+    user = await UserService.get_by_id(db, user_id, fields + ("updated_at",) if fields else None)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    return UserResponse.model_construct(
-        id=user.id,
-        nickname=user.nickname,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        bio=user.bio,
-        profile_picture_url=user.profile_picture_url,
-        github_profile_url=user.github_profile_url,
-        linkedin_profile_url=user.linkedin_profile_url,
-        role=user.role,
-        email=user.email,
-        last_login_at=user.last_login_at,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-        links=create_user_links(user.id, request),
-        is_professional = user.is_professional
-    )
+    record_cache("user", hit=False)
+    return UserJSONResponse(serialize_user(user, user_response_plan(fields), user_link_builder(request, links)),
+                            headers={"ETag": user_etag(user.id, user.updated_at), **CACHE_HEADERS})
 
 # Additional endpoints for update, delete, create, and list users follow a similar pattern, using
 # asynchronous database operations, handling security with OAuth2PasswordBearer, and enhancing response
@@ -154,7 +178,7 @@ async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(g
 # experience by adhering to REST principles and providing self-discoverable operations.
 
 @router.put("/users/{user_id}", response_model=UserResponse, name="update_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def update_user(user_id: UUID, user_update: UserUpdate, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def update_user(user_id: UUID, user_update: UserUpdate, request: Request, links: LinkMode = LINKS_QUERY, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Update user information.
 
@@ -166,22 +190,7 @@ async def update_user(user_id: UUID, user_update: UserUpdate, request: Request,
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    return UserResponse.model_construct(
-        id=updated_user.id,
-        bio=updated_user.bio,
-        first_name=updated_user.first_name,
-        last_name=updated_user.last_name,
-        nickname=updated_user.nickname,
-        email=updated_user.email,
-        role=updated_user.role,
-        last_login_at=updated_user.last_login_at,
-        profile_picture_url=updated_user.profile_picture_url,
-        github_profile_url=updated_user.github_profile_url,
-        linkedin_profile_url=updated_user.linkedin_profile_url,
-        created_at=updated_user.created_at,
-        updated_at=updated_user.updated_at,
-        links=create_user_links(updated_user.id, request)
-    )
+    return UserJSONResponse(serialize_user(updated_user, user_links=user_link_builder(request, links)))
 
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, name="delete_user", tags=["User Management Requires (Admin or Manager Roles)"])
@@ -199,7 +208,7 @@ async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token:
 
 
 @router.post("/users/", response_model=UserResponse, status_code=status.HTTP_201_CREATED, tags=["User Management Requires (Admin or Manager Roles)"], name="create_user")
-async def create_user(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def create_user(user: UserCreate, request: Request, links: LinkMode = LINKS_QUERY, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Create a new user.
 
@@ -224,20 +233,8 @@ async def create_user(user: UserCreate, request: Request, db: AsyncSession = Dep
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create user")
     
     
-    return UserResponse.model_construct(
-        id=created_user.id,
-        bio=created_user.bio,
-        first_name=created_user.first_name,
-        last_name=created_user.last_name,
-        profile_picture_url=created_user.profile_picture_url,
-        nickname=created_user.nickname,
-        email=created_user.email,
-        role=created_user.role,
-        last_login_at=created_user.last_login_at,
-        created_at=created_user.created_at,
-        updated_at=created_user.updated_at,
-        links=create_user_links(created_user.id, request)
-    )
+    return UserJSONResponse(serialize_user(created_user, user_links=user_link_builder(request, links)),
+                            status_code=status.HTTP_201_CREATED)
 
 
 @router.get("/users/", response_model=UserListResponse, tags=["User Management Requires (Admin or Manager Roles)"])
@@ -245,36 +242,37 @@ async def list_users(
     request: Request,
     skip: int = 0,
     limit: int = 10,
+    links: LinkMode = LINKS_QUERY,
+    fields: Optional[Tuple[str, ...]] = Depends(get_fields),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
 ):
-    total_users = await UserService.count(db)
-    users = await UserService.list_users(db, skip, limit)
+    total_users, last_updated_at = await UserService.list_version(db)
+    etag = list_etag(total_users, last_updated_at)
+    if etag_matches(request, etag):
+        record_cache("user_list", hit=True)
+        return not_modified(etag)
+    record_cache("user_list", hit=False)
+    users = await UserService.list_users(db, skip, limit, fields)
 
-    user_responses = [
-        UserResponse.model_validate(user) for user in users
-    ]
-    
-    pagination_links = generate_pagination_links(request, skip, limit, total_users)
-    
     # Construct the final response with pagination details
-    return UserListResponse(
-        items=user_responses,
-        total=total_users,
-        page=skip // limit + 1,
-        size=len(user_responses),
-        links=pagination_links  # Ensure you have appropriate logic to create these links
-    )
+    return UserJSONResponse(serialize_user_list(
+        users, total_users, skip, limit, user_response_plan(fields),
+        user_links=user_link_builder(request, links),
+        links=build_pagination_links(request, skip, limit, total_users, links)
+    ), headers={"ETag": etag, **CACHE_HEADERS})
 
 
-@router.post("/register/", response_model=UserResponse, tags=["Login and Registration"])
+@router.post("/register/", response_model=UserResponse, tags=["Login and Registration"],
+             dependencies=[Depends(register_rate_limit)], responses={429: {"description": "Rate limited, see Retry-After"}})
 async def register(user_data: UserCreate, session: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service)):
     user = await UserService.register_user(session, user_data.model_dump(), email_service)
     if user:
-        return user
+        return UserJSONResponse(serialize_user(user))
     raise HTTPException(status_code=400, detail="Email already exists")
 
-@router.post("/login/", response_model=TokenResponse, tags=["Login and Registration"])
+@router.post("/login/", response_model=TokenResponse, tags=["Login and Registration"],
+             dependencies=[Depends(login_rate_limit)], responses={429: {"description": "Rate limited, see Retry-After"}})
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
     # Check if the provided username and password match the default admin credentials
     if form_data.username == settings.admin_user and form_data.password == settings.admin_password:
@@ -285,6 +283,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Async
             data={"sub": form_data.username, "role": "ADMIN"},
             expires_delta=access_token_expires
         )
+        LOGIN_ATTEMPTS.labels("success").inc()
         return {"access_token": access_token, "token_type": "bearer"}
 
     # If not using the default admin credentials, proceed with normal user login
@@ -6,9 +6,15 @@ from enum import Enum
 import uuid
 import re
 from app.models.user_model import UserRole
-from app.utils.nickname_gen import generate_nickname
+from app.schemas.link_schema import Link
+from app.schemas.pagination_schema import PaginationLink
 
 
+# OpenAPI examples are plain constants: nothing is generated at import time, and the schema is
+# identical in every worker and on every start.
+EXAMPLE_USER_ID = "3fa85f64-5717-4562-b3fc-2c963f66afa6"
+EXAMPLE_NICKNAME = "clever_panda_123"
+
 def validate_url(url: Optional[str]) -> Optional[str]:
     if url is None:
         return url
@@ -19,7 +25,7 @@ def validate_url(url: Optional[str]) -> Optional[str]:
 
 class UserBase(BaseModel):
     email: EmailStr = Field(..., example="john.doe@example.com")
-    nickname: Optional[str] = Field(None, min_length=3, pattern=r'^[\w-]+$', example=generate_nickname())
+    nickname: Optional[str] = Field(None, min_length=3, pattern=r'^[\w-]+$', example=EXAMPLE_NICKNAME)
     first_name: Optional[str] = Field(None, example="John")
     last_name: Optional[str] = Field(None, example="Doe")
     bio: Optional[str] = Field(None, example="Experienced software developer specializing in web applications.")
@@ -55,11 +61,12 @@ class UserUpdate(UserBase):
         return values
 
 class UserResponse(UserBase):
-    id: uuid.UUID = Field(..., example=uuid.uuid4())
+    id: uuid.UUID = Field(..., example=EXAMPLE_USER_ID)
     email: EmailStr = Field(..., example="john.doe@example.com")
-    nickname: Optional[str] = Field(None, min_length=3, pattern=r'^[\w-]+$', example=generate_nickname())    
+    nickname: Optional[str] = Field(None, min_length=3, pattern=r'^[\w-]+$', example=EXAMPLE_NICKNAME)    
     is_professional: Optional[bool] = Field(default=False, example=True)
     role: UserRole
+    links: List[Link] = Field(default=[], description="HATEOAS links, controlled by the links query parameter.")
 
 class LoginRequest(BaseModel):
     email: str = Field(..., example="john.doe@example.com")
@@ -71,7 +78,7 @@ class ErrorResponse(BaseModel):
 
 class UserListResponse(BaseModel):
     items: List[UserResponse] = Field(..., example=[{
-        "id": uuid.uuid4(), "nickname": generate_nickname(), "email": "john.doe@example.com",
+        "id": EXAMPLE_USER_ID, "nickname": EXAMPLE_NICKNAME, "email": "john.doe@example.com",
         "first_name": "John", "bio": "Experienced developer", "role": "AUTHENTICATED",
         "last_name": "Doe", "bio": "Experienced developer", "role": "AUTHENTICATED",
         "profile_picture_url": "https://example.com/profiles/john.jpg", 
@@ -81,3 +88,4 @@ class UserListResponse(BaseModel):
     total: int = Field(..., example=100)
     page: int = Field(..., example=1)
     size: int = Field(..., example=10)
+    links: List[PaginationLink] = Field(default=[], description="Pagination links, controlled by the links query parameter.")
@@ -0,0 +1,26 @@
+from builtins import str
+from datetime import datetime
+from typing import List, Optional
+import uuid
+from pydantic import BaseModel, Field, validator
+from app.models.webhook_model import UserEvent
+from app.schemas.user_schemas import validate_url
+
+class WebhookEndpointCreate(BaseModel):
+    url: str = Field(..., max_length=2048, example="https://crm.example.com/hooks/users")
+    events: List[UserEvent] = Field(default=[], description="Event types sent to the endpoint; empty for all of them.",
+                                    example=["user.created", "user.deleted"])
+    max_concurrency: int = Field(default=1, ge=1, le=20, description="Batches in flight to the endpoint at the same time.")
+
+    _validate_url = validator('url', pre=True, allow_reuse=True)(validate_url)
+
+class WebhookEndpointResponse(BaseModel):
+    id: uuid.UUID
+    url: str
+    events: List[str]
+    max_concurrency: int
+    created_at: datetime
+    secret: Optional[str] = Field(None, description="Key of the Webhook-Signature HMAC, only returned when the endpoint is created.")
+
+    class Config:
+        from_attributes = True
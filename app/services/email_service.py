@@ -1,9 +1,11 @@
 # email_service.py
-from builtins import ValueError, dict, str
+from builtins import Exception, ValueError, dict, str
 from settings.config import settings
 from app.utils.smtp_connection import SMTPClient
 from app.utils.template_manager import TemplateManager
 from app.models.user_model import User
+from app.utils.metrics import EMAIL_SEND_DURATION, EMAIL_SEND_FAILURES
+from app.utils.timing import timed
 
 class EmailService:
     def __init__(self, template_manager: TemplateManager):
@@ -15,6 +17,7 @@ class EmailService:
         )
         self.template_manager = template_manager
 
+    @timed("email")
     async def send_user_email(self, user_data: dict, email_type: str):
         subject_map = {
             'email_verification': "Verify Your Account",
@@ -25,8 +28,13 @@ class EmailService:
         if email_type not in subject_map:
             raise ValueError("Invalid email type")
 
-        html_content = self.template_manager.render_template(email_type, **user_data)
-        self.smtp_client.send_email(subject_map[email_type], html_content, user_data['email'])
+        try:
+            with EMAIL_SEND_DURATION.labels(email_type).time():
+                html_content = self.template_manager.render_template(email_type, **user_data)
+                self.smtp_client.send_email(subject_map[email_type], html_content, user_data['email'])
+        except Exception:
+            EMAIL_SEND_FAILURES.labels(email_type).inc()
+            raise
 
     async def send_verification_email(self, user: User):
         verification_url = f"{settings.server_base_url}verify-email/{user.id}/{user.verification_token}"
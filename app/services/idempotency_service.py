@@ -0,0 +1,91 @@
+from builtins import bytes, classmethod, float, int, list, str
+from datetime import timedelta
+from enum import Enum
+from typing import Optional, Tuple
+from sqlalchemy import Interval, and_, bindparam, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.idempotency_model import IdempotencyKey
+
+class ClaimState(Enum):
+    CLAIMED = "claimed"        # the caller runs the request and completes or releases the key
+    COMPLETED = "completed"    # the stored response is to be replayed
+    IN_FLIGHT = "in_flight"    # an identical request is running, in this worker or another one
+    MISMATCH = "mismatch"      # the key was used for a different request
+
+
+_claim = insert(IdempotencyKey).values(
+    client=bindparam("client"),
+    key=bindparam("key"),
+    fingerprint=bindparam("fingerprint"),
+    locked_until=func.now() + bindparam("lock_timeout", type_=Interval()),
+    expires_at=func.now() + bindparam("ttl", type_=Interval()),
+)
+# Claiming is one statement, so of two concurrent duplicates exactly one gets the row back. An
+# existing key is only taken over once it expired, or when its first request was abandoned.
+CLAIM_STATEMENT = _claim.on_conflict_do_update(
+    index_elements=[IdempotencyKey.client, IdempotencyKey.key],
+    set_={
+        "fingerprint": _claim.excluded.fingerprint,
+        "status_code": None,
+        "headers": None,
+        "body": None,
+        "locked_until": _claim.excluded.locked_until,
+        "expires_at": _claim.excluded.expires_at,
+    },
+    where=or_(
+        IdempotencyKey.expires_at < func.now(),
+        and_(IdempotencyKey.status_code.is_(None), IdempotencyKey.locked_until < func.now(),
+             IdempotencyKey.fingerprint == _claim.excluded.fingerprint),
+    ),
+).returning(IdempotencyKey.client)
+KEY_STATEMENT = select(IdempotencyKey).where(
+    IdempotencyKey.client == bindparam("client"), IdempotencyKey.key == bindparam("key"),
+).execution_options(populate_existing=True)
+
+class IdempotencyService:
+    @classmethod
+    async def claim(cls, session: AsyncSession, client: str, key: str, fingerprint: str,
+                    ttl: float, lock_timeout: float) -> Tuple[ClaimState, Optional[IdempotencyKey]]:
+        """Claim ``key`` for a request, or report what the earlier request with it left behind."""
+        parameters = {"client": client, "key": key, "fingerprint": fingerprint,
+                      "ttl": timedelta(seconds=ttl), "lock_timeout": timedelta(seconds=lock_timeout)}
+        record = None
+        while record is None:
+            claimed = await session.scalar(CLAIM_STATEMENT, parameters)
+            await session.commit()
+            if claimed is not None:
+                return ClaimState.CLAIMED, None
+            # None when a failed first request released the key in between: claim again.
+            record = await session.scalar(KEY_STATEMENT, {"client": client, "key": key})
+        if record.fingerprint != fingerprint:
+            return ClaimState.MISMATCH, record
+        if record.status_code is None:
+            return ClaimState.IN_FLIGHT, record
+        return ClaimState.COMPLETED, record
+
+    @classmethod
+    async def complete(cls, session: AsyncSession, client: str, key: str, status_code: int, headers: list,
+                       body: bytes) -> None:
+        """Store the response of a claimed key."""
+        await session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.client == client, IdempotencyKey.key == key)
+            .values(status_code=status_code, headers=headers, body=body)
+        )
+        await session.commit()
+
+    @classmethod
+    async def release(cls, session: AsyncSession, client: str, key: str) -> None:
+        """Forget a claimed key whose request failed, so that a retry runs it again."""
+        await session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.client == client, IdempotencyKey.key == key,
+                                         IdempotencyKey.status_code.is_(None))
+        )
+        await session.commit()
+
+    @classmethod
+    async def purge_expired(cls, session: AsyncSession) -> int:
+        result = await session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < func.now()))
+        await session.commit()
+        return result.rowcount
@@ -0,0 +1,151 @@
+from builtins import classmethod, float, int, len, list, str
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Interval, bindparam, case, delete, func, literal, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.job_model import Job, JobStatus
+
+UNIQUE_KEY_WHERE = text("unique_key IS NOT NULL AND status IN ('QUEUED', 'RUNNING')")
+
+# Claiming locks the oldest ready jobs of one type, skipping rows other workers are claiming at the
+# same moment, and marks them running under a lease, all in one round trip.
+_ready = (
+    select(Job.id)
+    .where(Job.status == JobStatus.QUEUED, Job.type == bindparam("job_type"), Job.run_at <= func.now())
+    .order_by(Job.run_at, Job.id)
+    .limit(bindparam("batch"))
+    .with_for_update(skip_locked=True)
+)
+CLAIM_STATEMENT = (
+    update(Job)
+    .where(Job.id.in_(_ready))
+    .values(status=JobStatus.RUNNING, attempts=Job.attempts + 1, locked_by=bindparam("claimed_by"),
+            locked_until=func.now() + bindparam("lease_length", type_=Interval()))
+    .returning(Job)
+    .execution_options(synchronize_session=False)
+)
+# Attempts whose worker died (its lease ran out) go back to the queue, or fail once they are used up.
+RECOVER_STATEMENT = (
+    update(Job)
+    .where(Job.status == JobStatus.RUNNING, Job.locked_until < func.now())
+    .values(
+        status=case((Job.attempts >= Job.max_attempts, literal(JobStatus.FAILED, Job.status.type)),
+                    else_=literal(JobStatus.QUEUED, Job.status.type)),
+        finished_at=case((Job.attempts >= Job.max_attempts, func.now())),
+        locked_by=None,
+        locked_until=None,
+        last_error="Lease expired before the attempt finished",
+    )
+    .returning(Job.id)
+    .execution_options(synchronize_session=False)
+)
+
+class JobService:
+    @classmethod
+    async def enqueue(cls, session: AsyncSession, job_type: str, payload: Optional[Dict[str, Any]] = None,
+                      max_attempts: int = 5, run_at: Optional[datetime] = None, delay: float = 0,
+                      unique_key: Optional[str] = None) -> Optional[int]:
+        """
+        Add a job to the session's transaction, so that it is only queued if the caller commits.
+
+        Returns its id, or ``None`` when a queued or running job of the same type already has
+        ``unique_key``.
+        """
+        statement = insert(Job).values(
+            type=job_type,
+            payload=payload or {},
+            max_attempts=max_attempts,
+            run_at=run_at if run_at is not None else func.now() + timedelta(seconds=delay),
+            unique_key=unique_key,
+        ).on_conflict_do_nothing(index_elements=[Job.type, Job.unique_key], index_where=UNIQUE_KEY_WHERE)
+        return await session.scalar(statement.returning(Job.id))
+
+    @classmethod
+    async def claim(cls, session: AsyncSession, job_type: str, limit: int, worker: str, lease: float) -> List[Job]:
+        jobs = list(await session.scalars(CLAIM_STATEMENT, {
+            "job_type": job_type, "batch": limit, "claimed_by": worker, "lease_length": timedelta(seconds=lease),
+        }))
+        await session.commit()
+        return jobs
+
+    @classmethod
+    async def complete(cls, session: AsyncSession, job: Job) -> None:
+        await session.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == JobStatus.RUNNING, Job.locked_by == job.locked_by)
+            .values(status=JobStatus.SUCCEEDED, finished_at=func.now(), locked_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+    @classmethod
+    async def fail(cls, session: AsyncSession, job: Job, error: str, retry_delay: Optional[float]) -> None:
+        """Record a failed attempt: requeue the job after ``retry_delay`` seconds, or fail it for good with ``None``."""
+        values: Dict[str, Any] = {"last_error": error, "locked_by": None, "locked_until": None}
+        if retry_delay is None:
+            values.update(status=JobStatus.FAILED, finished_at=func.now())
+        else:
+            values.update(status=JobStatus.QUEUED, run_at=func.now() + timedelta(seconds=retry_delay))
+        await session.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == JobStatus.RUNNING, Job.locked_by == job.locked_by)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+    @classmethod
+    async def recover_expired(cls, session: AsyncSession) -> int:
+        recovered = len((await session.execute(RECOVER_STATEMENT)).all())
+        await session.commit()
+        return recovered
+
+    @classmethod
+    async def retry(cls, session: AsyncSession, job_id: int) -> bool:
+        """Queue a failed job again with a fresh set of attempts."""
+        retried = await session.scalar(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.FAILED)
+            .values(status=JobStatus.QUEUED, attempts=0, run_at=func.now(), finished_at=None)
+            .returning(Job.id)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return retried is not None
+
+    @classmethod
+    async def purge_finished(cls, session: AsyncSession, older_than: float) -> int:
+        result = await session.execute(
+            delete(Job).where(Job.status.in_([JobStatus.SUCCEEDED, JobStatus.FAILED]),
+                              Job.finished_at < func.now() - timedelta(seconds=older_than))
+        )
+        await session.commit()
+        return result.rowcount
+
+    @classmethod
+    async def queue_stats(cls, session: AsyncSession) -> List[Dict[str, Any]]:
+        """Jobs per type and status: queued ones split into ready and scheduled, with the age of the oldest ready one."""
+        ready = (Job.status == JobStatus.QUEUED) & (Job.run_at <= func.now())
+        rows = await session.execute(
+            select(
+                Job.type,
+                func.count().filter(ready),
+                func.count().filter(Job.status == JobStatus.QUEUED),
+                func.count().filter(Job.status == JobStatus.RUNNING),
+                func.count().filter(Job.status == JobStatus.SUCCEEDED),
+                func.count().filter(Job.status == JobStatus.FAILED),
+                func.extract("epoch", func.now() - func.min(Job.run_at).filter(ready)),
+            ).group_by(Job.type).order_by(Job.type)
+        )
+        return [
+            {"type": job_type, "ready": ready_count, "scheduled": queued - ready_count, "running": running,
+             "succeeded": succeeded, "failed": failed, "oldest_ready_age_seconds": float(age) if age is not None else None}
+            for job_type, ready_count, queued, running, succeeded, failed, age in rows
+        ]
+
+    @classmethod
+    async def recent_failures(cls, session: AsyncSession, limit: int = 20) -> List[Job]:
+        return list(await session.scalars(
+            select(Job).where(Job.status == JobStatus.FAILED).order_by(Job.finished_at.desc()).limit(limit)
+        ))
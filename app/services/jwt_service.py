@@ -3,7 +3,9 @@ from builtins import dict, str
 import jwt
 from datetime import datetime, timedelta
 from settings.config import settings
+from app.utils.timing import timed
 
+@timed("jwt")
 def create_access_token(*, data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     # Convert role to uppercase before encoding the JWT
@@ -14,6 +16,7 @@ def create_access_token(*, data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
+@timed("jwt")
 def decode_token(token: str):
     try:
         decoded = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
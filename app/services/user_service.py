@@ -1,45 +1,97 @@
 from builtins import Exception, bool, classmethod, int, str
 from datetime import datetime, timezone
 import secrets
-from typing import Optional, Dict, List
+from typing import AsyncIterator, Optional, Dict, List, Sequence, Tuple
 from pydantic import ValidationError
-from sqlalchemy import func, null, update, select, and_
+from sqlalchemy import bindparam, case, func, literal, null, update, select, and_
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from app.dependencies import get_email_service, get_settings
 from app.models.user_model import User
+from app.models.webhook_model import UserEvent
 from app.schemas.user_schemas import UserCreate, UserUpdate
+from app.utils.metrics import ACCOUNT_LOCKOUTS, LOGIN_ATTEMPTS
 from app.utils.nickname_gen import generate_nickname
-from app.utils.security import generate_verification_token, hash_password, verify_password
+from app.utils.security import generate_verification_token, hash_password, hash_verification_token, verify_password
 from uuid import UUID
 from app.services.email_service import EmailService
+from app.services.webhook_service import USER_EVENT_COLUMNS, WebhookService
 from app.models.user_model import UserRole
 import logging
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Verification is a single conditional UPDATE: the token hash, expiry and verified flag are all
+# checked by Postgres, so a valid click costs one round trip and no row fetch. The hash is kept
+# after success so that repeated clicks on the same link can still be recognised.
+VERIFY_EMAIL_STATEMENT = (
+    update(User.__table__)
+    .where(
+        User.id == bindparam("user_id"),
+        User.verification_token_hash == bindparam("token_hash"),
+        User.email_verified.is_(False),
+        User.verification_token_expires_at > func.now(),
+    )
+    .values(
+        email_verified=True,
+        # Only change the role to AUTHENTICATED if the current role is ANONYMOUS
+        role=case((User.role == literal(UserRole.ANONYMOUS, User.role.type),
+                   literal(UserRole.AUTHENTICATED, User.role.type)), else_=User.role),
+    )
+    .returning(*USER_EVENT_COLUMNS)
+)
+EMAIL_VERIFIED_STATEMENT = select(User.email_verified).where(
+    User.id == bindparam("user_id"), User.verification_token_hash == bindparam("token_hash"))
+
+# Lightweight version probes for conditional GETs: they read only what the ETags are derived from.
+USER_VERSION_STATEMENT = select(User.updated_at).where(User.id == bindparam("user_id"))
+LIST_VERSION_STATEMENT = select(func.count(User.id), func.max(User.updated_at))
+
 class UserService:
+    # Hot lookups are built once per filter signature and executed with bound
+    # parameters, so SQLAlchemy reuses its compiled form and asyncpg sees the
+    # same SQL text (and can reuse its prepared statement) on every call.
+    _lookup_statements: Dict[tuple, object] = {}
+
+    @classmethod
+    def _lookup_statement(cls, keys: tuple, columns: Optional[Sequence[str]] = None):
+        cache_key = (keys, tuple(columns) if columns else None)
+        statement = cls._lookup_statements.get(cache_key)
+        if statement is None:
+            statement = cls._select_users(columns).where(*(getattr(User, key) == bindparam(key) for key in keys))
+            cls._lookup_statements[cache_key] = statement
+        return statement
+
+    @classmethod
+    def _select_users(cls, columns: Optional[Sequence[str]] = None):
+        """SELECT over users, restricted to ``columns`` (plus the primary key) when given."""
+        query = select(User)
+        if columns:
+            query = query.options(load_only(*(getattr(User, column) for column in columns)))
+        return query
+
     @classmethod
-    async def _execute_query(cls, session: AsyncSession, query):
+    async def _execute_query(cls, session: AsyncSession, query, params: Optional[Dict] = None):
         try:
-            result = await session.execute(query)
+            result = await session.execute(query, params)
             await session.commit()
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Database error: {e}")
+            logger.error("Database error: %s", e)
             await session.rollback()
             return None
 
     @classmethod
-    async def _fetch_user(cls, session: AsyncSession, **filters) -> Optional[User]:
-        query = select(User).filter_by(**filters)
-        result = await cls._execute_query(session, query)
+    async def _fetch_user(cls, session: AsyncSession, columns: Optional[Sequence[str]] = None, **filters) -> Optional[User]:
+        query = cls._lookup_statement(tuple(sorted(filters)), columns)
+        result = await cls._execute_query(session, query, filters)
         return result.scalars().first() if result else None
 
     @classmethod
-    async def get_by_id(cls, session: AsyncSession, user_id: UUID) -> Optional[User]:
-        return await cls._fetch_user(session, id=user_id)
+    async def get_by_id(cls, session: AsyncSession, user_id: UUID, columns: Optional[Sequence[str]] = None) -> Optional[User]:
+        return await cls._fetch_user(session, columns, id=user_id)
 
     @classmethod
     async def get_by_nickname(cls, session: AsyncSession, nickname: str) -> Optional[User]:
@@ -49,6 +101,10 @@ class UserService:
     async def get_by_email(cls, session: AsyncSession, email: str) -> Optional[User]:
         return await cls._fetch_user(session, email=email)
 
+    @classmethod
+    async def get_by_verification_token(cls, session: AsyncSession, user_id: UUID, token: str) -> Optional[User]:
+        return await cls._fetch_user(session, id=user_id, verification_token_hash=hash_verification_token(token))
+
     @classmethod
     async def create(cls, session: AsyncSession, user_data: Dict[str, str], email_service: EmailService) -> Optional[User]:
         try:
@@ -65,7 +121,7 @@ class UserService:
             while await cls.get_by_nickname(session, new_nickname):
                 new_nickname = generate_nickname()
             new_user.nickname = new_nickname
-            logger.info(f"User Role: {new_user.role}")
+            logger.info("User Role: %s", new_user.role)
             # Determine the user's role
             user_count = await cls.count(session)
             new_user.role = UserRole.ADMIN if user_count == 0 else UserRole.ANONYMOUS
@@ -74,11 +130,13 @@ class UserService:
             new_user.verification_token = generate_verification_token()
 
             session.add(new_user)
+            await session.flush()
+            await WebhookService.record(session, UserEvent.CREATED, new_user)
             await session.commit()
             await email_service.send_verification_email(new_user)
             return new_user
         except ValidationError as e:
-            logger.error(f"Validation error during user creation: {e}")
+            logger.error("Validation error during user creation: %s", e)
             return None
 
     @classmethod
@@ -93,36 +151,51 @@ class UserService:
 
             query = update(User).where(User.id == user_id).values(**validated_data).execution_options(
                 synchronize_session="fetch")
-            await cls._execute_query(session, query)
-
-            updated_user = await cls.get_by_id(session, user_id)
+            await session.execute(query)
+            # Reloaded before committing, so the event is written in the transaction of the update.
+            updated_user = await session.get(User, user_id, populate_existing=True)
+            if updated_user:
+                await WebhookService.record(session, UserEvent.UPDATED, updated_user)
+            await session.commit()
             if updated_user:
-                session.refresh(updated_user)
-                logger.info(f"User {user_id} updated successfully.")
+                logger.info("User %s updated successfully.", user_id)
                 return updated_user
             else:
-                logger.error(f"User {user_id} not found after update attempt.")
+                logger.error("User %s not found after update attempt.", user_id)
             return None
         except Exception as e:
-            logger.error(f"Error during user update: {e}")
+            logger.error("Error during user update: %s", e)
+            await session.rollback()
             return None
 
     @classmethod
     async def delete(cls, session: AsyncSession, user_id: UUID) -> bool:
         user = await cls.get_by_id(session, user_id)
         if not user:
-            logger.info(f"User with ID {user_id} not found.")
+            logger.info("User with ID %s not found.", user_id)
             return False
         await session.delete(user)
+        await WebhookService.record(session, UserEvent.DELETED, user)
         await session.commit()
         return True
 
     @classmethod
-    async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10) -> List[User]:
-        query = select(User).offset(skip).limit(limit)
+    async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10,
+                         columns: Optional[Sequence[str]] = None) -> List[User]:
+        # Order by primary key so a page is fully determined by the table contents.
+        query = cls._select_users(columns).order_by(User.id).offset(skip).limit(limit)
         result = await cls._execute_query(session, query)
         return result.scalars().all() if result else []
 
+    @classmethod
+    async def stream_users(cls, session: AsyncSession, columns: Optional[Sequence[str]] = None,
+                           batch_size: int = 1000) -> AsyncIterator[User]:
+        """Yield every user in primary key order, fetching ``batch_size`` rows at a time from a server-side cursor."""
+        query = cls._select_users(columns).order_by(User.id).execution_options(yield_per=batch_size)
+        result = await session.stream_scalars(query)
+        async for user in result:
+            yield user
+
     @classmethod
     async def register_user(cls, session: AsyncSession, user_data: Dict[str, str], get_email_service) -> Optional[User]:
         return await cls.create(session, user_data, get_email_service)
@@ -133,21 +206,27 @@ class UserService:
         user = await cls.get_by_email(session, email)
         if user:
             if user.email_verified is False:
+                LOGIN_ATTEMPTS.labels("unverified").inc()
                 return None
             if user.is_locked:
+                LOGIN_ATTEMPTS.labels("locked").inc()
                 return None
             if verify_password(password, user.hashed_password):
                 user.failed_login_attempts = 0
                 user.last_login_at = datetime.now(timezone.utc)
                 session.add(user)
                 await session.commit()
+                LOGIN_ATTEMPTS.labels("success").inc()
                 return user
             else:
                 user.failed_login_attempts += 1
                 if user.failed_login_attempts >= settings.max_login_attempts:
                     user.is_locked = True
+                    ACCOUNT_LOCKOUTS.inc()
+                    await WebhookService.record(session, UserEvent.LOCKED, user)
                 session.add(user)
                 await session.commit()
+        LOGIN_ATTEMPTS.labels("failure").inc()
         return None
 
     @classmethod
@@ -171,17 +250,23 @@ class UserService:
 
     @classmethod
     async def verify_email_with_token(cls, session: AsyncSession, user_id: UUID, token: str) -> bool:
-        user = await cls.get_by_id(session, user_id)
-        if user and user.verification_token == token:
-            user.email_verified = True
-            user.verification_token = None  # Clear the token once used
-            # Only change the role to AUTHENTICATED if the current role is ANONYMOUS
-            if user.role == UserRole.ANONYMOUS:
-                user.role = UserRole.AUTHENTICATED
-            session.add(user)
-            await session.commit()
-            return True
-        return False
+        params = {"user_id": user_id, "token_hash": hash_verification_token(token)}
+        try:
+            result = await session.execute(VERIFY_EMAIL_STATEMENT, params)
+            verified_user = result.first()
+            if verified_user is not None:
+                await WebhookService.record(session, UserEvent.EMAIL_VERIFIED, verified_user)
+                await session.commit()
+                return True
+            # Repeated clicks on an already used link are answered from a single-column read, without a write.
+            result = await session.execute(EMAIL_VERIFIED_STATEMENT, params)
+            verified = result.scalar() is True
+            await session.rollback()
+            return verified
+        except SQLAlchemyError as e:
+            logger.error("Database error: %s", e)
+            await session.rollback()
+            return False
 
     @classmethod
     async def count(cls, session: AsyncSession) -> int:
@@ -195,6 +280,23 @@ class UserService:
         result = await session.execute(query)
         count = result.scalar()
         return count
+
+    @classmethod
+    async def get_version(cls, session: AsyncSession, user_id: UUID) -> Optional[datetime]:
+        """
+        Return the ``updated_at`` of a user without loading the row, or None if it does not exist.
+        """
+        result = await session.execute(USER_VERSION_STATEMENT, {"user_id": user_id})
+        return result.scalar_one_or_none()
+
+    @classmethod
+    async def list_version(cls, session: AsyncSession) -> Tuple[int, Optional[datetime]]:
+        """
+        Return the number of users and the newest ``updated_at``, which together version every list page.
+        """
+        result = await session.execute(LIST_VERSION_STATEMENT)
+        total, last_updated_at = result.one()
+        return total, last_updated_at
     
     @classmethod
     async def unlock_user_account(cls, session: AsyncSession, user_id: UUID) -> bool:
@@ -219,54 +321,45 @@ class UserService:
             registration_start: Optional[datetime] = None,
             registration_end: Optional[datetime] = None,
             skip: int = 0,
-            limit: int = 10
+            limit: int = 10,
+            columns: Optional[Sequence[str]] = None
     ):
 
-        query = select(User)
+        conditions = []
 
         # Filter by username (case-insensitive)
         if username:
-            query = query.filter(User.nickname.ilike(f"%{username}%"))
+            conditions.append(User.nickname.ilike(f"%{username}%"))
 
         # Filter by email (case-insensitive)
         if email:
-            query = query.filter(User.email.ilike(f"%{email}%"))
+            conditions.append(User.email.ilike(f"%{email}%"))
 
         # Filter by role
         if role:
-            query = query.filter(User.role == role)
+            conditions.append(User.role == role)
 
         # Filter by professional status
         if is_professional is not None:
-            query = query.filter(User.is_professional == is_professional)
+            conditions.append(User.is_professional == is_professional)
 
         # Filter by locked account status
         if is_locked is not None:
-            query = query.filter(User.is_locked == is_locked)
+            conditions.append(User.is_locked == is_locked)
 
         # Filter by registration date range
         if registration_start:
-            query = query.filter(User.created_at >= registration_start)
+            conditions.append(User.created_at >= registration_start)
         if registration_end:
-            query = query.filter(User.created_at <= registration_end)
+            conditions.append(User.created_at <= registration_end)
 
-        # Execute the query and paginate the results
-        query = query.offset(skip).limit(limit)
+        # The same condition list drives both statements, so each filter combination
+        # always renders to the same SQL text and hits the compiled/prepared caches.
+        query = cls._select_users(columns).where(*conditions).offset(skip).limit(limit)
         result = await session.execute(query)
-
-        # Retrieve the results and the total count
         users = result.scalars().all()
-        total_count_query = select(func.count(User.id)).filter(
-            and_(
-                User.nickname.ilike(f"%{username}%") if username else True,
-                User.email.ilike(f"%{email}%") if email else True,
-                User.role == role if role else True,
-                User.is_professional == is_professional if is_professional is not None else True,
-                User.is_locked == is_locked if is_locked is not None else True,
-                User.created_at >= registration_start if registration_start else True,
-                User.created_at <= registration_end if registration_end else True
-            )
-        )
+
+        total_count_query = select(func.count(User.id)).where(*conditions)
         total_count_result = await session.execute(total_count_query)
         total_users = total_count_result.scalar()
 
@@ -0,0 +1,221 @@
+from builtins import classmethod, dict, float, int, list, str
+from datetime import timedelta
+import secrets
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
+from sqlalchemy import (
+    Interval, bindparam, case, delete, distinct, exists, func, literal, or_, select, update
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.dependencies import get_settings
+from app.models.user_model import User
+from app.models.webhook_model import DeliveryStatus, OutboxEvent, UserEvent, WebhookDelivery, WebhookEndpoint
+from app.utils.metrics import WEBHOOK_EVENTS
+from app.utils.serialization import USER_RESPONSE_FIELDS, serialize_user
+
+settings = get_settings()
+
+# Columns an event payload is built from, so statements can return them instead of loading the user.
+USER_EVENT_COLUMNS = tuple(User.__table__.c[name] for name in USER_RESPONSE_FIELDS + ("email_verified", "is_locked"))
+
+# Recording an event is one statement: the event and a pending delivery to every endpoint subscribed
+# to its type, in the transaction of the change itself.
+_event = insert(OutboxEvent.__table__).values(
+    type=bindparam("event_type"), user_id=bindparam("event_user_id"), payload=bindparam("event_payload", type_=JSONB),
+).returning(OutboxEvent.id, OutboxEvent.user_id).cte("event")
+RECORD_STATEMENT = insert(WebhookDelivery.__table__).from_select(
+    ["endpoint_id", "event_id", "user_id"],
+    select(WebhookEndpoint.id, _event.c.id, _event.c.user_id).where(or_(
+        func.cardinality(WebhookEndpoint.events) == 0, bindparam("event_type") == func.any(WebhookEndpoint.events),
+    )),
+).add_cte(_event)
+
+_pending = WebhookDelivery.status == DeliveryStatus.PENDING
+_available = or_(WebhookDelivery.locked_until.is_(None), WebhookDelivery.locked_until <= func.now())
+DUE_ENDPOINTS_STATEMENT = select(distinct(WebhookDelivery.endpoint_id)).where(
+    _pending, WebhookDelivery.next_attempt_at <= func.now(), _available)
+ENDPOINT_LOCK_STATEMENT = select(WebhookEndpoint).where(
+    WebhookEndpoint.id == bindparam("endpoint_id")).with_for_update().execution_options(populate_existing=True)
+IN_FLIGHT_STATEMENT = select(func.count(distinct(WebhookDelivery.batch_id))).where(
+    WebhookDelivery.endpoint_id == bindparam("endpoint_id"), _pending, WebhookDelivery.locked_until > func.now())
+
+# A delivery is held back while an earlier one of the same user to the same endpoint is in flight or
+# waiting for its retry, which keeps the events of a user in order. Claims of one endpoint are
+# serialized by locking its row, which also makes ``max_concurrency`` hold across workers.
+_candidate = aliased(WebhookDelivery)
+_earlier = aliased(WebhookDelivery)
+_held_back = exists().where(
+    _earlier.endpoint_id == _candidate.endpoint_id,
+    _earlier.user_id == _candidate.user_id,
+    _earlier.event_id < _candidate.event_id,
+    _earlier.status == DeliveryStatus.PENDING,
+    or_(_earlier.next_attempt_at > func.now(), _earlier.locked_until > func.now()),
+)
+_batch = (
+    select(_candidate.id)
+    .where(
+        _candidate.endpoint_id == bindparam("claimed_endpoint_id"),
+        _candidate.status == DeliveryStatus.PENDING,
+        _candidate.next_attempt_at <= func.now(),
+        or_(_candidate.locked_until.is_(None), _candidate.locked_until <= func.now()),
+        ~_held_back,
+    )
+    .order_by(_candidate.event_id)
+    .limit(bindparam("batch_size"))
+)
+_deliveries = WebhookDelivery.__table__
+_events = OutboxEvent.__table__
+CLAIM_STATEMENT = (
+    update(_deliveries)
+    .where(_deliveries.c.id.in_(_batch), _deliveries.c.event_id == _events.c.id)
+    .values(batch_id=bindparam("claimed_batch_id"), attempts=_deliveries.c.attempts + 1,
+            locked_until=func.now() + bindparam("lease", type_=Interval()))
+    .returning(_deliveries.c.attempts, _events.c.id, _events.c.type, _events.c.user_id, _events.c.payload,
+               _events.c.created_at)
+)
+
+class WebhookService:
+    @classmethod
+    async def record(cls, session: AsyncSession, event: UserEvent, user) -> None:
+        """
+        Add ``event`` about ``user`` (a ``User`` or a row of ``USER_EVENT_COLUMNS``) to the outbox in the
+        session's transaction, so that it is only delivered if the caller commits.
+        """
+        if not settings.webhooks_enabled:
+            return
+        payload = serialize_user(user)
+        payload["email_verified"] = user.email_verified
+        payload["is_locked"] = user.is_locked
+        await session.execute(RECORD_STATEMENT, {
+            "event_type": event.value, "event_user_id": user.id, "event_payload": payload,
+        })
+        WEBHOOK_EVENTS.labels(event.value).inc()
+
+    @classmethod
+    async def create_endpoint(cls, session: AsyncSession, url: str, events: Sequence[UserEvent] = (),
+                              max_concurrency: int = 1) -> WebhookEndpoint:
+        endpoint = WebhookEndpoint(url=url, secret=secrets.token_urlsafe(32), events=[event.value for event in events],
+                                   max_concurrency=max_concurrency)
+        session.add(endpoint)
+        await session.commit()
+        return endpoint
+
+    @classmethod
+    async def delete_endpoint(cls, session: AsyncSession, endpoint_id: UUID) -> bool:
+        """Remove an endpoint together with its deliveries."""
+        deleted = await session.scalar(
+            delete(WebhookEndpoint).where(WebhookEndpoint.id == endpoint_id).returning(WebhookEndpoint.id))
+        await session.commit()
+        return deleted is not None
+
+    @classmethod
+    async def list_endpoints(cls, session: AsyncSession) -> List[Tuple[WebhookEndpoint, Dict[str, Any]]]:
+        """Every endpoint with its number of pending and failed deliveries and the age of the oldest pending one."""
+        stats = (
+            select(
+                WebhookDelivery.endpoint_id,
+                func.count().filter(_pending).label("pending"),
+                func.count().filter(WebhookDelivery.status == DeliveryStatus.FAILED).label("failed"),
+                func.extract("epoch", func.now() - func.min(OutboxEvent.created_at).filter(_pending)).label("age"),
+            )
+            .join(OutboxEvent, OutboxEvent.id == WebhookDelivery.event_id)
+            .where(WebhookDelivery.status != DeliveryStatus.DELIVERED)
+            .group_by(WebhookDelivery.endpoint_id)
+            .subquery()
+        )
+        rows = await session.execute(
+            select(WebhookEndpoint, stats.c.pending, stats.c.failed, stats.c.age)
+            .outerjoin(stats, stats.c.endpoint_id == WebhookEndpoint.id)
+            .order_by(WebhookEndpoint.created_at)
+        )
+        return [
+            (endpoint, {"pending": pending or 0, "failed": failed or 0,
+                        "oldest_pending_age_seconds": float(age) if age is not None else None})
+            for endpoint, pending, failed, age in rows
+        ]
+
+    @classmethod
+    async def due_endpoints(cls, session: AsyncSession) -> List[UUID]:
+        """Endpoints with deliveries that could be sent now."""
+        endpoints = list(await session.scalars(DUE_ENDPOINTS_STATEMENT))
+        await session.commit()
+        return endpoints
+
+    @classmethod
+    async def claim_batch(cls, session: AsyncSession, endpoint_id: UUID, batch_size: int,
+                          lease: float) -> Optional[Tuple[WebhookEndpoint, UUID, List[Any]]]:
+        """
+        Lease up to ``batch_size`` deliveries of the endpoint as a new batch, unless ``max_concurrency``
+        batches are already in flight or nothing can be sent.
+
+        Returns the endpoint, the batch id and the claimed rows (attempts and the event's columns) in
+        event order.
+        """
+        endpoint = await session.scalar(ENDPOINT_LOCK_STATEMENT, {"endpoint_id": endpoint_id})
+        if endpoint is None or await session.scalar(
+                IN_FLIGHT_STATEMENT, {"endpoint_id": endpoint_id}) >= endpoint.max_concurrency:
+            await session.commit()
+            return None
+        batch_id = uuid4()
+        rows = (await session.execute(CLAIM_STATEMENT, {
+            "claimed_endpoint_id": endpoint_id, "batch_size": batch_size, "claimed_batch_id": batch_id,
+            "lease": timedelta(seconds=lease),
+        })).all()
+        await session.commit()
+        if not rows:
+            return None
+        return endpoint, batch_id, sorted(rows, key=lambda row: row.id)
+
+    @classmethod
+    async def mark_delivered(cls, session: AsyncSession, batch_id: UUID) -> None:
+        await session.execute(
+            update(WebhookDelivery)
+            .where(WebhookDelivery.batch_id == batch_id, _pending)
+            .values(status=DeliveryStatus.DELIVERED, delivered_at=func.now(), locked_until=None, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+    @classmethod
+    async def mark_failed(cls, session: AsyncSession, batch_id: UUID, error: str, retry_delay: float,
+                          max_attempts: int) -> None:
+        """Schedule the batch's deliveries again after ``retry_delay`` seconds, failing those out of attempts."""
+        await session.execute(
+            update(WebhookDelivery)
+            .where(WebhookDelivery.batch_id == batch_id, _pending)
+            .values(
+                status=case((WebhookDelivery.attempts >= max_attempts, literal(DeliveryStatus.FAILED, WebhookDelivery.status.type)),
+                            else_=literal(DeliveryStatus.PENDING, WebhookDelivery.status.type)),
+                next_attempt_at=func.now() + timedelta(seconds=retry_delay),
+                locked_until=None,
+                last_error=error,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+    @classmethod
+    async def retry_failed(cls, session: AsyncSession, endpoint_id: UUID) -> int:
+        """Make the failed deliveries of an endpoint pending again with a fresh set of attempts."""
+        result = await session.execute(
+            update(WebhookDelivery)
+            .where(WebhookDelivery.endpoint_id == endpoint_id, WebhookDelivery.status == DeliveryStatus.FAILED)
+            .values(status=DeliveryStatus.PENDING, attempts=0, next_attempt_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount
+
+    @classmethod
+    async def purge(cls, session: AsyncSession, older_than: float) -> int:
+        """Delete the events older than ``older_than`` seconds that are no longer pending anywhere."""
+        result = await session.execute(
+            delete(OutboxEvent).where(
+                OutboxEvent.created_at < func.now() - timedelta(seconds=older_than),
+                ~exists().where(WebhookDelivery.event_id == OutboxEvent.id, _pending),
+            )
+        )
+        await session.commit()
+        return result.rowcount
@@ -1,6 +1,7 @@
 import logging.config
 import os
 from app.dependencies import get_settings
+from app.utils.structured_logging import install_log_queue
 
 settings = get_settings()
 def setup_logging():
@@ -13,4 +14,6 @@ def setup_logging():
     # Normalize the path to handle any '..' correctly.
     normalized_path = os.path.normpath(logging_config_path)
     # Apply the logging configuration.
-    logging.config.fileConfig(normalized_path, disable_existing_loggers=False)
\ No newline at end of file
+    logging.config.fileConfig(normalized_path, disable_existing_loggers=False)
+    # Hand the configured handlers to a listener thread so log calls never block on I/O.
+    install_log_queue(settings.log_queue_size, settings.log_sample_rates)
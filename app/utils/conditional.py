@@ -0,0 +1,56 @@
+from builtins import int, len, str
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+# Content codings of CompressionMiddleware, whose responses carry an ``encoded_etag``.
+ENCODINGS = ("br", "gzip")
+
+# Headers for authenticated resources: caches may store them privately but must revalidate each time.
+CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+def _version(updated_at: Optional[datetime]) -> str:
+    return format(int(updated_at.timestamp() * 1_000_000), "x") if updated_at else "0"
+
+def user_etag(user_id, updated_at: Optional[datetime]) -> str:
+    """Weak ETag of a single user representation, derived from its ``updated_at``."""
+    return f'W/"{user_id}-{_version(updated_at)}"'
+
+def list_etag(total: int, last_updated_at: Optional[datetime]) -> str:
+    """Weak ETag of a list page, derived from the row count and the newest ``updated_at``."""
+    return f'W/"{total}-{_version(last_updated_at)}"'
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    ETag of a representation compressed with ``encoding``: a strong ETag validates exact bytes, so
+    it gets the encoding as a suffix (``"<hash>-br"``); weak ETags already cover every encoding.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+def _identity_etag(etag: str) -> str:
+    """Opaque part of ``etag`` without the W/ prefix or a suffix added by ``encoded_etag``."""
+    etag = etag.strip().removeprefix("W/")
+    for encoding in ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Weak comparison of ``etag`` against the request's If-None-Match header, which may hold the
+    ETag of a compressed representation.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = _identity_etag(etag)
+    return any(_identity_etag(candidate) == opaque for candidate in header.split(","))
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, **CACHE_HEADERS})
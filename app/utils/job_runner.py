@@ -0,0 +1,218 @@
+"""
+Background jobs backed by the ``jobs`` table.
+
+Handlers are coroutines taking the job's JSON payload, registered under a type name with
+``@job_type(...)``. Work is queued with ``enqueue`` in the caller's transaction, so it only exists
+once the caller commits. A ``JobRunner`` polls the table, claims ready jobs with ``FOR UPDATE SKIP
+LOCKED`` (so any number of runners can share it) and runs at most ``concurrency`` jobs of each type
+at a time. An attempt holds a lease: if its runner dies, the job is requeued once the lease runs
+out. A failed attempt is retried with exponential backoff until ``max_attempts`` is used up.
+
+Runners run inside each web worker (``jobs_in_app``) and/or as a separate process,
+``python -m app.worker``.
+"""
+from builtins import BaseException, Exception, dict, float, int, list, max, min, set, str, type
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Database
+from app.models.job_model import Job
+from app.services.job_service import JobService
+from app.utils.metrics import JOB_DURATION, JOB_START_DELAY, JOBS_FINISHED, JOBS_RUNNING
+
+logger = logging.getLogger(__name__)
+
+RECURRING_KEY = "recurring"
+ERROR_LIMIT = 4000
+
+
+class JobType:
+    def __init__(self, name: str, handler: Callable[[Dict[str, Any]], Awaitable[None]], concurrency: int = 1,
+                 max_attempts: int = 5, backoff: float = 10.0, max_backoff: float = 3600.0,
+                 every: Optional[float] = None):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.every = every
+
+    def retry_delay(self, attempts: int) -> Optional[float]:
+        """Seconds before the next attempt after ``attempts`` failed ones, ``None`` when they are used up."""
+        if attempts >= self.max_attempts:
+            return None
+        # Jittered, so jobs that failed together do not all retry at the same moment.
+        return min(self.max_backoff, self.backoff * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+JOB_TYPES: Dict[str, JobType] = {}
+
+def job_type(name: str, concurrency: int = 1, max_attempts: int = 5, backoff: float = 10.0,
+             max_backoff: float = 3600.0, every: Optional[float] = None):
+    """Register ``async def handler(payload)`` as job type ``name``; ``every`` seconds makes it recurring."""
+    def register(handler):
+        JOB_TYPES[name] = JobType(name, handler, concurrency, max_attempts, backoff, max_backoff, every)
+        return handler
+    return register
+
+async def enqueue(session: AsyncSession, name: str, payload: Optional[Dict[str, Any]] = None, **options) -> Optional[int]:
+    """Queue a job of a registered type in the session's transaction; ``options`` as for ``JobService.enqueue``."""
+    return await JobService.enqueue(session, name, payload, max_attempts=JOB_TYPES[name].max_attempts, **options)
+
+
+class JobRunner:
+    def __init__(self, types: Optional[Dict[str, JobType]] = None, poll_interval: float = 1.0, lease: float = 300.0):
+        self.types = JOB_TYPES if types is None else types
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.configure(poll_interval, lease, {})
+        self.in_flight: Dict[str, int] = {}
+        self._tasks: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._next_recovery = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def configure(self, poll_interval: float, lease: float, concurrency: Dict[str, int]) -> None:
+        """``concurrency`` overrides the registered limit of some job types for this runner."""
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.concurrency = concurrency
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        # The worker id is taken at start, after gunicorn forked the workers.
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Stop claiming, give running jobs ``timeout`` seconds, then cancel them (they are retried)."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        if self._tasks:
+            _, pending = await asyncio.wait(list(self._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+
+    def notify(self) -> None:
+        """Poll now instead of at the next interval, e.g. after committing a job this process enqueued."""
+        self._wakeup.set()
+
+    async def schedule_recurring(self) -> None:
+        """Make sure every recurring type has its next run queued."""
+        async with Database.get_session_factory()() as session:
+            for job in self.types.values():
+                if job.every is not None:
+                    await JobService.enqueue(session, job.name, max_attempts=job.max_attempts, unique_key=RECURRING_KEY)
+            await session.commit()
+
+    async def run_once(self) -> int:
+        """Claim and start as many ready jobs as the concurrency limits allow; returns how many."""
+        now = time.monotonic()
+        claimed = 0
+        async with Database.get_session_factory()() as session:
+            if now >= self._next_recovery:
+                self._next_recovery = now + max(self.lease / 4, self.poll_interval)
+                recovered = await JobService.recover_expired(session)
+                if recovered:
+                    logger.warning("Requeued %d jobs whose lease expired", recovered)
+            for job in self.types.values():
+                free = self.concurrency.get(job.name, job.concurrency) - self.in_flight.get(job.name, 0)
+                if free <= 0 or self._stopping:
+                    continue
+                for claimed_job in await JobService.claim(session, job.name, free, self.worker, self.lease):
+                    self._spawn(job, claimed_job)
+                    claimed += 1
+        return claimed
+
+    async def _run(self) -> None:
+        try:
+            await self.schedule_recurring()
+        except Exception:
+            logger.exception("Could not schedule the recurring jobs")
+        while not self._stopping:
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Polling the job queue failed")
+                claimed = 0
+            if not claimed:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+    def _spawn(self, job_type: JobType, job: Job) -> None:
+        self.in_flight[job_type.name] = self.in_flight.get(job_type.name, 0) + 1
+        JOBS_RUNNING.labels(job_type.name).inc()
+        task = asyncio.get_running_loop().create_task(self._execute(job_type, job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, job_type: JobType, job: Job) -> None:
+        JOB_START_DELAY.labels(job_type.name).observe(max(time.time() - job.run_at.timestamp(), 0.0))
+        started = time.perf_counter()
+        error = None
+        try:
+            # Within the lease, or another runner would requeue the job while it still runs.
+            await asyncio.wait_for(job_type.handler(job.payload), self.lease)
+        except Exception:
+            error = traceback.format_exc()[-ERROR_LIMIT:]
+        except BaseException as e:
+            # Cancelled by stop(): the attempt is recorded as failed below.
+            error = f"Interrupted: {type(e).__name__}"
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            JOB_DURATION.labels(job_type.name).observe(duration)
+            JOBS_RUNNING.labels(job_type.name).dec()
+            self.in_flight[job_type.name] -= 1
+            await asyncio.shield(self._finish(job_type, job, error, duration))
+            self._wakeup.set()
+
+    async def _finish(self, job_type: JobType, job: Job, error: Optional[str], duration: float) -> None:
+        delay = None
+        try:
+            async with Database.get_session_factory()() as session:
+                if error is None:
+                    await JobService.complete(session, job)
+                    JOBS_FINISHED.labels(job_type.name, "succeeded").inc()
+                    logger.info("Job %d %s succeeded in %.3fs", job.id, job_type.name, duration)
+                else:
+                    delay = job_type.retry_delay(job.attempts)
+                    await JobService.fail(session, job, error, delay)
+                    JOBS_FINISHED.labels(job_type.name, "failed" if delay is None else "retried").inc()
+                    logger.warning("Job %d %s attempt %d/%d failed%s:\n%s", job.id, job_type.name, job.attempts,
+                                   job.max_attempts, "" if delay is None else f", retrying in {delay:.0f}s", error)
+                if job.unique_key == RECURRING_KEY and delay is None:
+                    await JobService.enqueue(session, job_type.name, max_attempts=job_type.max_attempts,
+                                             delay=job_type.every, unique_key=RECURRING_KEY)
+                    await session.commit()
+        except Exception:
+            # The lease will run out and the job be retried.
+            logger.exception("Could not record the outcome of job %d %s", job.id, job_type.name)
+
+
+job_runner = JobRunner()
@@ -1,48 +1,104 @@
 from builtins import dict, int, max, str
-from typing import List, Callable
-from urllib.parse import urlencode
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from uuid import UUID
 
 from fastapi import Request
-from app.schemas.link_schema import Link
+from app.schemas.link_schema import Link, LinkMode
 from app.schemas.pagination_schema import PaginationLink
 
+USER_ACTIONS = [
+    ("self", "get_user", "GET", "view"),
+    ("update", "update_user", "PUT", "update"),
+    ("delete", "delete_user", "DELETE", "delete")
+]
+_USER_ID_PLACEHOLDER = "00000000-0000-0000-0000-00000000cafe"
+
 # Utility function to create a link
 def create_link(rel: str, href: str, method: str = "GET", action: str = None) -> Link:
     return Link(rel=rel, href=href, method=method, action=action)
 
 def create_pagination_link(rel: str, base_url: str, params: dict) -> PaginationLink:
     # Ensure parameters are added in a specific order
-    query_string = f"skip={params['skip']}&limit={params['limit']}"
+    query_string = urlencode(params)
     return PaginationLink(rel=rel, href=f"{base_url}?{query_string}")
 
+@lru_cache(maxsize=32)
+def _user_path_template(app, route_name: str) -> Tuple[str, str]:
+    """
+    The path of ``route_name`` split around the user id, so each route is looked up once and every
+    further link is filled in by string concatenation. Keyed by route rather than by base URL, which
+    comes from the Host header and would let clients grow the cache.
+    """
+    path = str(app.url_path_for(route_name, user_id=_USER_ID_PLACEHOLDER))
+    prefix, _, suffix = path.partition(_USER_ID_PLACEHOLDER)
+    return prefix, suffix
+
+def _user_link_template(request: Request, route_name: str) -> Tuple[str, str]:
+    prefix, suffix = _user_path_template(request.app, route_name)
+    return str(request.base_url).rstrip("/") + prefix, suffix
+
+def user_link_builder(request: Request, mode: LinkMode = LinkMode.FULL) -> Optional[Callable[[UUID], List[dict]]]:
+    """
+    Resolve the link templates for ``mode`` once and return a function that builds a user's links.
+
+    Returns None when ``mode`` is ``none`` so callers can skip hypermedia entirely.
+    """
+    if mode == LinkMode.NONE:
+        return None
+    actions = USER_ACTIONS[:1] if mode == LinkMode.MINIMAL else USER_ACTIONS
+    templates = [
+        (rel, action_desc, *_user_link_template(request, route_name))
+        for rel, route_name, method, action_desc in actions
+    ]
+
+    def build(user_id: UUID) -> List[dict]:
+        user_id = str(user_id)
+        return [
+            {"rel": rel, "href": prefix + user_id + suffix, "action": action_desc, "type": "application/json"}
+            for rel, action_desc, prefix, suffix in templates
+        ]
+    return build
+
 def create_user_links(user_id: UUID, request: Request) -> List[Link]:
     """
     Generate navigation links for user actions.
     """
-    actions = [
-        ("self", "get_user", "GET", "view"),
-        ("update", "update_user", "PUT", "update"),
-        ("delete", "delete_user", "DELETE", "delete")
-    ]
-    return [
-        create_link(rel, str(request.url_for(action, user_id=str(user_id))), method, action_desc)
-        for rel, action, method, action_desc in actions
-    ]
+    return [Link.model_construct(**link) for link in user_link_builder(request)(user_id)]
+
+def build_pagination_links(request: Request, skip: int, limit: int, total_items: int,
+                           mode: LinkMode = LinkMode.FULL) -> Optional[List[dict]]:
+    """
+    Build pagination links as plain dicts, keeping every active query parameter (search filters,
+    the ``links`` mode) and only replacing ``skip`` and ``limit``.
+    """
+    if mode == LinkMode.NONE:
+        return None
+    scheme, netloc, path, query, _ = urlsplit(str(request.url))
+    base_url = urlunsplit((scheme, netloc, path, "", ""))
+    filters = [(key, value) for key, value in parse_qsl(query, keep_blank_values=True) if key not in ("skip", "limit")]
+
+    def link(rel: str, page_skip: int) -> dict:
+        query_string = urlencode(filters + [("skip", page_skip), ("limit", limit)])
+        return {"rel": rel, "href": f"{base_url}?{query_string}", "method": "GET"}
 
-def generate_pagination_links(request: Request, skip: int, limit: int, total_items: int) -> List[PaginationLink]:
-    base_url = str(request.url)
     total_pages = (total_items + limit - 1) // limit
-    links = [
-        create_pagination_link("self", base_url, {'skip': skip, 'limit': limit}),
-        create_pagination_link("first", base_url, {'skip': 0, 'limit': limit}),
-        create_pagination_link("last", base_url, {'skip': max(0, (total_pages - 1) * limit), 'limit': limit})
-    ]
+    links = []
+    if mode == LinkMode.FULL:
+        links += [
+            link("self", skip),
+            link("first", 0),
+            link("last", max(0, (total_pages - 1) * limit)),
+        ]
 
     if skip + limit < total_items:
-        links.append(create_pagination_link("next", base_url, {'skip': skip + limit, 'limit': limit}))
+        links.append(link("next", skip + limit))
 
     if skip > 0:
-        links.append(create_pagination_link("prev", base_url, {'skip': max(skip - limit, 0), 'limit': limit}))
+        links.append(link("prev", max(skip - limit, 0)))
 
     return links
+
+def generate_pagination_links(request: Request, skip: int, limit: int, total_items: int) -> List[PaginationLink]:
+    return [PaginationLink(**link) for link in build_pagination_links(request, skip, limit, total_items)]
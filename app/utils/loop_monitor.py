@@ -0,0 +1,125 @@
+"""
+Event loop lag monitor.
+
+A heartbeat task sleeps for ``interval`` seconds at a time and records how late it wakes up: that
+delay is the time other callbacks held the loop. A watchdog thread notices when the heartbeat is
+overdue by more than ``threshold`` and, while the loop is still blocked, captures the stack of the
+loop thread and the route of the task running on it. The event is logged and kept once the loop
+is free again, with the full blocked duration.
+"""
+from builtins import bool, dict, float, int, list, max, reversed, round
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.utils.metrics import EVENT_LOOP_BLOCKED, EVENT_LOOP_LAG
+from app.utils.request_context import task_route
+
+logger = logging.getLogger(__name__)
+
+STACK_LIMIT = 30
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.1, threshold: float = 0.1, capacity: int = 100):
+        self.events: deque = deque(maxlen=capacity)
+        self.configure(interval, threshold, capacity)
+        self.max_lag = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._beat = 0.0
+        self._pending: Optional[dict] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def configure(self, interval: float, threshold: float, capacity: int) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        if capacity != self.events.maxlen:
+            self.events = deque(self.events, maxlen=capacity)
+
+    def start(self) -> None:
+        """Start monitoring the running event loop."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = self._loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, args=(threading.get_ident(),),
+                                          name="event-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        # Complete an event captured during a stall that ended after the last heartbeat.
+        self._finish_pending(time.monotonic() - self._beat - self.interval)
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._watchdog.join()
+        self._task = self._watchdog = None
+
+    def recent(self) -> list:
+        """Blocking events, newest first."""
+        return list(reversed(self.events))
+
+    def clear(self) -> None:
+        self.events.clear()
+        self.max_lag = 0.0
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - self._beat - self.interval, 0.0)
+            EVENT_LOOP_LAG.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            self._finish_pending(lag)
+
+    def _finish_pending(self, lag: float) -> None:
+        event, self._pending = self._pending, None
+        if event is None:
+            return
+        event["blocked_ms"] = round(max(lag, event["blocked_ms"] / 1000) * 1000, 1)
+        self.events.append(event)
+        EVENT_LOOP_BLOCKED.labels(event["route"] or "<none>").inc()
+        logger.warning("Event loop blocked for %.0f ms by %s:\n%s",
+                       event["blocked_ms"], event["route"] or "a callback outside any request", "".join(event["stack"]))
+
+    def _watch(self, loop_thread_id: int) -> None:
+        reported = None
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue < self.threshold or beat == reported:
+                continue
+            frame = sys._current_frames().get(loop_thread_id)
+            task = asyncio.current_task(self._loop)
+            if frame is None or self._beat != beat:
+                continue  # the loop moved on while we looked
+            reported = beat
+            self._pending = {
+                "recorded_at": datetime.now(timezone.utc).isoformat(),
+                "route": task_route(task),
+                "task": task.get_name() if task is not None else None,
+                "blocked_ms": round(overdue * 1000, 1),
+                "stack": traceback.format_list(traceback.extract_stack(frame, limit=STACK_LIMIT)),
+            }
+
+
+loop_monitor = LoopMonitor()
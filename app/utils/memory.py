@@ -0,0 +1,219 @@
+"""
+Memory diagnostics: ``tracemalloc`` snapshots with per-module statistics and diffs, and a periodic
+RSS / garbage collector sampler.
+
+Both are per process. Under gunicorn an admin request reaches one worker, and the responses
+include its pid so consecutive calls can be matched up.
+"""
+from builtins import IndexError, KeyError, OSError, ValueError, abs, dict, enumerate, getattr, int, len, list, next, open, sorted, str, sum
+import asyncio
+import gc
+import itertools
+import os
+import sys
+import threading
+import tracemalloc
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.utils.metrics import GC_COLLECTIONS, PROCESS_RSS
+
+GROUPINGS = ("module", "filename", "lineno")
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def module_name(filename: str, depth: Optional[int] = None) -> str:
+    """Dotted module for a source file, cut to ``depth`` components (``sqlalchemy.orm`` for 2)."""
+    best = ""
+    for entry in sys.path:
+        entry = os.path.join(os.path.abspath(entry or "."), "")
+        if filename.startswith(entry) and len(entry) > len(best):
+            best = entry
+    relative = filename[len(best):] if best else os.path.basename(filename)
+    parts = relative.removesuffix(".py").split(os.sep)
+    if parts[-1] == "__init__" and len(parts) > 1:
+        parts.pop()
+    return ".".join(parts[:depth] if depth else parts)
+
+
+def _statistics(stats, group_by: str, depth: Optional[int], limit: int, diff: bool = False) -> List[dict]:
+    """
+    JSON rows for tracemalloc statistics (computed per file or per line), summed per module when
+    ``group_by`` is "module". Diffs are sorted by the absolute change, other rows by size.
+    """
+    fields = ("size", "count", "size_diff", "count_diff") if diff else ("size", "count")
+    rows: Dict[str, dict] = {}
+    for stat in stats:
+        frame = stat.traceback[0]
+        if group_by == "module":
+            key = module_name(frame.filename, depth)
+        elif group_by == "lineno":
+            key = f"{frame.filename}:{frame.lineno}"
+        else:
+            key = frame.filename
+        row = rows.setdefault(key, {"location": key, **dict.fromkeys(fields, 0)})
+        for field in fields:
+            row[field] += getattr(stat, field)
+    sort_key = (lambda row: abs(row["size_diff"])) if diff else (lambda row: row["size"])
+    return sorted(rows.values(), key=sort_key, reverse=True)[:limit]
+
+
+class TracemallocProfiler:
+    """Starts and stops ``tracemalloc`` and keeps the last ``capacity`` snapshots."""
+
+    def __init__(self, capacity: int = 10):
+        self.capacity = capacity
+        self._snapshots: "OrderedDict[int, tuple]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "pid": os.getpid(),
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "peak_traced_bytes": peak,
+            "snapshots": self.list(),
+        }
+
+    def start(self, frames: int = 1) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self) -> dict:
+        """Stop tracing; snapshots already taken are kept."""
+        tracemalloc.stop()
+        return self.status()
+
+    def take_snapshot(self) -> dict:
+        if not tracemalloc.is_tracing():
+            raise ValueError("tracemalloc is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        info = {"id": next(self._ids), "taken_at": datetime.now(timezone.utc).isoformat(),
+                "traced_bytes": sum(trace.size for trace in snapshot.traces)}
+        with self._lock:
+            self._snapshots[info["id"]] = (info, snapshot)
+            while len(self._snapshots) > self.capacity:
+                self._snapshots.popitem(last=False)
+        return info
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            return [info for info, _ in self._snapshots.values()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+    def _get(self, snapshot_id: int):
+        with self._lock:
+            if snapshot_id not in self._snapshots:
+                raise KeyError(snapshot_id)
+            return self._snapshots[snapshot_id][1]
+
+    def top(self, snapshot_id: int, group_by: str = "module", depth: Optional[int] = None, limit: int = 20) -> List[dict]:
+        """Largest allocation sites still alive in a snapshot."""
+        snapshot = self._get(snapshot_id)
+        stats = snapshot.statistics("lineno" if group_by == "lineno" else "filename")
+        return _statistics(stats, group_by, depth, limit)
+
+    def diff(self, old_id: int, new_id: int, group_by: str = "module", depth: Optional[int] = None,
+             limit: int = 20) -> List[dict]:
+        """Allocation sites whose live memory changed most between two snapshots."""
+        old, new = self._get(old_id), self._get(new_id)
+        stats = new.compare_to(old, "lineno" if group_by == "lineno" else "filename")
+        return _statistics(stats, group_by, depth, limit, diff=True)
+
+
+def read_rss() -> int:
+    """Current resident set size in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemorySampler:
+    """Background task recording RSS and garbage collector statistics every ``interval`` seconds."""
+
+    def __init__(self, interval: float = 60, history: int = 1440):
+        self.samples: deque = deque(maxlen=history)
+        self.configure(interval, history)
+        self._task: Optional[asyncio.Task] = None
+
+    def configure(self, interval: float, history: int) -> None:
+        self.interval = interval
+        if history != self.samples.maxlen:
+            self.samples = deque(self.samples, maxlen=history)
+
+    @staticmethod
+    def measure() -> dict:
+        stats = gc.get_stats()
+        current = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "rss_bytes": read_rss(),
+            "gc_counts": list(gc.get_count()),
+            "gc_collections": [generation["collections"] for generation in stats],
+            "gc_collected": [generation["collected"] for generation in stats],
+            "gc_uncollectable": [generation["uncollectable"] for generation in stats],
+            "gc_frozen": gc.get_freeze_count(),
+        }
+        if tracemalloc.is_tracing():
+            current["traced_bytes"] = tracemalloc.get_traced_memory()[0]
+        return current
+
+    def sample(self) -> dict:
+        """Record a measurement in the history and the Prometheus gauges."""
+        current = self.measure()
+        PROCESS_RSS.set(current["rss_bytes"])
+        for generation, collections in enumerate(current["gc_collections"]):
+            GC_COLLECTIONS.labels(str(generation)).set(collections)
+        self.samples.append(current)
+        return current
+
+    def report(self) -> dict:
+        """Current figures, the recorded history (oldest first) and RSS growth over that history."""
+        first = self.samples[0] if self.samples else None
+        latest = self.measure()
+        return {
+            "pid": os.getpid(),
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "current": latest,
+            "rss_growth_bytes": latest["rss_bytes"] - first["rss_bytes"] if first else 0,
+            "samples": list(self.samples),
+        }
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+
+tracemalloc_profiler = TracemallocProfiler()
+memory_sampler = MemorySampler()
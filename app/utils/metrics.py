@@ -0,0 +1,154 @@
+"""
+Prometheus metrics.
+
+Under gunicorn every worker is a separate process, so ``gunicorn.conf.py`` points
+``PROMETHEUS_MULTIPROC_DIR`` at a shared directory before the app is imported. Each process then
+writes its samples there and ``/metrics`` aggregates all of them, whichever worker serves the
+scrape. Without that variable (a single uvicorn process, tests) the default registry is used.
+"""
+from builtins import bool, hasattr, max, str
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+from sqlalchemy import event
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template, method and status code", ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template and method", ["method", "route"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served", multiprocess_mode="livesum",
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Open database connections held by the pools", multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Database connections currently checked out of the pools", multiprocess_mode="livesum",
+)
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_capacity", "Maximum connections the pools may open (size plus overflow)", multiprocess_mode="livesum",
+)
+
+# bcrypt runs on the event loop and blocks it, so calls never wait in a queue that could be measured:
+# per worker this is 0 or 1, and summed over workers it is the number of workers hashing.
+PASSWORD_HASH_RUNNING = Gauge(
+    "password_hash_running", "bcrypt hash or verify calls running", multiprocess_mode="livesum",
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds", "bcrypt duration by operation", ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5),
+)
+
+LOGIN_ATTEMPTS = Counter("login_attempts_total", "Login attempts by result", ["result"])
+ACCOUNT_LOCKOUTS = Counter("account_lockouts_total", "Accounts locked after too many failed logins")
+
+JOBS_RUNNING = Gauge("jobs_running", "Background jobs running by type", ["type"], multiprocess_mode="livesum")
+JOBS_FINISHED = Counter(
+    "jobs_finished_total", "Background job attempts by type and outcome: succeeded, retried or failed (no attempts left)",
+    ["type", "result"],
+)
+JOB_DURATION = Histogram(
+    "job_duration_seconds", "Duration of background job attempts by type", ["type"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+JOB_START_DELAY = Histogram(
+    "job_start_delay_seconds", "Time between a job becoming due and a runner starting it, by type", ["type"],
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+)
+
+WEBHOOK_EVENTS = Counter("webhook_events_total", "User events written to the webhook outbox by type", ["type"])
+WEBHOOK_BATCHES = Counter(
+    "webhook_batches_total", "Webhook batches sent by outcome: delivered, retried or failed (no attempts left)", ["result"],
+)
+WEBHOOK_BATCHES_IN_FLIGHT = Gauge(
+    "webhook_batches_in_flight", "Webhook batches being sent by this worker", multiprocess_mode="livesum",
+)
+WEBHOOK_REQUEST_DURATION = Histogram(
+    "webhook_request_duration_seconds", "Time to POST a batch of events to a webhook endpoint",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+WEBHOOK_DELIVERY_LAG = Histogram(
+    "webhook_delivery_lag_seconds", "Time from an event being recorded to its delivery",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+)
+
+IDEMPOTENT_REQUESTS = Counter(
+    "idempotent_requests_total",
+    "Requests with an Idempotency-Key by outcome: executed, replayed, mismatch or in_flight (gave up waiting)", ["result"],
+)
+
+RATE_LIMIT_REQUESTS = Counter(
+    "rate_limit_requests_total", "Rate limited requests by route and result: allowed, or the bucket that rejected them",
+    ["route", "result"],
+)
+RATE_LIMIT_BACKEND_DURATION = Histogram(
+    "rate_limit_backend_duration_seconds", "Time to take tokens from the rate limit backend", ["backend"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+RATE_LIMIT_BACKEND_ERRORS = Counter(
+    "rate_limit_backend_errors_total", "Rate limit backend failures; the requests were admitted", ["backend"],
+)
+
+EMAIL_SEND_DURATION = Histogram("email_send_duration_seconds", "Time to render and send an email", ["email_type"])
+EMAIL_SEND_FAILURES = Counter("email_send_failures_total", "Emails that could not be sent", ["email_type"])
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result (hit or miss)", ["cache", "result"])
+
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Log records dropped because the logging queue was full", ["level"])
+LOG_RECORDS_SAMPLED_OUT = Counter("log_records_sampled_out_total", "Debug and info records skipped by log sampling", ["logger"])
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Delay of the event loop heartbeat, i.e. time the loop was held by other callbacks",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total", "Times the event loop was blocked longer than the threshold, by route", ["route"],
+)
+
+# Per worker rather than summed, so a single leaking process stands out.
+PROCESS_RSS = Gauge("process_rss_bytes", "Resident set size of the worker", multiprocess_mode="all")
+GC_COLLECTIONS = Gauge(
+    "gc_collections", "Garbage collections of the worker by generation", ["generation"], multiprocess_mode="all",
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def _on_connect(dbapi_connection, connection_record):
+    DB_POOL_CONNECTIONS.inc()
+
+def _on_close(dbapi_connection, connection_record):
+    DB_POOL_CONNECTIONS.dec()
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKED_OUT.inc()
+
+def _on_checkin(dbapi_connection, connection_record):
+    DB_POOL_CHECKED_OUT.dec()
+
+
+def instrument_pool(engine) -> None:
+    """Track the connections of ``engine``'s pool; call once per engine."""
+    pool = engine.sync_engine.pool if hasattr(engine, "sync_engine") else engine.pool
+    event.listen(pool, "connect", _on_connect)
+    event.listen(pool, "close", _on_close)
+    event.listen(pool, "checkout", _on_checkout)
+    event.listen(pool, "checkin", _on_checkin)
+    if hasattr(pool, "size"):
+        DB_POOL_CAPACITY.set(pool.size() + max(pool._max_overflow, 0))
+
+
+def render_metrics():
+    """Return ``(body, content_type)`` for a scrape, aggregated over all worker processes."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
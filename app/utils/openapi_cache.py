@@ -0,0 +1,78 @@
+"""
+Precomputed OpenAPI schema.
+
+The schema is generated once per process (or once per image, see ``main``), serialized to bytes
+and kept on ``app.state`` together with its ETag, so serving ``/openapi.json`` is a memory copy.
+
+    python -m app.utils.openapi_cache openapi.json
+"""
+from builtins import BaseException, bytes, len, print, str
+import hashlib
+import os
+import sys
+import tempfile
+from typing import Optional
+
+import orjson
+from fastapi import FastAPI
+
+
+class OpenAPISchema:
+    """Serialized schema plus its strong ETag."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def build_openapi_schema(app: FastAPI) -> bytes:
+    return orjson.dumps(app.openapi())
+
+
+def write_openapi_schema(body: bytes, path: str) -> None:
+    # Write to a temporary file and rename it, so concurrent workers never read a partial file.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix=".openapi-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(body)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def load_openapi_schema(app: FastAPI, path: Optional[str] = None) -> OpenAPISchema:
+    """
+    Read the schema from ``path`` when it exists; otherwise generate it, and store it at ``path``
+    (when given) so that the other workers and later restarts can read it instead.
+    """
+    if path:
+        try:
+            with open(path, "rb") as file:
+                return OpenAPISchema(file.read())
+        except FileNotFoundError:
+            pass
+    body = build_openapi_schema(app)
+    if path:
+        write_openapi_schema(body, path)
+    return OpenAPISchema(body)
+
+
+def prepare_openapi_schema(app: FastAPI, path: Optional[str] = None) -> OpenAPISchema:
+    """Load the schema into ``app.state`` unless it is already there (e.g. inherited from the gunicorn master)."""
+    schema = getattr(app.state, "openapi_schema", None)
+    if schema is None:
+        schema = app.state.openapi_schema = load_openapi_schema(app, path)
+    return schema
+
+
+def main(path: str) -> None:
+    from app.main import app
+    body = build_openapi_schema(app)
+    write_openapi_schema(body, path)
+    print(f"Wrote {path} ({OpenAPISchema(body).etag})")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "openapi.json")
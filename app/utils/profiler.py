@@ -0,0 +1,161 @@
+"""
+Statistical profiler for individual requests.
+
+A ``RequestSampler`` thread samples the stack of one asyncio task at a fixed interval: the running
+frames while the task holds the event loop, and the chain of awaited coroutines (ending in
+``[awaiting]``) while it is suspended, so time spent waiting on the database shows up too.
+Samples are written as collapsed stacks (``frame;frame;frame count``, the input format of
+flamegraph.pl and speedscope) to a ``ProfileStore``, a bounded directory shared by all workers.
+"""
+from builtins import Exception, OSError, ValueError, dict, int, len, list, max, next, open, reversed, sorted, str
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Optional
+
+AWAITING = "[awaiting]"
+_NAME = re.compile(r"^[\w.-]+\.collapsed$")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _awaited_frames(task: asyncio.Task) -> list:
+    """Frames of a suspended task, outermost first, following ``cr_await`` down to the leaf."""
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is not None:
+            frames.append(frame)
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return frames
+
+
+class RequestSampler(threading.Thread):
+    """Samples ``task`` running on ``loop`` (whose thread is ``thread_id``) until ``stop`` is called."""
+
+    def __init__(self, task: asyncio.Task, loop: asyncio.AbstractEventLoop, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.task = task
+        self.loop = loop
+        self.thread_id = threading.get_ident()
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        root = self.task.get_coro().cr_frame
+        while not self._stopped.wait(self.interval):
+            try:
+                stack = self._sample(root)
+            except Exception:  # the task may finish between two reads
+                continue
+            if stack:
+                self.samples[stack] += 1
+
+    def _sample(self, root) -> Optional[str]:
+        if asyncio.current_task(self.loop) is self.task:
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                if frame is root:
+                    break
+                frame = frame.f_back
+            labels = [_frame_label(frame) for frame in reversed(frames)]
+        else:
+            labels = [_frame_label(frame) for frame in _awaited_frames(self.task)] + [AWAITING]
+        return ";".join(labels)
+
+    def stop(self) -> "Counter":
+        self._stopped.set()
+        self.join()
+        return self.samples
+
+
+def collapsed(samples: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+class ProfileStore:
+    """Directory of collapsed-stack files that keeps only the ``capacity`` most recent ones."""
+
+    def __init__(self, directory: str, capacity: int = 50):
+        self.directory = directory
+        self.capacity = capacity
+
+    def save(self, method: str, route: str, duration_ms: float, samples: Counter) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        slug = re.sub(r"[^\w]+", "_", route).strip("_") or "root"
+        name = f"{stamp}-{os.getpid()}-{method}-{slug}-{int(duration_ms)}ms.collapsed"
+        temporary = os.path.join(self.directory, f".{name}")
+        with open(temporary, "w") as file:
+            file.write(collapsed(samples))
+        os.replace(temporary, os.path.join(self.directory, name))
+        self._trim()
+        return name
+
+    def _trim(self) -> None:
+        for name in self.names()[self.capacity:]:
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                pass  # already removed by another worker
+
+    def names(self) -> List[str]:
+        """Profile file names, newest first (names start with a UTC timestamp)."""
+        try:
+            return sorted((name for name in os.listdir(self.directory) if _NAME.match(name)), reverse=True)
+        except FileNotFoundError:
+            return []
+
+    def list(self) -> List[dict]:
+        profiles = []
+        for name in self.names():
+            try:
+                size = os.stat(os.path.join(self.directory, name)).st_size
+            except OSError:
+                continue
+            stamp, pid, method, rest = name.split("-", 3)
+            route, duration = rest[:-len(".collapsed")].rsplit("-", 1)
+            profiles.append({
+                "name": name,
+                "recorded_at": datetime.strptime(stamp, "%Y%m%dT%H%M%S%f").replace(tzinfo=timezone.utc).isoformat(),
+                "pid": int(pid), "method": method, "route": route, "duration": duration, "size": size,
+            })
+        return profiles
+
+    def path(self, name: str) -> Optional[str]:
+        """Path of a stored profile, or None; ``name`` must be one of ``names()``."""
+        if not _NAME.match(name) or name not in self.names():
+            return None
+        return os.path.join(self.directory, name)
+
+
+def sign_profile_token(secret: str, ttl_seconds: int, now: Optional[float] = None) -> str:
+    """Value for the profiling header, valid for ``ttl_seconds``."""
+    expires = int((now or time.time()) + ttl_seconds)
+    signature = hmac.new(secret.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def verify_profile_token(secret: str, token: str, now: Optional[float] = None) -> bool:
+    expires, _, signature = token.partition(".")
+    try:
+        if int(expires) < (now or time.time()):
+            return False
+    except ValueError:
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
@@ -0,0 +1,79 @@
+"""
+Counts database round trips: every SQL statement plus each COMMIT and ROLLBACK.
+
+``count_queries`` collects the round trips issued by the enclosed code, including the ones made
+while handling a request in the same task, and blocks can be nested. ``max_queries`` turns a
+count into an assertion, which is how tests pin a route's query budget.
+"""
+from builtins import AssertionError, enumerate, int, len, list, str
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    __slots__ = ("statements",)
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def report(self) -> str:
+        return "\n".join(f"{index}. {statement}" for index, statement in enumerate(self.statements, 1))
+
+
+_active: ContextVar[Tuple[QueryCounter, ...]] = ContextVar("query_counters", default=())
+
+
+def _record(statement: str) -> None:
+    for counter in _active.get():
+        counter.statements.append(statement)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active.get():
+        _record(" ".join(statement.split()))
+
+
+def _commit(conn):
+    if _active.get():
+        _record("COMMIT")
+
+
+def _rollback(conn):
+    if _active.get():
+        _record("ROLLBACK")
+
+
+def install_query_counter() -> None:
+    """Register the engine listeners (idempotent; covers all engines)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "commit", _commit)
+        event.listen(Engine, "rollback", _rollback)
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    token = _active.set(_active.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def max_queries(limit: int):
+    """Fail with the offending statements when the enclosed block needs more than ``limit`` round trips."""
+    install_query_counter()
+    with count_queries() as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{counter.report()}")
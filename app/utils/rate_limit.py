@@ -0,0 +1,213 @@
+"""
+Token bucket rate limiting for the routes that hash passwords.
+
+Each check takes one token from up to three buckets: the client IP on that route, the account on
+that route, and a global bucket shared by all limited routes. A bucket holds ``capacity`` tokens
+and refills at ``rate`` tokens per second. The take is all-or-nothing: a request is only admitted
+when every bucket has a token, and a rejected request consumes nothing.
+
+Buckets live in a backend with a single coroutine, ``take``. ``MemoryBackend`` keeps them in the
+worker, so under gunicorn every worker enforces the limits on its own share of the traffic.
+``SQLiteBackend`` keeps them in one file that all workers on the host update in a transaction, and
+is a stand-in for a networked store such as Redis, which would implement the same method.
+"""
+from builtins import BaseException, Exception, all, any, bool, float, int, len, list, max, min, str, zip
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from app.utils.metrics import RATE_LIMIT_BACKEND_DURATION, RATE_LIMIT_BACKEND_ERRORS, RATE_LIMIT_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+
+# (key, capacity, refill rate in tokens per second)
+Bucket = Tuple[str, float, float]
+
+
+def parse_rate(rate: str) -> Tuple[float, float]:
+    """``"10/minute"`` -> ``(10.0, 10 / 60)``: a burst of 10, refilled over a minute."""
+    count, _, period = rate.partition("/")
+    try:
+        capacity, seconds = float(count), PERIODS[period.strip().lower()]
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid rate {rate!r}, expected e.g. 10/minute (periods: {', '.join(PERIODS)})")
+    if capacity < 1:
+        raise ValueError(f"Invalid rate {rate!r}, the count must be at least 1")
+    return capacity, capacity / seconds
+
+
+def _waits(buckets: Sequence[Bucket], levels: List[float]) -> List[float]:
+    return [0.0 if level >= 1 else (1 - level) / rate for (_, _, rate), level in zip(buckets, levels)]
+
+def _level(state: Optional[Tuple[float, float]], capacity: float, rate: float, now: float) -> float:
+    if state is None:
+        return capacity
+    tokens, updated = state
+    return min(capacity, tokens + max(now - updated, 0.0) * rate)
+
+
+class MemoryBackend:
+    """Buckets of this worker, the least recently used dropped beyond ``max_keys``."""
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self.buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, buckets: Sequence[Bucket]) -> List[float]:
+        """Seconds until each bucket has a token; tokens are only taken when every wait is zero."""
+        now = self.clock()
+        levels = [_level(self.buckets.get(key), capacity, rate, now) for key, capacity, rate in buckets]
+        waits = _waits(buckets, levels)
+        if not any(waits):
+            for (key, _, _), level in zip(buckets, levels):
+                self.buckets[key] = (level - 1, now)
+                self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                # A dropped bucket starts over full, so eviction only ever errs on the lenient side.
+                self.buckets.popitem(last=False)
+        return waits
+
+    def clear(self) -> None:
+        self.buckets.clear()
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteBackend:
+    """Buckets in a SQLite file shared by the worker processes of one host."""
+
+    name = "sqlite"
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._takes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection must not cross a fork: gunicorn workers open their own.
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL,"
+                " updated REAL NOT NULL, full_at REAL NOT NULL)"
+            )
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _take(self, buckets: Sequence[Bucket]) -> List[float]:
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = self.clock()
+                keys = [key for key, _, _ in buckets]
+                rows = connection.execute(
+                    f"SELECT key, tokens, updated FROM buckets WHERE key IN ({', '.join('?' * len(keys))})", keys
+                )
+                states = {key: (tokens, updated) for key, tokens, updated in rows}
+                levels = [_level(states.get(key), capacity, rate, now) for key, capacity, rate in buckets]
+                waits = _waits(buckets, levels)
+                if not any(waits):
+                    connection.executemany(
+                        "INSERT INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?) ON CONFLICT (key)"
+                        " DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated, full_at = excluded.full_at",
+                        [(key, level - 1, now, now + (capacity - level + 1) / rate)
+                         for (key, capacity, rate), level in zip(buckets, levels)],
+                    )
+                    self._takes += 1
+                    if self._takes % self.PURGE_EVERY == 0:
+                        # A full bucket is the same as a missing one.
+                        connection.execute("DELETE FROM buckets WHERE full_at < ?", (now,))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return waits
+
+    async def take(self, buckets: Sequence[Bucket]) -> List[float]:
+        # Off the event loop: another worker may hold the write lock for a moment.
+        return await asyncio.to_thread(self._take, buckets)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM buckets")
+
+    async def close(self) -> None:
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+
+class RateLimiter:
+    def __init__(self, backend=None, ip: str = "20/minute", account: str = "5/minute", total: str = "20/second",
+                 enabled: bool = True):
+        self.backend = backend or MemoryBackend()
+        self.configure(enabled, self.backend, ip, account, total)
+
+    def configure(self, enabled: bool, backend, ip: str, account: str, total: str) -> None:
+        """``ip`` and ``account`` apply per route, ``total`` is shared by every limited route."""
+        self.enabled = enabled
+        self.backend = backend
+        self.limits = {"ip": parse_rate(ip), "account": parse_rate(account), "global": parse_rate(total)}
+
+    async def hit(self, route: str, ip: Optional[str], account: Optional[str]) -> Optional[Tuple[str, float]]:
+        """Take a token for a request; ``(bucket, retry_after)`` when it is rejected, ``None`` when admitted."""
+        if not self.enabled:
+            return None
+        keys = [(name, key) for name, key in (("ip", ip), ("account", (account or "").strip().lower())) if key]
+        names = [name for name, _ in keys] + ["global"]
+        buckets = [(f"{route}:{name}:{key}", *self.limits[name]) for name, key in keys]
+        buckets.append(("global", *self.limits["global"]))
+
+        started = time.perf_counter()
+        try:
+            waits = await self.backend.take(buckets)
+        except Exception:
+            # Failing open: an unavailable limiter store must not take logins down with it.
+            RATE_LIMIT_BACKEND_ERRORS.labels(self.backend.name).inc()
+            logger.exception("Rate limit backend %s failed, admitting the request", self.backend.name)
+            RATE_LIMIT_REQUESTS.labels(route, "allowed").inc()
+            return None
+        finally:
+            RATE_LIMIT_BACKEND_DURATION.labels(self.backend.name).observe(time.perf_counter() - started)
+
+        if all(wait == 0 for wait in waits):
+            RATE_LIMIT_REQUESTS.labels(route, "allowed").inc()
+            return None
+        wait, name = max(zip(waits, names))
+        RATE_LIMIT_REQUESTS.labels(route, name).inc()
+        logger.info("Rate limited %s by the %s bucket (ip %s), retry after %.1fs", route, name, ip, wait)
+        return name, wait
+
+    def reset(self) -> None:
+        """Refill every bucket."""
+        self.backend.clear()
+
+
+def create_backend(name: str, sqlite_path: str, max_keys: int):
+    if name == "memory":
+        return MemoryBackend(max_keys)
+    if name == "sqlite":
+        return SQLiteBackend(sqlite_path)
+    raise ValueError(f"Unknown rate limit backend {name!r}, expected memory or sqlite")
+
+
+rate_limiter = RateLimiter()
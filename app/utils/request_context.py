@@ -0,0 +1,47 @@
+"""The request being handled by the current task, for diagnostics that run below the routing layer."""
+from builtins import RuntimeError, str
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from starlette.types import Scope
+
+_scope: ContextVar[Optional[Scope]] = ContextVar("request_scope", default=None)
+# The same scopes by task, for threads (the event loop watchdog) that cannot read a task's context.
+_task_scopes: Dict[asyncio.Task, Scope] = {}
+
+
+@contextmanager
+def request_scope(scope: Scope):
+    token = _scope.set(scope)
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:  # no running event loop
+        task = None
+    if task is not None:
+        _task_scopes[task] = scope
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+        if task is not None:
+            _task_scopes.pop(task, None)
+
+
+def _route(scope: Scope) -> str:
+    # The router records the matched route in the shared scope once it has dispatched the request.
+    route = scope.get("route")
+    return f'{scope["method"]} {route.path if route is not None else scope["path"]}'
+
+
+def current_route() -> Optional[str]:
+    """``"GET /users/{user_id}"`` for the current request (the raw path before routing), or None."""
+    scope = _scope.get()
+    return _route(scope) if scope is not None else None
+
+
+def task_route(task: Optional[asyncio.Task]) -> Optional[str]:
+    """Like ``current_route`` for the request served by ``task``; callable from any thread."""
+    scope = _task_scopes.get(task) if task is not None else None
+    return _route(scope) if scope is not None else None
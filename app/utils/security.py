@@ -1,12 +1,16 @@
 # app/security.py
 from builtins import Exception, ValueError, bool, int, str
+import hashlib
 import secrets
 import bcrypt
 from logging import getLogger
+from app.utils.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_RUNNING
+from app.utils.timing import timed
 
 # Set up logging
 logger = getLogger(__name__)
 
+@timed("bcrypt")
 def hash_password(password: str, rounds: int = 12) -> str:
     """
     Hashes a password using bcrypt with a specified cost factor.
@@ -23,12 +27,14 @@ def hash_password(password: str, rounds: int = 12) -> str:
     """
     try:
         salt = bcrypt.gensalt(rounds=rounds)
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
+        with PASSWORD_HASH_RUNNING.track_inprogress(), PASSWORD_HASH_DURATION.labels("hash").time():
+            hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed_password.decode('utf-8')
     except Exception as e:
         logger.error("Failed to hash password: %s", e)
         raise ValueError("Failed to hash password") from e
 
+@timed("bcrypt")
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verifies a plain text password against a hashed password.
@@ -44,10 +50,20 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         ValueError: If the hashed password format is incorrect or the function fails to verify.
     """
     try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        with PASSWORD_HASH_RUNNING.track_inprogress(), PASSWORD_HASH_DURATION.labels("verify").time():
+            return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
     except Exception as e:
         logger.error("Error verifying password: %s", e)
         raise ValueError("Authentication process encountered an unexpected error") from e
 
 def generate_verification_token():
-    return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
\ No newline at end of file
+    return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
+
+def hash_verification_token(token: str) -> str:
+    """
+    Hashes an email verification token for storage.
+
+    Verification tokens are random and single-use, so a fast SHA-256 digest is sufficient
+    and lets the token be matched directly in SQL.
+    """
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
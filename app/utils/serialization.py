@@ -0,0 +1,88 @@
+from builtins import bytes, dict, enumerate, int, isinstance, issubclass, len, list, str, tuple, type, zip
+from enum import Enum
+from functools import lru_cache
+from operator import attrgetter
+from uuid import UUID
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from app.schemas.user_schemas import UserResponse
+from app.utils.timing import timed
+
+# Rows read back from the database were validated on the way in, so the fast path only
+# reshapes them for JSON: each response model gets a precomputed plan of the attributes to
+# read and the few per-field conversions needed, instead of re-running the model validators.
+
+def _field_converter(field) -> Optional[Callable[[Any], Any]]:
+    annotation = field.annotation
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return lambda value: value.value if value is not None else None
+    if annotation is UUID:
+        # asyncpg returns its own UUID type, which orjson does not recognise
+        return lambda value: str(value) if value is not None else None
+    if not field.is_required() and field.default is not None:
+        default = field.default
+        return lambda value: default if value is None else value
+    return None
+
+def build_field_plan(model: type[BaseModel], fields: Optional[Iterable[str]] = None) -> Tuple[Tuple[str, ...], Callable, Tuple]:
+    """Precompute the attribute names, a combined getter and the per-field converters of a response model."""
+    names = tuple(fields) if fields is not None else tuple(model.model_fields)
+    converters = tuple(
+        (index, converter)
+        for index, name in enumerate(names)
+        if (converter := _field_converter(model.model_fields[name])) is not None
+    )
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        single_getter = getter
+        getter = lambda obj: (single_getter(obj),)
+    return names, getter, converters
+
+USER_RESPONSE_FIELDS = tuple(name for name in UserResponse.model_fields if name != "links")
+USER_RESPONSE_PLAN = build_field_plan(UserResponse, USER_RESPONSE_FIELDS)
+
+@lru_cache(maxsize=128)
+def user_response_plan(fields: Optional[Tuple[str, ...]] = None) -> Tuple:
+    """The ``UserResponse`` plan restricted to a sparse fieldset, cached per fieldset."""
+    return USER_RESPONSE_PLAN if fields is None else build_field_plan(UserResponse, fields)
+
+def serialize_user(user, plan: Tuple = USER_RESPONSE_PLAN, user_links: Optional[Callable] = None) -> Dict[str, Any]:
+    """Convert a trusted ``User`` row into a JSON-ready dict following ``plan``, adding links from ``user_links``."""
+    names, getter, converters = plan
+    values = getter(user)
+    if converters:
+        values = list(values)
+        for index, converter in converters:
+            values[index] = converter(values[index])
+    item = dict(zip(names, values))
+    if user_links is not None:
+        item["links"] = user_links(user.id)
+    return item
+
+@timed("render")
+def serialize_user_list(users: Iterable, total: int, skip: int, limit: int, plan: Tuple = USER_RESPONSE_PLAN,
+                        user_links: Optional[Callable] = None, links: Optional[list] = None) -> Dict[str, Any]:
+    """Build a ``UserListResponse``-shaped dict from trusted ``User`` rows."""
+    items = [serialize_user(user, plan, user_links) for user in users]
+    page = {
+        "items": items,
+        "total": total,
+        "page": skip // limit + 1,
+        "size": len(items),
+    }
+    if links is not None:
+        page["links"] = links
+    return page
+
+class UserJSONResponse(ORJSONResponse):
+    """orjson-backed response that also accepts pre-rendered JSON bytes."""
+
+    @timed("render")
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
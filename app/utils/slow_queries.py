@@ -0,0 +1,151 @@
+"""
+Opt-in recorder for slow SQL statements.
+
+Statements slower than the threshold are kept in a ring buffer with their redacted parameters,
+the route that issued them and, captured in the background on a separate connection, their
+query plan. ``EXPLAIN (ANALYZE, BUFFERS)`` executes the statement again, so only SELECTs are
+analyzed; other statements, and SELECTs taking row locks, get a plain ``EXPLAIN``.
+"""
+from builtins import Exception, bool, dict, float, getattr, int, isinstance, len, list, reversed, round, set, str, zip
+import asyncio
+import itertools
+import logging
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import event
+
+from app.utils.request_context import current_route
+
+logger = logging.getLogger(__name__)
+
+REDACTED = "<redacted>"
+_SENSITIVE_NAME = re.compile(r"email|password|hash|token", re.IGNORECASE)
+# Emails (also inside LIKE patterns), bcrypt hashes and sha256 hex digests
+_SENSITIVE_VALUE = re.compile(r"@|^\$2[aby]\$|^[0-9a-f]{64}$", re.IGNORECASE)
+# Analyzing these would wait for, or take, the row locks the recorded statement's transaction holds.
+_LOCKING_CLAUSE = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b", re.IGNORECASE)
+
+# Set while a plan is being captured, so the EXPLAIN itself is never recorded.
+_explaining: ContextVar[bool] = ContextVar("slow_query_explaining", default=False)
+
+
+def redact_parameters(parameters: Any, names: Optional[Sequence[str]] = None) -> list:
+    """
+    JSON-friendly copy of positional ``parameters``: values bound to sensitive names (``names``
+    from the compiled statement) or that look like emails or password/token hashes are replaced.
+    """
+    if isinstance(parameters, dict):
+        names, parameters = list(parameters.keys()), list(parameters.values())
+    names = names or [""] * len(parameters)
+    redacted = []
+    for name, value in zip(names, parameters):
+        if _SENSITIVE_NAME.search(name) or (isinstance(value, str) and _SENSITIVE_VALUE.search(value)):
+            redacted.append(REDACTED)
+        elif value is None or isinstance(value, (bool, int, float, str)):
+            redacted.append(value)
+        else:
+            redacted.append(str(value))
+    return redacted
+
+
+class SlowQueryRecorder:
+    def __init__(self, threshold_ms: float = 500, capacity: int = 100, explain: bool = True,
+                 explain_timeout_ms: int = 5000):
+        self.entries: deque = deque(maxlen=capacity)
+        self.configure(threshold_ms, capacity, explain, explain_timeout_ms)
+        self._engine = None
+        self._ids = itertools.count(1)
+        self._explain_lock = asyncio.Lock()
+        self._tasks: set = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self._engine is not None
+
+    def configure(self, threshold_ms: float, capacity: int, explain: bool, explain_timeout_ms: int) -> None:
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.explain_timeout_ms = int(explain_timeout_ms)
+        if capacity != self.entries.maxlen:
+            self.entries = deque(self.entries, maxlen=capacity)
+
+    def install(self, engine) -> None:
+        """Watch the statements of ``engine`` (an ``AsyncEngine``), which also runs the EXPLAINs."""
+        self.uninstall()
+        self._engine = engine
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def uninstall(self) -> None:
+        if self._engine is not None:
+            event.remove(self._engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(self._engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+            self._engine = None
+
+    def recent(self) -> list:
+        """Entries, newest first."""
+        return list(reversed(self.entries))
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    async def wait_for_plans(self) -> None:
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started", None)
+        if started is None or _explaining.get():
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed >= self.threshold:
+            self._record(statement, parameters, context, executemany, elapsed)
+
+    def _record(self, statement, parameters, context, executemany, elapsed):
+        compiled = getattr(context, "compiled", None)
+        names = getattr(compiled, "positiontup", None)
+        entry = {
+            "id": next(self._ids),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(elapsed * 1000, 2),
+            "route": current_route(),
+            "statement": statement,
+            "parameters": [] if executemany else redact_parameters(parameters or (), names),
+            "plan": None,
+        }
+        self.entries.append(entry)
+        logger.warning("Slow query (%.1f ms) from %s: %s %s",
+                       entry["duration_ms"], entry["route"], statement, entry["parameters"])
+        if self.explain and not executemany:
+            task = asyncio.get_running_loop().create_task(self._capture_plan(entry, statement, parameters))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _capture_plan(self, entry: dict, statement: str, parameters) -> None:
+        if self._explain_lock.locked():
+            # One plan at a time: a burst of slow queries must not take over the connection pool.
+            entry["plan"] = "skipped: another plan was being captured"
+            return
+        _explaining.set(True)
+        analyze = statement.lstrip()[:6].upper() == "SELECT" and not _LOCKING_CLAUSE.search(statement)
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+        async with self._explain_lock:
+            try:
+                async with self._engine.connect() as conn:
+                    await conn.exec_driver_sql(f"SET LOCAL statement_timeout = {self.explain_timeout_ms}")
+                    result = await conn.exec_driver_sql(prefix + statement, parameters)
+                    entry["plan"] = "\n".join(row[0] for row in result)
+                    await conn.rollback()
+            except Exception as e:
+                entry["plan"] = f"unavailable: {e}"
+
+
+slow_query_recorder = SlowQueryRecorder()
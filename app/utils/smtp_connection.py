@@ -1,11 +1,10 @@
 # smtp_client.py
 from builtins import Exception, int, str
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from settings.config import settings
 import logging
 
+logger = logging.getLogger(__name__)
+
 class SMTPClient:
     def __init__(self, server: str, port: int, username: str, password: str):
         self.server = server
@@ -14,6 +13,11 @@ class SMTPClient:
         self.password = password
 
     def send_email(self, subject: str, html_content: str, recipient: str):
+        # Deferred: smtplib and the MIME classes are only needed when mail is actually sent
+        import smtplib
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+
         try:
             message = MIMEMultipart('alternative')
             message['Subject'] = subject
@@ -25,7 +29,7 @@ class SMTPClient:
                 server.starttls()  # Use TLS
                 server.login(self.username, self.password)
                 server.sendmail(self.username, recipient, message.as_string())
-            logging.info(f"Email sent to {recipient}")
+            logger.info("Email sent to %s", recipient)
         except Exception as e:
-            logging.error(f"Failed to send email: {str(e)}")
+            logger.error("Failed to send email: %s", e)
             raise
@@ -0,0 +1,124 @@
+"""
+Non-blocking logging: log calls put records on a bounded queue and a listener thread formats
+and writes them (as JSON lines with ``JSONFormatter``), so request handlers never wait on I/O.
+
+When the queue is full the record is dropped and counted rather than blocking the event loop.
+``SamplingFilter`` keeps only a fraction of the debug and info records of noisy modules; warnings
+and errors are always kept.
+"""
+from builtins import bool, dict, float, frozenset, getattr, len, list, max, str, vars
+import logging
+import logging.handlers
+import queue
+import random
+from datetime import datetime, timezone
+from typing import Mapping, Optional
+
+import orjson
+
+from app.utils.metrics import LOG_RECORDS_DROPPED, LOG_RECORDS_SAMPLED_OUT
+from app.utils.request_context import current_route
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, pid, route and any ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps debug and info records of the loggers in ``rates`` (a logger name covers its children)
+    with the given probability. Kept records carry ``sample_rate`` so counts can be scaled back up.
+    """
+
+    def __init__(self, rates: Mapping[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._resolved: dict = {}
+
+    def _rate(self, name: str):
+        if name not in self._resolved:
+            matches = [prefix for prefix in self.rates if name == prefix or name.startswith(prefix + ".")]
+            prefix = max(matches, key=len) if matches else None
+            self._resolved[name] = (prefix, self.rates[prefix] if prefix else 1.0)
+        return self._resolved[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        prefix, rate = self._rate(record.name)
+        if rate >= 1:
+            return True
+        if random.random() < rate:
+            record.sample_rate = rate
+            return True
+        LOG_RECORDS_SAMPLED_OUT.labels(prefix).inc()
+        return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks: records that do not fit in the queue are counted and dropped."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(record.levelname).inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now (they may change once the call returns) but leave the rest of the
+        # formatting, tracebacks included, to the listener thread. The route lives in a context
+        # variable the listener cannot see, so it is captured here.
+        prepared = logging.makeLogRecord(vars(record))
+        prepared.msg = record.getMessage()
+        prepared.args = None
+        if getattr(record, "route", None) is None:
+            prepared.route = current_route()
+        return prepared
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def install_log_queue(queue_size: int = 10000, sample_rates: Optional[Mapping[str, float]] = None) -> None:
+    """Move the root logger's handlers behind a bounded queue drained by a listener thread."""
+    global _listener
+    stop_log_queue()
+    root = logging.getLogger()
+    records: queue.Queue = queue.Queue(queue_size)
+    handler = DroppingQueueHandler(records)
+    if sample_rates:
+        handler.addFilter(SamplingFilter(sample_rates))
+    _listener = logging.handlers.QueueListener(records, *root.handlers, respect_handler_level=True)
+    root.handlers = [handler]
+    _listener.start()
+
+
+def stop_log_queue() -> None:
+    """Write out the queued records and put the original handlers back on the root logger."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger().handlers = list(_listener.handlers)
+        _listener = None
@@ -1,4 +1,3 @@
-import markdown2
 from pathlib import Path
 
 class TemplateManager:
@@ -34,6 +33,8 @@ class TemplateManager:
 
     def render_template(self, template_name: str, **context) -> str:
         """Render a markdown template with given context, applying advanced email styles."""
+        import markdown2  # Deferred: only needed when an email is actually rendered
+
         header = self._read_template('header.md')
         footer = self._read_template('footer.md')
 
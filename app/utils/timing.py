@@ -0,0 +1,130 @@
+"""
+Per-request timing spans for the Server-Timing header.
+
+``ServerTimingMiddleware`` opens a ``RequestTimings`` for each request; ``span`` and ``timed``
+add the elapsed time of a block or function under a metric name. Outside a timed request (the
+middleware is only installed when ``server_timing_enabled`` is set) they cost one context
+variable lookup.
+"""
+from builtins import dict, float, getattr, list, str
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestTimings:
+    """Accumulated duration (seconds) and call count per metric name."""
+
+    __slots__ = ("started", "spans")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: Dict[str, list] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def header(self) -> str:
+        """Render the spans and the time elapsed so far as a Server-Timing header value."""
+        metrics = [f'{name};dur={seconds * 1000:.2f};desc="{count}x"' for name, (seconds, count) in self.spans.items()]
+        metrics.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def request_timings():
+    """Collect spans for the enclosed request handling."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block under ``name`` when the current request is being timed."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of ``span`` for plain and ``async`` functions."""
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                timings = _current.get()
+                if timings is None:
+                    return await function(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    timings.add(name, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is None:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timings.add(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._timing_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current.get()
+    started = getattr(context, "_timing_started", None)
+    if timings is not None and started is not None:
+        timings.add("db", time.perf_counter() - started)
+
+
+def install_sql_timing() -> None:
+    """Time every SQL statement as the ``db`` metric (idempotent; covers all engines)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def uninstall_sql_timing() -> None:
+    """Remove the listeners added by ``install_sql_timing``."""
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
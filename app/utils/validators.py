@@ -1,6 +1,9 @@
 from builtins import bool, str
+import logging
 from email_validator import validate_email, EmailNotValidError
 
+logger = logging.getLogger(__name__)
+
 def validate_email_address(email: str) -> bool:
     """
     Validate the email address using the email-validator library.
@@ -17,5 +20,5 @@ def validate_email_address(email: str) -> bool:
         return True
     except EmailNotValidError as e:
         # Email not valid, return False
-        print(f"Invalid email: {e}")
+        logger.debug("Invalid email: %s", e)
         return False
\ No newline at end of file
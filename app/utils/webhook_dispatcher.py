@@ -0,0 +1,206 @@
+"""
+Delivery of the user events in the outbox to the registered webhook endpoints.
+
+``WebhookService.record`` writes an event, and a pending delivery per subscribed endpoint, in the
+transaction of the user change. A ``WebhookDispatcher`` polls for pending deliveries and POSTs them
+to each endpoint in batches of up to ``batch_size`` events::
+
+    POST <url>
+    Webhook-Id: <batch id, new for every attempt>
+    Webhook-Timestamp: <unix time>
+    Webhook-Signature: sha256=<hex HMAC-SHA256 of "<timestamp>.<body>" keyed with the endpoint secret>
+
+    {"batch_id": "...", "events": [{"id": 1, "type": "user.created", "user_id": "...",
+                                    "occurred_at": "...", "data": {...}}, ...]}
+
+Any 2xx response acknowledges the whole batch; anything else, or no response within ``timeout``,
+has it sent again after an exponential backoff. Delivery is at least once, so receivers should skip
+event ids they already processed. The events of a user reach an endpoint in order, and at most
+``max_concurrency`` batches of an endpoint are in flight at a time across all workers.
+
+Dispatchers run wherever the job runner runs: in each web worker (``jobs_in_app``) and/or in
+``python -m app.worker``.
+"""
+from builtins import BaseException, Exception, bool, float, int, len, list, max, min, set, str, type
+import asyncio
+import hashlib
+import hmac
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any, List, Optional
+from uuid import UUID
+
+import httpx
+import orjson
+
+from app.database import Database
+from app.models.webhook_model import WebhookEndpoint
+from app.services.webhook_service import WebhookService
+from app.utils.metrics import WEBHOOK_BATCHES, WEBHOOK_BATCHES_IN_FLIGHT, WEBHOOK_DELIVERY_LAG, WEBHOOK_REQUEST_DURATION
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "Webhook-Signature"
+TIMESTAMP_HEADER = "Webhook-Timestamp"
+ID_HEADER = "Webhook-Id"
+ERROR_LIMIT = 2000
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """The ``Webhook-Signature`` of a request; receivers recompute it to authenticate the sender."""
+    digest = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+def render_batch(batch_id: UUID, rows: List[Any]) -> bytes:
+    return orjson.dumps({
+        "batch_id": str(batch_id),
+        "events": [
+            {"id": row.id, "type": row.type, "user_id": str(row.user_id), "occurred_at": row.created_at.isoformat(),
+             "data": row.payload}
+            for row in rows
+        ],
+    })
+
+
+class WebhookDispatcher:
+    def __init__(self, poll_interval: float = 1.0, batch_size: int = 100, timeout: float = 10.0, max_attempts: int = 10,
+                 backoff: float = 5.0, max_backoff: float = 3600.0):
+        self.configure(poll_interval, batch_size, timeout, max_attempts, backoff, max_backoff)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def configure(self, poll_interval: float, batch_size: int, timeout: float, max_attempts: int, backoff: float,
+                  max_backoff: float) -> None:
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.timeout = timeout
+        # The lease outlasts the request, so a batch is only sent again once its worker is gone.
+        self.lease = timeout + 60
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def retry_delay(self, attempts: int) -> float:
+        """Seconds before the next attempt after ``attempts`` failed ones, jittered like job retries."""
+        return min(self.max_backoff, self.backoff * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Stop claiming and give the batches in flight ``timeout`` seconds; cancelled ones are sent again later."""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._tasks:
+            _, pending = await asyncio.wait(list(self._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def run_once(self) -> int:
+        """Claim and start sending as many batches as the endpoints' concurrency allows; returns how many."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        claimed = 0
+        async with Database.get_session_factory()() as session:
+            for endpoint_id in await WebhookService.due_endpoints(session):
+                while not self._stopping:
+                    batch = await WebhookService.claim_batch(session, endpoint_id, self.batch_size, self.lease)
+                    if batch is None:
+                        break
+                    self._spawn(*batch)
+                    claimed += 1
+        return claimed
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Polling the webhook outbox failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _spawn(self, endpoint: WebhookEndpoint, batch_id: UUID, rows: List[Any]) -> None:
+        WEBHOOK_BATCHES_IN_FLIGHT.inc()
+        task = asyncio.get_running_loop().create_task(self._deliver(endpoint, batch_id, rows))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, endpoint: WebhookEndpoint, batch_id: UUID, rows: List[Any]) -> None:
+        body = render_batch(batch_id, rows)
+        timestamp = str(int(time.time()))
+        headers = {
+            "Content-Type": "application/json",
+            ID_HEADER: str(batch_id),
+            TIMESTAMP_HEADER: timestamp,
+            SIGNATURE_HEADER: sign_payload(endpoint.secret, timestamp, body),
+        }
+        error = None
+        started = time.perf_counter()
+        try:
+            response = await self._client.post(endpoint.url, content=body, headers=headers)
+            if not response.is_success:
+                error = f"HTTP {response.status_code}: {response.text[:ERROR_LIMIT]}"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:ERROR_LIMIT]
+        except BaseException:
+            error = "Interrupted"
+            raise
+        finally:
+            WEBHOOK_REQUEST_DURATION.observe(time.perf_counter() - started)
+            WEBHOOK_BATCHES_IN_FLIGHT.dec()
+            await asyncio.shield(self._finish(endpoint, batch_id, rows, error))
+            # The endpoint has a free slot and the user's next events may be due now.
+            self._wakeup.set()
+
+    async def _finish(self, endpoint: WebhookEndpoint, batch_id: UUID, rows: List[Any], error: Optional[str]) -> None:
+        try:
+            async with Database.get_session_factory()() as session:
+                if error is None:
+                    await WebhookService.mark_delivered(session, batch_id)
+                    WEBHOOK_BATCHES.labels("delivered").inc()
+                    now = datetime.now().astimezone()
+                    for row in rows:
+                        WEBHOOK_DELIVERY_LAG.observe(max((now - row.created_at).total_seconds(), 0.0))
+                    return
+                attempts = max(row.attempts for row in rows)
+                delay = self.retry_delay(attempts)
+                await WebhookService.mark_failed(session, batch_id, error, delay, self.max_attempts)
+                exhausted = attempts >= self.max_attempts
+                WEBHOOK_BATCHES.labels("failed" if exhausted else "retried").inc()
+                logger.warning("Webhook batch %s of %d events to %s failed (attempt %d/%d)%s: %s", batch_id, len(rows),
+                               endpoint.url, attempts, self.max_attempts,
+                               "" if exhausted else f", retrying in {delay:.0f}s", error)
+        except Exception:
+            # The lease will run out and the batch be sent again.
+            logger.exception("Could not record the outcome of webhook batch %s", batch_id)
+
+
+webhook_dispatcher = WebhookDispatcher()
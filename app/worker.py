@@ -0,0 +1,56 @@
+"""
+Standalone background job runner and webhook dispatcher:
+
+    python -m app.worker
+
+It runs the same job types and delivers the same webhooks as the web workers, so background work can
+be moved off the web tier by starting it with ``JOBS_IN_APP=false`` and running one or more of these.
+"""
+from builtins import SystemExit, int, sorted
+import asyncio
+import logging
+import signal
+
+from app import jobs  # noqa: F401, registers the built-in job types
+from app.database import Database
+from app.dependencies import get_settings
+from app.utils.common import setup_logging
+from app.utils.job_runner import job_runner
+from app.utils.structured_logging import stop_log_queue
+from app.utils.webhook_dispatcher import webhook_dispatcher
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+async def run() -> None:
+    Database.initialize(settings.database_url, settings.debug, settings.db_prepared_statement_cache_size)
+    job_runner.configure(settings.jobs_poll_interval_seconds, settings.jobs_lease_seconds, settings.jobs_concurrency)
+    webhook_dispatcher.configure(settings.webhook_poll_interval_seconds, settings.webhook_batch_size,
+                                 settings.webhook_timeout_seconds, settings.webhook_max_attempts,
+                                 settings.webhook_backoff_seconds, settings.webhook_max_backoff_seconds)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+    job_runner.start()
+    webhook_dispatcher.start()
+    logger.info("Job worker %s running %s", job_runner.worker, ", ".join(sorted(job_runner.types)))
+    await stopped.wait()
+    logger.info("Job worker %s stopping", job_runner.worker)
+    await asyncio.gather(job_runner.stop(settings.jobs_shutdown_timeout_seconds),
+                         webhook_dispatcher.stop(settings.jobs_shutdown_timeout_seconds))
+    await Database.dispose()
+
+
+def main() -> int:
+    setup_logging()
+    try:
+        asyncio.run(run())
+    finally:
+        stop_log_queue()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,39 @@
+"""
+Benchmark of response compression for user list pages.
+
+Serializes list pages of several sizes with the fast path used by the routes, then reports
+the compressed size, bytes saved and compression time for gzip and brotli at the configured
+``compression_level``.
+
+Usage:
+    python -m benchmarks.bench_compression [iterations]
+"""
+
+from builtins import int, len, print
+import sys
+import timeit
+
+from app.dependencies import get_settings
+from app.middleware.compression import _Encoder
+from app.utils.serialization import UserJSONResponse, serialize_user_list
+from benchmarks.bench_serialization import make_users
+
+
+def run(iterations: int = 20):
+    level = get_settings().compression_level
+    print(f"compression level {level}")
+    print(f"{'limit':>6}{'encoding':>10}{'raw bytes':>12}{'compressed':>12}{'saved':>8}{'ms':>9}")
+    results = {}
+    for limit in (10, 100, 500, 1000):
+        body = UserJSONResponse(serialize_user_list(make_users(limit), limit, 0, limit)).body
+        for encoding in ("gzip", "br"):
+            compressed = _Encoder(encoding, level).finish(body)
+            elapsed = timeit.timeit(lambda: _Encoder(encoding, level).finish(body), number=iterations) / iterations * 1e3
+            saved = 1 - len(compressed) / len(body)
+            results[(limit, encoding)] = (len(body), len(compressed), elapsed)
+            print(f"{limit:>6}{encoding:>10}{len(body):>12}{len(compressed):>12}{saved:>8.0%}{elapsed:>9.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
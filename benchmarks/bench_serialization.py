@@ -0,0 +1,76 @@
+"""
+Benchmark of list-page serialization for the user endpoints.
+
+Compares the previous path (``UserResponse.model_validate`` per row, a ``UserListResponse``
+and FastAPI's response-model validation and JSON encoding) against the field-plan serializer
+in ``app.utils.serialization`` rendered with orjson. Rows are transient ``User`` objects,
+so no database connection is required.
+
+Usage:
+    python -m benchmarks.bench_serialization [iterations]
+"""
+
+from builtins import int, len, print, range
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime, timezone
+
+from faker import Faker
+
+from app.models.user_model import User, UserRole
+from app.schemas.user_schemas import UserListResponse, UserResponse
+from app.utils.serialization import UserJSONResponse, serialize_user_list
+
+fake = Faker()
+
+
+def make_users(count: int):
+    return [
+        User(
+            id=uuid.uuid4(),
+            nickname=fake.unique.user_name(),
+            email=fake.unique.email(),
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+            bio=fake.text(max_nb_chars=200),
+            profile_picture_url=f"https://example.com/profiles/{index}.jpg",
+            linkedin_profile_url=f"https://linkedin.com/in/user{index}",
+            github_profile_url=f"https://github.com/user{index}",
+            role=UserRole.AUTHENTICATED,
+            is_professional=index % 2 == 0,
+            created_at=datetime.now(timezone.utc),
+            updated_at=datetime.now(timezone.utc),
+        )
+        for index in range(count)
+    ]
+
+
+def validated_page(users):
+    page = UserListResponse(
+        items=[UserResponse.model_validate(user) for user in users], total=len(users), page=1, size=len(users)
+    )
+    # FastAPI re-validates the returned object against response_model before encoding it.
+    content = UserListResponse.model_validate(page.model_dump()).model_dump(mode="json")
+    return json.dumps(content).encode("utf-8")
+
+
+def fast_page(users):
+    return UserJSONResponse(serialize_user_list(users, len(users), 0, len(users))).body
+
+
+def run(iterations: int = 20):
+    print(f"{'limit':>6}{'validated (ms)':>17}{'fast path (ms)':>17}{'speedup':>10}")
+    results = {}
+    for limit in (100, 1000):
+        users = make_users(limit)
+        validated = timeit.timeit(lambda: validated_page(users), number=iterations) / iterations * 1e3
+        fast = timeit.timeit(lambda: fast_page(users), number=iterations) / iterations * 1e3
+        results[limit] = (validated, fast)
+        print(f"{limit:>6}{validated:>17.2f}{fast:>17.2f}{validated / fast:>9.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
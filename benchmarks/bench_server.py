@@ -0,0 +1,88 @@
+"""
+Startup and throughput comparison of the server entrypoints.
+
+Starts each command on its own port, measures the time until the first successful response,
+then drives a fixed number of requests at a fixed concurrency with an async httpx client and
+reports requests per second. The probed endpoint does not touch the database.
+
+    legacy      uvicorn app.main:app --reload (the previous container entrypoint)
+    production  gunicorn -c gunicorn.conf.py app.main:app
+
+Usage:
+    python -m benchmarks.bench_server [requests] [concurrency]
+"""
+
+from builtins import enumerate, int, len, print, range
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+COMMANDS = {
+    "legacy": ["uvicorn", "app.main:app", "--reload", "--host", "127.0.0.1", "--port", "{port}"],
+    "production": ["gunicorn", "-c", "gunicorn.conf.py", "app.main:app", "--bind", "127.0.0.1:{port}"],
+}
+PATH = "/docs"
+
+
+async def wait_until_ready(url: str, timeout: float = 60.0) -> float:
+    started = time.perf_counter()
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() - started < timeout:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+    raise TimeoutError(f"{url} did not become ready")
+
+
+async def drive(url: str, requests: int, concurrency: int) -> float:
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def worker(client):
+        while not queue.empty():
+            queue.get_nowait()
+            (await client.get(url)).raise_for_status()
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        return requests / (time.perf_counter() - started)
+
+
+def run(requests: int = 2000, concurrency: int = 50):
+    results = {}
+    for offset, (name, command) in enumerate(COMMANDS.items()):
+        port = 8100 + offset
+        process = subprocess.Popen(
+            [part.format(port=port) for part in command],
+            env={"FORWARDED_ALLOW_IPS": "127.0.0.1", **os.environ},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+        )
+        try:
+            url = f"http://127.0.0.1:{port}{PATH}"
+            startup = asyncio.run(wait_until_ready(url))
+            throughput = asyncio.run(drive(url, requests, concurrency))
+            results[name] = (startup, throughput)
+        finally:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait()
+
+    print(f"cores: {len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}")
+    print(f"{'entrypoint':<12}{'startup (s)':>13}{'req/s':>10}")
+    for name, (startup, throughput) in results.items():
+        print(f"{name:<12}{startup:>13.2f}{throughput:>10.0f}")
+    return results
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
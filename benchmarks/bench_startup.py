@@ -0,0 +1,56 @@
+"""
+Import-time benchmark of the application entry point.
+
+Runs ``python -X importtime -c "import app.main"`` in fresh interpreters and reports the best
+cumulative import time of ``app.main`` along with the modules with the largest self time.
+``tests/test_startup.py`` enforces ``IMPORT_TIME_BUDGET_SECONDS`` with the same measurement.
+
+Usage:
+    python -m benchmarks.bench_startup [runs]
+"""
+
+from builtins import int, len, min, print, range, sorted
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+IMPORT_TIME_BUDGET_SECONDS = 3.0
+# Modules that are only needed on rarely used paths and must not be imported at startup.
+DEFERRED_MODULES = ("markdown2", "smtplib", "email.mime.text")
+
+
+def measure_import(module: str = "app.main") -> Dict[str, Tuple[int, int]]:
+    """Import ``module`` in a fresh interpreter; return {module: (self us, cumulative us)}."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def best_import_time(module: str = "app.main", runs: int = 3) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """Best cumulative import time of ``module`` in seconds over ``runs`` runs, with that run's timings."""
+    measurements = [measure_import(module) for _ in range(runs)]
+    best = min(measurements, key=lambda timings: timings[module][1])
+    return best[module][1] / 1e6, best
+
+
+def run(runs: int = 5, top: int = 15):
+    seconds, timings = best_import_time(runs=runs)
+    print(f"app.main import: {seconds:.3f}s (budget {IMPORT_TIME_BUDGET_SECONDS:.1f}s, best of {runs})")
+    print(f"{'self (ms)':>10}{'cumulative (ms)':>17}  module")
+    for name, (self_us, cumulative_us) in sorted(timings.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"{self_us / 1e3:>10.1f}{cumulative_us / 1e3:>17.1f}  {name}")
+    return seconds
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,57 @@
+"""
+Microbenchmark of the per-query Python overhead of the hot UserService lookups.
+
+Compares building a fresh ``select(User).filter_by(...)`` per call (the old behaviour)
+against the cached, bound-parameter statements used by ``UserService._fetch_user``.
+Each iteration generates the statement's cache key and resolves its compiled form
+through a compiled cache, which is the work SQLAlchemy performs before handing SQL
+to asyncpg. No database connection is required.
+
+Usage:
+    python -m benchmarks.bench_user_queries [iterations]
+"""
+
+from builtins import int, print
+import sys
+import timeit
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.models.user_model import User
+from app.services.user_service import UserService
+
+DIALECT = asyncpg.dialect()
+
+
+def _compiled(statement, cache: dict):
+    key = statement._generate_cache_key().key
+    compiled = cache.get(key)
+    if compiled is None:
+        compiled = cache[key] = statement.compile(dialect=DIALECT)
+    return compiled
+
+
+def run(iterations: int = 20000):
+    user_id = uuid.uuid4()
+    results = {}
+    for label, keys, params in [
+        ("by id", ("id",), {"id": user_id}),
+        ("by email", ("email",), {"email": "john.doe@example.com"}),
+        ("by nickname", ("nickname",), {"nickname": "clever_fox_1"}),
+        ("by verification token", ("id", "verification_token"), {"id": user_id, "verification_token": "abc"}),
+    ]:
+        dynamic_cache, cached_cache = {}, {}
+        dynamic = timeit.timeit(lambda: _compiled(select(User).filter_by(**params), dynamic_cache), number=iterations)
+        cached = timeit.timeit(lambda: _compiled(UserService._lookup_statement(keys), cached_cache), number=iterations)
+        results[label] = (dynamic / iterations * 1e6, cached / iterations * 1e6)
+
+    print(f"{'lookup':<24}{'dynamic (us)':>14}{'cached (us)':>14}{'speedup':>10}")
+    for label, (dynamic, cached) in results.items():
+        print(f"{label:<24}{dynamic:>14.2f}{cached:>14.2f}{dynamic / cached:>9.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,64 @@
+"""
+Compare two pytest-benchmark JSON result files and flag regressions.
+
+Run the suite and save its results, for example before and after a change:
+
+    pytest benchmarks --benchmark-json=baseline.json
+    pytest benchmarks --benchmark-json=current.json
+
+then compare them. The exit status is 1 when any benchmark's statistic grew by more than the
+threshold (in percent), so the command can gate CI:
+
+    python -m benchmarks.compare baseline.json current.json [--threshold 10] [--stat median]
+"""
+
+from builtins import dict, float, len, max, open, print, sorted, str
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+STATS = ("min", "max", "mean", "median")
+
+
+def load(path: str, stat: str) -> Dict[str, float]:
+    with open(path) as file:
+        return {bench["fullname"]: bench["stats"][stat] for bench in json.load(file)["benchmarks"]}
+
+
+def compare(baseline: Dict[str, float], current: Dict[str, float], threshold: float) -> List[Tuple[str, float, float, float, bool]]:
+    """Return (name, baseline, current, change in percent, regressed) for benchmarks present in both."""
+    rows = []
+    for name in sorted(baseline.keys() & current.keys()):
+        change = (current[name] - baseline[name]) / baseline[name] * 100
+        rows.append((name, baseline[name], current[name], change, change > threshold))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent (default 10)")
+    parser.add_argument("--stat", choices=STATS, default="median", help="statistic to compare (default median)")
+    args = parser.parse_args(argv)
+
+    baseline, current = load(args.baseline, args.stat), load(args.current, args.stat)
+    rows = compare(baseline, current, args.threshold)
+    width = max([len(name) for name, *_ in rows] + [9])
+    print(f"{'benchmark':<{width}}{'baseline (us)':>16}{'current (us)':>16}{'change':>10}")
+    for name, before, after, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<{width}}{before * 1e6:>16.2f}{after * 1e6:>16.2f}{change:>+9.1f}%{flag}")
+    for name in sorted(baseline.keys() ^ current.keys()):
+        print(f"{name}: only in {'baseline' if name in baseline else 'current'}")
+
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the {args.threshold:g}% threshold ({args.stat})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
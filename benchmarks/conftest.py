@@ -0,0 +1,87 @@
+"""
+Fixtures for the pytest-benchmark suite.
+
+The query benchmarks recreate the tables in ``settings.database_url`` (like the test suite does)
+and seed them with ``SEEDED_USERS`` rows.
+"""
+from builtins import range
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.requests import Request
+
+from app.database import Base
+from app.main import app
+from app.models.user_model import User, UserRole
+from app.utils.security import hash_password
+from benchmarks.bench_serialization import make_users
+from settings.config import settings
+
+SEEDED_USERS = 1000
+
+
+@pytest.fixture(scope="session")
+def event_loop_runner():
+    """Runs coroutines on one loop for the whole session, so pooled connections stay usable."""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def seeded_database(event_loop_runner):
+    engine = create_async_engine(settings.database_url)
+    password = hash_password("MySuperPassword$1234", rounds=4)
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "nickname": f"bench_user_{index}",
+            "email": f"bench_user_{index}@example.com",
+            "first_name": "Bench",
+            "last_name": f"User {index}",
+            "hashed_password": password,
+            "role": UserRole.ADMIN if index % 10 == 0 else UserRole.AUTHENTICATED,
+            "is_professional": index % 2 == 0,
+            "email_verified": True,
+            "created_at": now - timedelta(minutes=index),
+            "updated_at": now - timedelta(minutes=index),
+        }
+        for index in range(SEEDED_USERS)
+    ]
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), rows)
+
+    async def teardown():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+    event_loop_runner(setup())
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False), rows
+    event_loop_runner(teardown())
+
+
+@pytest.fixture(scope="session")
+def users_1000():
+    return make_users(1000)
+
+
+@pytest.fixture
+def request_factory():
+    """Builds a request against the real app, which is all the link helpers need."""
+    def build(path: str = "/users", query_string: bytes = b"") -> Request:
+        return Request({
+            "type": "http", "method": "GET", "scheme": "http", "server": ("testserver", 80),
+            "root_path": "", "path": path, "query_string": query_string, "headers": [],
+            "app": app, "router": app.router,
+        })
+    return build
@@ -0,0 +1,383 @@
+"""
+HTTP load test replaying a realistic mix of user-management traffic, with an SLO report.
+
+Verified accounts are seeded straight into ``settings.database_url`` (the database of the app under
+test) and removed afterwards along with the users registered during the run. Scenarios are
+picked at random by weight:
+
+    register, login, get_user, list_users, search, update_user
+
+Two ways of generating load:
+
+* closed loop (default): ``--concurrency`` clients send requests back to back;
+* open loop: ``--rate`` requests per second arrive at random (Poisson) intervals, at most
+  ``--concurrency`` in flight. Latency is measured from the scheduled arrival, so time spent
+  queued behind a saturated server counts (no coordinated omission).
+
+The report lists latency percentiles, throughput and error rate per route. ``--slo`` thresholds
+make the exit status 1 when any of them is missed, so a run can gate a release:
+
+    python -m benchmarks.load_test --start --duration 60 --concurrency 50 \\
+        --slo "p95<300" --slo "GET /users/{user_id}:p99<150" --slo "error_rate<1"
+
+An SLO is ``[route:]metric<limit`` where metric is p50, p90, p95, p99 or max (milliseconds),
+``error_rate`` (percent) or ``rps``, written ``rps>limit``. Without a route it applies to all
+requests together.
+
+``--start`` runs the app with rate limiting disabled; start a server of your own with
+``RATE_LIMIT_ENABLED=false`` too, or the login and register scenarios are answered with 429.
+"""
+
+from builtins import ValueError, bool, dict, float, getattr, int, len, list, max, open, print, range, round, sorted, str, type
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_MIX = {"register": 5, "login": 15, "get_user": 30, "list_users": 20, "search": 20, "update_user": 10}
+ROUTES = {
+    "register": "POST /register/",
+    "login": "POST /login/",
+    "get_user": "GET /users/{user_id}",
+    "list_users": "GET /users/",
+    "search": "GET /users/search",
+    "update_user": "PUT /users/{user_id}",
+}
+PASSWORD = "LoadTest$1234"
+PERCENTILES = (50, 90, 95, 99)
+ALL = "all"
+
+
+@dataclass
+class Account:
+    id: str
+    email: str
+
+
+@dataclass
+class RouteStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, latency: float, status: str, error: bool) -> None:
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.errors += error
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (sorted or not)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(stats: Dict[str, RouteStats], elapsed: float) -> Dict[str, dict]:
+    """Per-route figures plus an ``all`` row; latencies in milliseconds, error rate in percent."""
+    combined = RouteStats()
+    for route_stats in stats.values():
+        combined.latencies += route_stats.latencies
+        combined.errors += route_stats.errors
+        for status, count in route_stats.statuses.items():
+            combined.statuses[status] = combined.statuses.get(status, 0) + count
+    summary = {}
+    for route, route_stats in [*sorted(stats.items()), (ALL, combined)]:
+        count = len(route_stats.latencies)
+        latencies = sorted(route_stats.latencies)
+        summary[route] = {
+            "requests": count,
+            "rps": round(count / elapsed, 1) if elapsed else 0.0,
+            "error_rate": round(route_stats.errors / count * 100, 2) if count else 0.0,
+            **{f"p{pct}": round(percentile(latencies, pct) * 1000, 1) for pct in PERCENTILES},
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+            "statuses": dict(sorted(route_stats.statuses.items())),
+        }
+    return summary
+
+
+_SLO = re.compile(r"^(?:(?P<route>.+):)?(?P<metric>p50|p90|p95|p99|max|error_rate|rps)\s*(?P<op>[<>])\s*(?P<limit>\d+(?:\.\d+)?)$")
+
+
+def parse_slo(text: str) -> Tuple[str, str, str, float]:
+    """``"GET /users/{user_id}:p99<150"`` -> ``("GET /users/{user_id}", "p99", "<", 150.0)``."""
+    match = _SLO.match(text.strip())
+    if match is None:
+        raise ValueError(f"Invalid SLO {text!r}, expected [route:]metric<limit with metric p50, p90, p95, p99, max, "
+                         "error_rate or rps (p95<300, error_rate<1, rps>100)")
+    return match["route"] or ALL, match["metric"], match["op"], float(match["limit"])
+
+
+def evaluate_slos(summary: Dict[str, dict], slos: List[Tuple[str, str, str, float]]) -> List[Tuple[str, float, bool]]:
+    """Return (description, measured value, passed) for each SLO; an SLO on a route with no traffic fails."""
+    results = []
+    for route, metric, op, limit in slos:
+        row = summary.get(route)
+        description = f"{route}:{metric}{op}{limit:g}"
+        if row is None or not row["requests"]:
+            results.append((description, float("nan"), False))
+            continue
+        value = row[metric]
+        results.append((description, value, value < limit if op == "<" else value > limit))
+    return results
+
+
+class LoadTest:
+    """Runs the scenario mix against ``base_url`` and collects per-route latencies."""
+
+    def __init__(self, base_url: str, accounts: List[Account], admin_credentials: Tuple[str, str], password: str = PASSWORD,
+                 mix: Optional[Dict[str, float]] = None, run_id: Optional[str] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None, seed: Optional[int] = None):
+        self.base_url = base_url
+        self.accounts = accounts
+        self.admin_credentials = admin_credentials
+        self.password = password
+        self.mix = mix or DEFAULT_MIX
+        self.run_id = run_id or uuid.uuid4().hex[:8]
+        self.transport = transport
+        # Its own generator, so a seeded run draws the same scenarios whatever else uses ``random``.
+        self.random = random.Random(seed)
+        self.stats: Dict[str, RouteStats] = {}
+        self.headers: Dict[str, str] = {}
+        self._registered = 0
+        for name in self.mix:
+            if name not in ROUTES:
+                raise ValueError(f"Unknown scenario {name!r}; available: {', '.join(DEFAULT_MIX)}")
+
+    # Scenarios return the response and the status codes that count as success.
+
+    async def _scenario_register(self, client):
+        self._registered += 1
+        body = {"email": f"loadtest-{self.run_id}-new-{self._registered}@example.com", "password": self.password,
+                "role": "AUTHENTICATED"}
+        return await client.post("/register/", json=body), (200,)
+
+    async def _scenario_login(self, client):
+        form = {"username": self.random.choice(self.accounts).email, "password": self.password}
+        return await client.post("/login/", data=form), (200,)
+
+    async def _scenario_get_user(self, client):
+        return await client.get(f"/users/{self.random.choice(self.accounts).id}", headers=self.headers), (200,)
+
+    async def _scenario_list_users(self, client):
+        limit = self.random.choice((10, 10, 10, 50))
+        params = {"skip": self.random.randrange(0, max(len(self.accounts) - limit, 1)), "limit": limit}
+        return await client.get("/users/", params=params, headers=self.headers), (200,)
+
+    async def _scenario_search(self, client):
+        params = self.random.choice((
+            {"email": f"loadtest-{self.run_id}-{self.random.randrange(len(self.accounts))}"},
+            {"username": "loadtest"},
+            {"role": "AUTHENTICATED", "limit": 20},
+            {"is_locked": "false"},
+            {"registration_start": (datetime.now(timezone.utc) - timedelta(days=1)).date().isoformat()},
+        ))
+        return await client.get("/users/search", params=params, headers=self.headers), (200, 404)  # 404: no match
+
+    async def _scenario_update_user(self, client):
+        body = {"bio": f"Updated by load test {self.run_id} at {time.time():.3f}"}
+        return await client.put(f"/users/{self.random.choice(self.accounts).id}", json=body, headers=self.headers), (200,)
+
+    async def authenticate(self, client) -> None:
+        username, password = self.admin_credentials
+        response = await client.post("/login/", data={"username": username, "password": password})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def _record(self, route: str, latency: float, status: str, error: bool) -> None:
+        self.stats.setdefault(route, RouteStats()).add(latency, status, error)
+
+    async def _request(self, client, started: float) -> None:
+        name = self.random.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        try:
+            response, expected = await getattr(self, f"_scenario_{name}")(client)
+            self._record(ROUTES[name], time.perf_counter() - started, str(response.status_code),
+                         response.status_code not in expected)
+        except httpx.HTTPError as e:
+            self._record(ROUTES[name], time.perf_counter() - started, type(e).__name__, True)
+
+    async def run(self, duration: Optional[float] = None, requests: Optional[int] = None, concurrency: int = 10,
+                  rate: Optional[float] = None) -> Dict[str, dict]:
+        """Send load until ``duration`` seconds have passed or ``requests`` were sent; return the summary."""
+        if duration is None and requests is None:
+            raise ValueError("Give a duration or a number of requests")
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=30, transport=self.transport) as client:
+            await self.authenticate(client)
+            deadline = time.perf_counter() + duration if duration is not None else float("inf")
+            remaining = requests if requests is not None else float("inf")
+
+            def take() -> bool:
+                """Claim the next request, or False once the duration or request budget is spent."""
+                nonlocal remaining
+                if remaining <= 0 or time.perf_counter() >= deadline:
+                    return False
+                remaining -= 1
+                return True
+
+            started = time.perf_counter()
+            if rate is None:
+                async def client_loop():
+                    while take():
+                        await self._request(client, time.perf_counter())
+                await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+            else:
+                await self._open_loop(client, take, rate, concurrency)
+            elapsed = time.perf_counter() - started
+        return summarize(self.stats, elapsed)
+
+    async def _open_loop(self, client, take, rate: float, concurrency: int) -> None:
+        slots = asyncio.Semaphore(concurrency)
+        tasks = set()
+
+        async def arrival(scheduled: float):
+            async with slots:
+                await self._request(client, scheduled)
+
+        next_arrival = time.perf_counter()
+        while take():
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(arrival(next_arrival))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            next_arrival += self.random.expovariate(rate)
+        await asyncio.gather(*tasks)
+
+
+async def seed_accounts(count: int, run_id: str, password: str = PASSWORD) -> List[Account]:
+    """Insert ``count`` verified accounts sharing one bcrypt hash (hashed once, at the production cost)."""
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.models.user_model import User, UserRole
+    from app.utils.security import hash_password
+    from settings.config import settings
+
+    hashed = hash_password(password)
+    now = datetime.now(timezone.utc)
+    rows = [{
+        "id": uuid.uuid4(), "nickname": f"loadtest_{run_id}_{index}", "email": f"loadtest-{run_id}-{index}@example.com",
+        "first_name": "Load", "last_name": f"Test {index}", "hashed_password": hashed, "role": UserRole.AUTHENTICATED,
+        "email_verified": True, "created_at": now, "updated_at": now,
+    } for index in range(count)]
+    engine = create_async_engine(settings.database_url)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(insert(User), rows)
+    finally:
+        await engine.dispose()
+    return [Account(str(row["id"]), row["email"]) for row in rows]
+
+
+async def remove_accounts(run_id: str) -> int:
+    """Delete the users seeded or registered by run ``run_id``."""
+    from sqlalchemy import delete
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.models.user_model import User
+    from settings.config import settings
+
+    engine = create_async_engine(settings.database_url)
+    try:
+        async with engine.begin() as conn:
+            result = await conn.execute(delete(User).where(User.email.like(f"loadtest-{run_id}-%")))
+            return result.rowcount
+    finally:
+        await engine.dispose()
+
+
+def format_report(summary: Dict[str, dict], slo_results: List[Tuple[str, float, bool]]) -> str:
+    width = max([len(route) for route in summary] + [5])
+    columns = ["requests", "rps", "error_rate", *(f"p{pct}" for pct in PERCENTILES), "max"]
+    lines = [f"{'route':<{width}}" + "".join(f"{column:>11}" for column in columns)]
+    for route, row in summary.items():
+        lines.append(f"{route:<{width}}" + "".join(f"{row[column]:>11}" for column in columns))
+    lines.append("(latencies in ms, error_rate in %)")
+    for route, row in summary.items():
+        if route != ALL and row["error_rate"]:
+            lines.append(f"{route} status codes: {', '.join(f'{status}={count}' for status, count in row['statuses'].items())}")
+    for description, value, passed in slo_results:
+        lines.append(f"SLO {description}: {value:g} {'PASS' if passed else 'FAIL'}")
+    return "\n".join(lines)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """``"login=10,get_user=30"`` -> weights by scenario."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv=None) -> int:
+    from benchmarks.bench_server import wait_until_ready
+    from settings.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--start", action="store_true", help="start the app with gunicorn.conf.py on the --base-url port")
+    parser.add_argument("--duration", type=float, help="seconds of load (default 30 unless --requests is given)")
+    parser.add_argument("--requests", type=int, help="total number of requests")
+    parser.add_argument("--concurrency", type=int, default=10, help="clients (closed loop) or max in flight (open loop)")
+    parser.add_argument("--rate", type=float, help="open loop: arrivals per second")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help=f"scenario weights (default {','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())})")
+    parser.add_argument("--seed", type=int, help="seed the scenario picks and arrivals to replay the same run")
+    parser.add_argument("--accounts", type=int, default=200, help="verified accounts to seed")
+    parser.add_argument("--slo", action="append", type=parse_slo, default=[], help="threshold, e.g. p95<300 (repeatable)")
+    parser.add_argument("--json", help="also write the summary and SLO results to this file")
+    parser.add_argument("--keep-data", action="store_true", help="keep the seeded and registered users")
+    args = parser.parse_args(argv)
+    duration = args.duration if args.duration is not None or args.requests is not None else 30.0
+
+    process = None
+    if args.start:
+        port = httpx.URL(args.base_url).port or 8000
+        # Every client of the load test shares one address, which the login rate limits would throttle.
+        process = subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py", "app.main:app", "--bind", f"127.0.0.1:{port}"],
+                                   env={**os.environ, "RATE_LIMIT_ENABLED": "false", "FORWARDED_ALLOW_IPS": "127.0.0.1"},
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    run_id = uuid.uuid4().hex[:8]
+    try:
+        if process is not None:
+            asyncio.run(wait_until_ready(f"{args.base_url}/docs"))
+        accounts = asyncio.run(seed_accounts(args.accounts, run_id))
+        try:
+            load_test = LoadTest(args.base_url, accounts, (settings.admin_user, settings.admin_password),
+                                 mix=args.mix, run_id=run_id, seed=args.seed)
+            summary = asyncio.run(load_test.run(duration, args.requests, args.concurrency, args.rate))
+        finally:
+            if not args.keep_data:
+                asyncio.run(remove_accounts(run_id))
+    finally:
+        if process is not None:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait()
+
+    slo_results = evaluate_slos(summary, args.slo)
+    print(format_report(summary, slo_results))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"summary": summary, "slos": [
+                {"slo": description, "value": value, "passed": passed} for description, value, passed in slo_results
+            ]}, file, indent=2)
+    return 1 if any(not passed for *_, passed in slo_results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""
+Bulk seeding of the users table for performance testing (millions of rows).
+
+Faker is far too slow to call for every row at these volumes, so each generator process builds a
+pool of realistic templates once with a factory-boy factory (names, handles, email domains, bios)
+and assembles rows by combining random templates. Unique columns get the row number as a suffix.
+Rows are written in PostgreSQL's COPY text format and streamed to the database by every process
+over its own connection. Password hashes are drawn from a small pool of bcrypt hashes of one
+password, computed once up front, so seeded accounts can log in.
+
+Distributions: roles 10% ANONYMOUS (unverified), 84% AUTHENTICATED, 5% MANAGER, 1% ADMIN; 2% of
+accounts locked; 20% professional; registrations spread over ``--years`` with more recent ones.
+
+    python -m benchmarks.seed_users 1000000 [--workers 8] [--truncate] [--seed 42]
+    python -m benchmarks.seed_users 100000 --output users.copy   # write the COPY file only
+
+The database is ``settings.database_url`` and must already have the schema (alembic upgrade head).
+"""
+
+from builtins import ValueError, bool, int, len, list, max, min, open, print, range, round, str, sum
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+
+import factory
+
+COLUMNS = (
+    "id", "nickname", "email", "first_name", "last_name", "bio", "profile_picture_url", "linkedin_profile_url",
+    "github_profile_url", "role", "is_professional", "professional_status_updated_at", "last_login_at",
+    "failed_login_attempts", "is_locked", "created_at", "updated_at", "email_verified", "hashed_password",
+)
+# Cumulative percentages: 10% ANONYMOUS, 84% AUTHENTICATED, 5% MANAGER, 1% ADMIN
+ROLES = ["ANONYMOUS"] * 10 + ["AUTHENTICATED"] * 84 + ["MANAGER"] * 5 + ["ADMIN"]
+LOCKED_PERCENT = 2
+PROFESSIONAL_PERCENT = 20
+NULL = "\\N"
+_UUID_CLEAR = ~(0xF000 << 64 | 0xC000 << 48)
+_UUID_SET = 0x4000 << 64 | 0x8000 << 48
+BATCH_ROWS = 20000
+DEFAULT_PASSWORD = "Seeded$1234"
+
+
+class UserTemplateFactory(factory.DictFactory):
+    """Realistic values that rows are assembled from."""
+
+    first_name = factory.Faker("first_name")
+    last_name = factory.Faker("last_name")
+    handle = factory.Faker("user_name")
+    domain = factory.Faker("free_email_domain")
+    bio = factory.Faker("paragraph", nb_sentences=3)
+
+
+def _escape(value: str) -> str:
+    """Escape a value for the COPY text format."""
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def build_templates(count: int, seed: Optional[int] = None) -> List[dict]:
+    if seed is not None:
+        from factory.random import reseed_random
+        reseed_random(seed)
+    templates = []
+    for template in UserTemplateFactory.build_batch(count):
+        templates.append({
+            "first_name": _escape(template["first_name"][:100]),
+            "last_name": _escape(template["last_name"][:100]),
+            "handle": "".join(char for char in template["handle"].lower() if char.isalnum() or char == "_")[:30] or "user",
+            "domain": template["domain"],
+            "bio": _escape(template["bio"][:500]),
+        })
+    return templates
+
+
+def generate_rows(start: int, stop: int, templates: List[dict], hashes: List[str], now: datetime, years: float,
+                  seed: Optional[int] = None, max_login_attempts: int = 3) -> Iterator[str]:
+    """COPY text lines (with trailing newline) for rows ``start`` to ``stop``; row numbers are unique."""
+    rng = random.Random(None if seed is None else seed * 1_000_003 + start)
+    getrandbits, uniform = rng.getrandbits, rng.random
+    # Timestamps are whole seconds since ``origin``, rendered from per-day and per-second tables,
+    # which is several times faster than formatting a datetime per row.
+    end = int(now.timestamp())
+    span = int(years * 365 * 86400)
+    origin = (end - span) // 86400 * 86400
+    first_day = datetime.fromtimestamp(origin, timezone.utc)
+    days = [(first_day + timedelta(days=day)).strftime("%Y-%m-%d ") for day in range((end - origin) // 86400 + 1)]
+    clock = [f"{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}+00" for second in range(86400)]
+    template_count, hash_count = len(templates), len(hashes)
+    max_attempts = str(max_login_attempts)
+    for number in range(start, stop):
+        # One draw of random bits covers every small choice of the row.
+        bits = getrandbits(64)
+        first = templates[(bits & 0xFFFFF) % template_count]
+        last = templates[(bits >> 20 & 0xFFFFF) % template_count]
+        other = templates[(bits >> 40 & 0xFFFFF) % template_count]
+        handle = other["handle"]
+        choices = getrandbits(48)
+        role = ROLES[choices % 100]
+        verified = role != "ANONYMOUS"
+        locked = (choices >> 7) % 100 < LOCKED_PERCENT
+        professional = (choices >> 14) % 100 < PROFESSIONAL_PERCENT
+        has_profile = choices >> 21 & 3 != 0
+        # Registrations grow over time: the density increases linearly towards now.
+        created = end - int(span * (1 - math.sqrt(uniform())))
+        updated = created + int((end - created) * uniform() * uniform())
+        created_at = days[(created - origin) // 86400] + clock[(created - origin) % 86400]
+        updated_at = days[(updated - origin) // 86400] + clock[(updated - origin) % 86400]
+        suffix = str(number)
+        yield "\t".join((
+            # Random version 4 UUID; PostgreSQL accepts the 32 hex digits without hyphens.
+            "%032x" % (getrandbits(128) & _UUID_CLEAR | _UUID_SET),
+            f"{handle}_{suffix}",
+            f"{handle}.{suffix}@{first['domain']}",
+            first["first_name"],
+            last["last_name"],
+            other["bio"] if has_profile else NULL,
+            f"https://example.com/profiles/{suffix}.jpg" if has_profile else NULL,
+            f"https://linkedin.com/in/{handle}{suffix}" if has_profile and professional else NULL,
+            f"https://github.com/{handle}{suffix}" if has_profile and choices >> 23 & 1 else NULL,
+            role,
+            "t" if professional else "f",
+            updated_at if professional else NULL,
+            updated_at if verified and not locked else NULL,
+            max_attempts if locked else ("1" if choices >> 24 & 15 == 0 else "0"),
+            "t" if locked else "f",
+            created_at,
+            updated_at,
+            "t" if verified else "f",
+            hashes[(choices >> 28) % hash_count],
+        )) + "\n"
+
+
+def hash_pool(password: str, size: int, rounds: int, processes: int) -> List[str]:
+    """``size`` distinct bcrypt hashes of ``password`` (different salts), computed in parallel."""
+    with multiprocessing.Pool(processes) as pool:
+        return pool.starmap(_hash, [(password, rounds)] * size)
+
+
+def _hash(password: str, rounds: int) -> str:
+    from app.utils.security import hash_password
+    return hash_password(password, rounds=rounds)
+
+
+def _batches(lines: Iterator[str], size: int = BATCH_ROWS) -> Iterator[bytes]:
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == size:
+            yield "".join(batch).encode()
+            batch = []
+    if batch:
+        yield "".join(batch).encode()
+
+
+def _dsn() -> str:
+    from settings.config import settings
+    return settings.database_url.replace("+asyncpg", "")
+
+
+async def _copy(dsn: str, batches: Iterator[bytes]) -> None:
+    import asyncpg
+
+    async def source():
+        for batch in batches:
+            yield batch
+
+    connection = await asyncpg.connect(dsn)
+    try:
+        await connection.copy_to_table("users", source=source(), columns=list(COLUMNS), format="text")
+    finally:
+        await connection.close()
+
+
+def _worker(job: dict) -> int:
+    """Generate rows ``start`` to ``stop`` and COPY them to ``dsn`` (or write them to ``output``)."""
+    templates = build_templates(job["templates"], job["seed"])
+    lines = generate_rows(job["start"], job["stop"], templates, job["hashes"], job["now"], job["years"], job["seed"],
+                          job["max_login_attempts"])
+    if job["output"]:
+        with open(job["output"], "wb") as file:
+            for batch in _batches(lines):
+                file.write(batch)
+    else:
+        asyncio.run(_copy(job["dsn"], _batches(lines)))
+    return job["stop"] - job["start"]
+
+
+def seed(rows: int, workers: int, hashes: List[str], dsn: Optional[str] = None, output: Optional[str] = None,
+         start: int = 0, years: float = 5, templates: int = 2000, seed: Optional[int] = None) -> int:
+    """
+    Split rows ``start`` to ``start + rows`` across ``workers`` processes; returns the rows written.
+    With ``output`` the COPY data is written to that file (one part per worker, then concatenated).
+    """
+    from settings.config import settings
+
+    if (dsn is None) == (output is None):
+        raise ValueError("Give either a database DSN or an output file")
+    now = datetime.now(timezone.utc)
+    bounds = [start + rows * index // workers for index in range(workers + 1)]
+    jobs = [{
+        "start": bounds[index], "stop": bounds[index + 1], "hashes": hashes, "now": now, "years": years,
+        "templates": templates, "seed": None if seed is None else seed + index, "dsn": dsn,
+        "output": f"{output}.part{index}" if output else None, "max_login_attempts": settings.max_login_attempts,
+    } for index in range(workers)]
+    if workers == 1:
+        written = _worker(jobs[0])
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            written = sum(pool.map(_worker, jobs))
+    if output:
+        with open(output, "wb") as file:
+            for job in jobs:
+                with open(job["output"], "rb") as part:
+                    while chunk := part.read(1 << 20):
+                        file.write(chunk)
+                os.unlink(job["output"])
+    return written
+
+
+async def _prepare(dsn: str, truncate: bool) -> int:
+    """Truncate the table if asked; return the row count, where numbering continues so unique columns stay unique."""
+    import asyncpg
+    connection = await asyncpg.connect(dsn)
+    try:
+        if truncate:
+            await connection.execute("TRUNCATE users")
+        return await connection.fetchval("SELECT count(*) FROM users")
+    finally:
+        await connection.close()
+
+
+async def _drop_indexes(dsn: str) -> List[str]:
+    """Drop the users indexes not backing a constraint and return their definitions."""
+    import asyncpg
+    connection = await asyncpg.connect(dsn)
+    try:
+        rows = await connection.fetch(
+            "SELECT indexrelid::regclass::text AS name, pg_get_indexdef(indexrelid) AS definition FROM pg_index i "
+            "WHERE indrelid = 'users'::regclass "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)"
+        )
+        for row in rows:
+            await connection.execute(f"DROP INDEX {row['name']}")
+        return [row["definition"] for row in rows]
+    finally:
+        await connection.close()
+
+
+async def _create_indexes(dsn: str, definitions: List[str]) -> None:
+    import asyncpg
+
+    async def create(definition: str) -> None:
+        connection = await asyncpg.connect(dsn)
+        try:
+            await connection.execute(definition)
+        finally:
+            await connection.close()
+
+    # One connection per index, so PostgreSQL builds them in parallel.
+    await asyncio.gather(*(create(definition) for definition in definitions))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="generator processes (default: cores)")
+    parser.add_argument("--output", help="write the COPY data to this file instead of loading it")
+    parser.add_argument("--truncate", action="store_true", help="empty the users table first")
+    parser.add_argument("--defer-indexes", action="store_true",
+                        help="drop the secondary indexes during the load and rebuild them afterwards (faster for large loads)")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help=f"password of every seeded account (default {DEFAULT_PASSWORD})")
+    parser.add_argument("--hash-pool", type=int, default=32, help="distinct bcrypt hashes to draw from (default 32)")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost of the pool (default 12, as in production)")
+    parser.add_argument("--years", type=float, default=5, help="registration dates span this many years (default 5)")
+    parser.add_argument("--seed", type=int, help="make the generated data reproducible")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    hashes = hash_pool(args.password, args.hash_pool, args.rounds, args.workers)
+    print(f"hashed {len(hashes)} passwords in {time.perf_counter() - started:.1f}s")
+
+    dsn = None if args.output else _dsn()
+    start = 0 if dsn is None else asyncio.run(_prepare(dsn, args.truncate))
+    indexes = asyncio.run(_drop_indexes(dsn)) if dsn and args.defer_indexes else []
+    started = time.perf_counter()
+    try:
+        written = seed(args.rows, min(args.workers, max(args.rows, 1)), hashes, dsn=dsn, output=args.output,
+                       start=start, years=args.years, seed=args.seed)
+        elapsed = time.perf_counter() - started
+        print(f"{written} rows in {elapsed:.1f}s ({round(written / elapsed) if elapsed else written} rows/s, "
+              f"{args.workers} workers)")
+    finally:
+        if indexes:
+            started = time.perf_counter()
+            asyncio.run(_create_indexes(dsn, indexes))
+            print(f"rebuilt {len(indexes)} indexes in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Password hashing and JWT round trips."""
+import pytest
+
+from app.services.jwt_service import create_access_token, decode_token
+from app.utils.security import hash_password, verify_password
+
+PASSWORD = "MySuperPassword$1234"
+
+
+@pytest.fixture(scope="module")
+def hashed_password():
+    return hash_password(PASSWORD)
+
+
+def test_hash_password(benchmark):
+    # bcrypt at the production cost factor takes hundreds of milliseconds per call, so time only a few calls.
+    hashed = benchmark.pedantic(hash_password, args=(PASSWORD,), rounds=5, iterations=1)
+    assert hashed.startswith("$2b$12$")
+
+
+def test_verify_password(benchmark, hashed_password):
+    assert benchmark.pedantic(verify_password, args=(PASSWORD, hashed_password), rounds=5, iterations=1)
+
+
+def test_create_access_token(benchmark):
+    token = benchmark(create_access_token, data={"sub": "john_doe_123", "role": "authenticated"})
+    assert token
+
+
+def test_decode_token(benchmark):
+    token = create_access_token(data={"sub": "john_doe_123", "role": "authenticated"})
+    assert benchmark(decode_token, token)["sub"] == "john_doe_123"
@@ -0,0 +1,44 @@
+"""UserService queries against a seeded database."""
+import pytest
+
+from app.services.user_service import UserService
+from benchmarks.conftest import SEEDED_USERS
+
+
+@pytest.fixture
+def run_query(seeded_database, event_loop_runner):
+    session_factory, _ = seeded_database
+
+    def run(query, *args, **kwargs):
+        async def execute():
+            async with session_factory() as session:
+                return await query(session, *args, **kwargs)
+        return event_loop_runner(execute())
+    return run
+
+
+@pytest.fixture
+def seeded_user(seeded_database):
+    return seeded_database[1][SEEDED_USERS // 2]
+
+
+def test_get_by_id(benchmark, run_query, seeded_user):
+    assert benchmark(run_query, UserService.get_by_id, seeded_user["id"]).id == seeded_user["id"]
+
+
+def test_get_by_email(benchmark, run_query, seeded_user):
+    assert benchmark(run_query, UserService.get_by_email, seeded_user["email"]).id == seeded_user["id"]
+
+
+@pytest.mark.parametrize("limit", [10, 100])
+def test_list_users(benchmark, run_query, limit):
+    assert len(benchmark(run_query, UserService.list_users, 0, limit)) == limit
+
+
+def test_count(benchmark, run_query):
+    assert benchmark(run_query, UserService.count) == SEEDED_USERS
+
+
+def test_search_and_filter_users(benchmark, run_query):
+    users, total = benchmark(run_query, UserService.search_and_filter_users, username="bench_user_1", limit=10)
+    assert total == 111 and len(users) == 10
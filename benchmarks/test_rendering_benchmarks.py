@@ -0,0 +1,26 @@
+"""Email templates and hypermedia links."""
+import uuid
+
+from app.utils.link_generation import create_user_links, generate_pagination_links
+from app.utils.template_manager import TemplateManager
+
+
+def test_render_template(benchmark):
+    manager = TemplateManager()
+    html = benchmark(
+        manager.render_template, "email_verification",
+        name="John", verification_url="http://testserver/verify-email/abc/def",
+    )
+    assert "John" in html
+
+
+def test_create_user_links(benchmark, request_factory):
+    request = request_factory()
+    links = benchmark(create_user_links, uuid.uuid4(), request)
+    assert len(links) == 3
+
+
+def test_generate_pagination_links(benchmark, request_factory):
+    request = request_factory(query_string=b"skip=20&limit=10")
+    links = benchmark(generate_pagination_links, request, 20, 10, 1000)
+    assert {link.rel for link in links} == {"self", "first", "last", "next", "prev"}
@@ -0,0 +1,16 @@
+"""User list serialization, through the response models and through the field-plan serializer."""
+import pytest
+
+from benchmarks.bench_serialization import fast_page, validated_page
+
+
+@pytest.mark.parametrize("rows", [100, 1000])
+def test_user_response_models(benchmark, users_1000, rows):
+    benchmark.group = f"serialize {rows} users"
+    assert benchmark(validated_page, users_1000[:rows])
+
+
+@pytest.mark.parametrize("rows", [100, 1000])
+def test_user_field_plan(benchmark, users_1000, rows):
+    benchmark.group = f"serialize {rows} users"
+    assert benchmark(fast_page, users_1000[:rows])
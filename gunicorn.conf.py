@@ -0,0 +1,87 @@
+# gunicorn.conf.py
+"""
+Production server profile: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Every value can be overridden through the environment (WEB_CONCURRENCY, PORT, ...), so the
+same file serves a laptop, a container and a large host.
+"""
+import gc
+import os
+import shutil
+import tempfile
+
+
+def _cpu_count() -> int:
+    # Respect CPU affinity (e.g. taskset or container cpusets) where the platform exposes it.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+
+# Async workers each saturate a core, so one worker per core is the default.
+workers = int(os.getenv("WEB_CONCURRENCY", _cpu_count()))
+# UvicornWorker uses uvloop and httptools automatically when they are installed.
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the application once in the master and fork it, so workers share its memory copy-on-write.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Recycle workers periodically; the jitter keeps them from all restarting at the same moment.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+# On SIGTERM, workers stop accepting connections and get graceful_timeout seconds to finish in-flight requests.
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Prometheus multiprocess mode: workers write their samples to files in this directory and
+# /metrics aggregates them. It has to be set before the app (and prometheus_client) is imported.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus_multiproc"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+# Behind nginx the client address comes from X-Forwarded-For, which the per-IP rate limits rely on.
+# Only addresses listed here are trusted to set it. There is no safe default: without the proxy's
+# address every client shares the proxy's bucket, with "*" any client picks its own address.
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS")
+if not forwarded_allow_ips:
+    raise RuntimeError("FORWARDED_ALLOW_IPS must list the reverse proxy's addresses (127.0.0.1 without a proxy)")
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+
+def on_starting(server):
+    """Start from an empty metrics directory; samples left by a previous master are stale.
+
+    Runs after the preload but before any worker is forked, and the master serves no requests.
+    """
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited (recycled or crashed)."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    """Runs in the master after the preloaded app is imported and before workers are forked."""
+    if preload_app:
+        # Generate the OpenAPI schema once here instead of once per worker.
+        from app.main import settings
+        from app.utils.openapi_cache import prepare_openapi_schema
+        prepare_openapi_schema(server.app.callable, settings.openapi_schema_file or None)
+        # Move everything imported so far into the permanent generation. The garbage collector
+        # then never touches (and never writes to) those objects, so forked workers keep sharing
+        # their pages instead of copying them.
+        gc.collect()
+        gc.freeze()
+        server.log.info("Froze %d objects before forking workers", gc.get_freeze_count())
@@ -32,6 +32,9 @@ from app.main import app
 from app.database import Base, Database
 from app.models.user_model import User, UserRole
 from app.dependencies import get_db, get_settings
+from app.utils.loop_monitor import LoopMonitor
+from app.utils.query_counter import max_queries
+from app.utils.rate_limit import rate_limiter
 from app.utils.security import hash_password
 from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
@@ -64,6 +67,11 @@ async def async_client(db_session):
         finally:
             app.dependency_overrides.clear()
 
+@pytest.fixture
+def assert_max_queries():
+    """``with assert_max_queries(n):`` fails when the block needs more than n database round trips."""
+    return max_queries
+
 @pytest.fixture(scope="session", autouse=True)
 def initialize_database():
     try:
@@ -81,6 +89,34 @@ async def setup_database():
         # you can comment out this line during development if you are debugging a single test
          await conn.run_sync(Base.metadata.drop_all)
     await engine.dispose()
+    # The application's pool too (used by the idempotency middleware): its connections belong to this test's loop.
+    await Database.get_engine().dispose()
+
+@pytest.fixture(scope="function", autouse=True)
+async def fail_on_blocked_event_loop():
+    """
+    With LOOP_MONITOR_FAIL_TESTS=true, fail tests during which a route blocks the event loop.
+
+    Blocking outside any request, such as the password hashing of the user fixtures, is not counted:
+    the monitor runs through fixture setup too, and fixtures are not the code under test.
+    """
+    if not settings.loop_monitor_fail_tests:
+        yield
+        return
+    monitor = LoopMonitor(settings.loop_monitor_interval_ms / 1000, settings.loop_monitor_threshold_ms / 1000)
+    monitor.start()
+    yield
+    await monitor.stop()
+    blocked = [event for event in monitor.events if event["route"] is not None]
+    if blocked:
+        pytest.fail("Event loop blocked:\n" + "\n".join(
+            f"{event['blocked_ms']} ms in {event['route']}:\n{''.join(event['stack'][-5:])}" for event in blocked
+        ))
+
+@pytest.fixture(scope="function", autouse=True)
+def reset_rate_limits():
+    """Every test logs in from the same client address with full buckets."""
+    rate_limiter.reset()
 
 @pytest.fixture(scope="function")
 async def db_session(setup_database):
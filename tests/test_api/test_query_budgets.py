@@ -0,0 +1,79 @@
+"""
+Database round-trip budgets per route (statements plus COMMIT/ROLLBACK).
+
+A failure lists the statements that were issued. Raise a budget only when the extra round trip
+is intended; an unexpected increase usually means an N+1 pattern or a redundant lookup.
+"""
+from builtins import str
+from urllib.parse import urlencode
+
+import pytest
+from app.dependencies import get_email_service
+from app.main import app
+from app.utils.nickname_gen import generate_nickname
+
+
+@pytest.fixture
+def mocked_email(email_service):
+    app.dependency_overrides[get_email_service] = lambda: email_service
+    yield email_service
+    app.dependency_overrides.pop(get_email_service, None)
+
+@pytest.mark.asyncio
+async def test_create_user_query_budget(async_client, admin_token, mocked_email, assert_max_queries):
+    user_data = {"nickname": generate_nickname(), "email": "budget@example.com", "password": "sS#fdasrongPassword123!", "role": "AUTHENTICATED"}
+    with assert_max_queries(10):
+        response = await async_client.post("/users/", json=user_data, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 201
+
+@pytest.mark.asyncio
+async def test_register_query_budget(async_client, mocked_email, assert_max_queries):
+    with assert_max_queries(8):
+        response = await async_client.post("/register/", json={"email": "budget@example.com", "password": "sS#fdasrongPassword123!", "role": "AUTHENTICATED"})
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_login_query_budget(async_client, verified_user, assert_max_queries):
+    form = urlencode({"username": verified_user.email, "password": "MySuperPassword$1234"})
+    with assert_max_queries(4):
+        response = await async_client.post("/login/", data=form, headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_get_user_query_budget(async_client, admin_user, admin_token, assert_max_queries):
+    with assert_max_queries(2):
+        response = await async_client.get(f"/users/{admin_user.id}", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_update_user_query_budget(async_client, admin_user, admin_token, assert_max_queries):
+    with assert_max_queries(5):
+        response = await async_client.put(f"/users/{admin_user.id}", json={"first_name": "Budget"},
+                                          headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_delete_user_query_budget(async_client, admin_user, admin_token, assert_max_queries):
+    with assert_max_queries(5):
+        response = await async_client.delete(f"/users/{admin_user.id}", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 204
+
+@pytest.mark.asyncio
+async def test_list_users_query_budget(async_client, admin_token, admin_user, manager_user, assert_max_queries):
+    with assert_max_queries(3):
+        response = await async_client.get("/users/?limit=20", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_search_users_query_budget(async_client, admin_token, admin_user, manager_user, assert_max_queries):
+    with assert_max_queries(2):
+        response = await async_client.get("/users/search?role=MANAGER&limit=20", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_verify_email_query_budget(async_client, db_session, unverified_user, assert_max_queries):
+    unverified_user.verification_token = "budget-token"
+    await db_session.commit()
+    with assert_max_queries(3):
+        response = await async_client.get(f"/verify-email/{unverified_user.id}/budget-token")
+    assert response.status_code == 200
@@ -87,3 +87,10 @@ async def test_search_users_invalid_input_format(async_client, admin_token):
     data = response.json()
     assert data[
                "detail"] == f"Invalid role '{invalid_role}'. Valid roles are: {', '.join([role.name for role in UserRole])}"
+
+@pytest.mark.asyncio
+async def test_search_users_sparse_fields(async_client, admin_token, admin_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/search?role=ADMIN&fields=id,nickname&links=none", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["items"] == [{"id": str(admin_user.id), "nickname": admin_user.nickname}]
@@ -1,4 +1,5 @@
 from builtins import str
+import json
 import pytest
 from httpx import AsyncClient
 from app.main import app
@@ -264,4 +265,102 @@ async def test_login_with_incorrect_admin_username(async_client: AsyncClient):
 
     # Check error message
     detail = response.json().get("detail")
-    assert "Incorrect email or password." in detail, "Error message should indicate incorrect credentials."
\ No newline at end of file
+    assert "Incorrect email or password." in detail, "Error message should indicate incorrect credentials."
+@pytest.mark.asyncio
+async def test_retrieve_user_links(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get(f"/users/{admin_user.id}", headers=headers)
+    assert [link["href"] for link in response.json()["links"]] == [f"http://testserver/users/{admin_user.id}"] * 3
+    response = await async_client.get(f"/users/{admin_user.id}?links=none", headers=headers)
+    assert "links" not in response.json()
+    response = await async_client.get(f"/users/{admin_user.id}?links=bogus", headers=headers)
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_list_users_pagination_links(async_client, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/?skip=10&limit=10&links=minimal", headers={"Authorization": f"Bearer {admin_token}"})
+    data = response.json()
+    assert [link["rel"] for link in data["links"]] == ["next", "prev"]
+    assert "links=minimal" in data["links"][0]["href"]
+    assert all([link["rel"] for link in item["links"]] == ["self"] for item in data["items"])
+
+@pytest.mark.asyncio
+async def test_retrieve_user_conditional_get(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get(f"/users/{admin_user.id}", headers=headers)
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    response = await async_client.get(f"/users/{admin_user.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+@pytest.mark.asyncio
+async def test_retrieve_user_conditional_get_after_update(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    etag = (await async_client.get(f"/users/{admin_user.id}", headers=headers)).headers["ETag"]
+    await async_client.put(f"/users/{admin_user.id}", json={"first_name": "Jane"}, headers=headers)
+    response = await async_client.get(f"/users/{admin_user.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+@pytest.mark.asyncio
+async def test_retrieve_user_conditional_get_after_delete(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    etag = (await async_client.get(f"/users/{admin_user.id}", headers=headers)).headers["ETag"]
+    await async_client.delete(f"/users/{admin_user.id}", headers=headers)
+    response = await async_client.get(f"/users/{admin_user.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_list_users_conditional_get(async_client, admin_user, manager_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    etag = (await async_client.get("/users/", headers=headers)).headers["ETag"]
+    response = await async_client.get("/users/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    await async_client.put(f"/users/{manager_user.id}", json={"first_name": "Jane"}, headers=headers)
+    response = await async_client.get("/users/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    await async_client.delete(f"/users/{manager_user.id}", headers=headers)
+    response = await async_client.get("/users/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+
+@pytest.mark.asyncio
+async def test_retrieve_user_sparse_fields(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get(f"/users/{admin_user.id}?fields=nickname,id&links=none", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"id": str(admin_user.id), "nickname": admin_user.nickname}
+    assert "ETag" in response.headers
+
+@pytest.mark.asyncio
+async def test_retrieve_user_invalid_fields(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get(f"/users/{admin_user.id}?fields=id,hashed_password", headers=headers)
+    assert response.status_code == 400
+    assert "hashed_password" in response.json()["detail"]
+
+@pytest.mark.asyncio
+async def test_list_users_sparse_fields(async_client, admin_user, manager_user, admin_token):
+    response = await async_client.get("/users/?fields=email,role", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    for item in response.json()["items"]:
+        assert set(item) == {"email", "role", "links"}
+
+@pytest.mark.asyncio
+async def test_export_users(async_client, admin_user, manager_user, admin_token):
+    response = await async_client.get("/users/export?fields=id,email", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(row["email"] for row in rows) == sorted([admin_user.email, manager_user.email])
+    assert all(set(row) == {"id", "email"} for row in rows)
+
+@pytest.mark.asyncio
+async def test_export_users_access_denied(async_client, manager_token):
+    response = await async_client.get("/users/export", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
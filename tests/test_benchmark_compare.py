@@ -0,0 +1,20 @@
+import json
+from benchmarks.compare import compare, main
+
+
+def write_results(path, medians):
+    path.write_text(json.dumps({"benchmarks": [
+        {"fullname": name, "stats": {"min": value, "max": value, "mean": value, "median": value}}
+        for name, value in medians.items()
+    ]}))
+    return str(path)
+
+def test_compare_flags_only_slowdowns_beyond_threshold():
+    rows = compare({"a": 1.0, "b": 1.0, "c": 1.0, "gone": 1.0}, {"a": 1.05, "b": 1.5, "c": 0.5, "new": 1.0}, 10)
+    assert [(name, regressed) for name, *_, regressed in rows] == [("a", False), ("b", True), ("c", False)]
+
+def test_main_exit_status(tmp_path):
+    baseline = write_results(tmp_path / "baseline.json", {"a": 1.0})
+    slower = write_results(tmp_path / "slower.json", {"a": 1.25})
+    assert main([baseline, slower]) == 1
+    assert main([baseline, slower, "--threshold", "30"]) == 0
@@ -0,0 +1,133 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from httpx import AsyncClient
+from sqlalchemy import func, select, update
+
+from app.database import Database
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.models.idempotency_model import IdempotencyKey
+from app.models.user_model import User
+from app.services.email_service import EmailService
+from app.services.idempotency_service import ClaimState, IdempotencyService
+from app.services.user_service import UserService
+from app.utils.metrics import IDEMPOTENT_REQUESTS
+
+USER_DATA = {"email": "retrying.client@example.com", "password": "AValid$Pass123", "role": "AUTHENTICATED"}
+
+
+@pytest.fixture(autouse=True)
+def send_verification_email():
+    with patch.object(EmailService, "send_verification_email", AsyncMock()) as send:
+        yield send
+
+async def count_users(db_session, email):
+    return await db_session.scalar(select(func.count()).select_from(User).where(User.email == email))
+
+async def test_register_retry_is_replayed(async_client, db_session, send_verification_email):
+    headers = {"Idempotency-Key": "register-1"}
+    first = await async_client.post("/register/", json=USER_DATA, headers=headers)
+    replayed = IDEMPOTENT_REQUESTS.labels("replayed")._value.get()
+    retry = await async_client.post("/register/", json=USER_DATA, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.content == first.content and retry.headers["content-type"] == first.headers["content-type"]
+    assert retry.headers["Idempotent-Replayed"] == "true" and "Idempotent-Replayed" not in first.headers
+    assert IDEMPOTENT_REQUESTS.labels("replayed")._value.get() == replayed + 1
+    assert send_verification_email.await_count == 1
+    assert await count_users(db_session, USER_DATA["email"]) == 1
+
+    # Without a key the request runs again.
+    assert (await async_client.post("/register/", json=USER_DATA)).status_code == 400
+
+async def test_concurrent_duplicates_wait_for_the_first(async_client, db_session):
+    register_user = UserService.register_user
+
+    async def slow_register(*args):
+        await asyncio.sleep(0.2)
+        return await register_user(*args)
+
+    headers = {"Idempotency-Key": "register-2"}
+    with patch.object(UserService, "register_user", AsyncMock(side_effect=slow_register)) as register:
+        responses = await asyncio.gather(*(
+            async_client.post("/register/", json=USER_DATA, headers=headers) for _ in range(3)
+        ))
+    assert register.await_count == 1
+    assert [response.status_code for response in responses] == [200] * 3
+    assert len({response.content for response in responses}) == 1
+    assert sum("Idempotent-Replayed" in response.headers for response in responses) == 2
+    assert await count_users(db_session, USER_DATA["email"]) == 1
+
+async def test_create_user_keys_are_scoped_to_the_caller(async_client, admin_token, manager_token):
+    user_data = {**USER_DATA, "email": "created.by.admin@example.com"}
+    admin = {"Authorization": f"Bearer {admin_token}", "Idempotency-Key": "create-1"}
+    first = await async_client.post("/users/", json=user_data, headers=admin)
+    retry = await async_client.post("/users/", json=user_data, headers=admin)
+    assert first.status_code == retry.status_code == 201 and retry.content == first.content
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+    # The same key from another user is a new request, which finds the email taken.
+    manager = {"Authorization": f"Bearer {manager_token}", "Idempotency-Key": "create-1"}
+    response = await async_client.post("/users/", json=user_data, headers=manager)
+    assert response.status_code == 400 and "Idempotent-Replayed" not in response.headers
+
+async def test_key_reused_for_another_request(async_client):
+    headers = {"Idempotency-Key": "register-3"}
+    with patch.object(UserService, "register_user", AsyncMock(return_value=None)):
+        assert (await async_client.post("/register/", json=USER_DATA, headers=headers)).status_code == 400
+        response = await async_client.post("/register/", json={**USER_DATA, "email": "other@example.com"}, headers=headers)
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Idempotency-Key was already used for a different request."
+    assert (await async_client.post("/register/", json=USER_DATA, headers={"Idempotency-Key": "x" * 256})).status_code == 400
+
+async def test_server_errors_are_not_stored(async_client, db_session):
+    headers = {"Idempotency-Key": "register-4"}
+    with patch.object(UserService, "register_user", AsyncMock(side_effect=HTTPException(status_code=503))):
+        assert (await async_client.post("/register/", json=USER_DATA, headers=headers)).status_code == 503
+    response = await async_client.post("/register/", json=USER_DATA, headers=headers)
+    assert response.status_code == 200 and "Idempotent-Replayed" not in response.headers
+
+    # Once expired, the key runs the request again.
+    await db_session.execute(update(IdempotencyKey).values(expires_at=func.now() - func.make_interval(0, 0, 0, 0, 1)))
+    await db_session.commit()
+    response = await async_client.post("/register/", json=USER_DATA, headers=headers)
+    assert response.status_code == 400 and "Idempotent-Replayed" not in response.headers
+    assert await count_users(db_session, USER_DATA["email"]) == 1
+
+async def test_duplicate_in_another_worker():
+    release = asyncio.Event()
+    app = FastAPI()
+
+    @app.post("/register/")
+    async def register():
+        await release.wait()
+        return {"registered": True}
+
+    # Two workers: separate middleware instances sharing the idempotency table.
+    first_worker = AsyncClient(app=IdempotencyMiddleware(app, {"/register/"}), base_url="http://testserver")
+    second_worker = AsyncClient(app=IdempotencyMiddleware(app, {"/register/"}, wait_timeout=0.2), base_url="http://testserver")
+    headers = {"Idempotency-Key": "register-5"}
+    async with first_worker, second_worker:
+        first = asyncio.create_task(first_worker.post("/register/", json=USER_DATA, headers=headers))
+        await asyncio.sleep(0.1)
+        response = await second_worker.post("/register/", json=USER_DATA, headers=headers)
+        assert response.status_code == 409 and response.headers["Retry-After"] == "1"
+        release.set()
+        assert (await first).json() == {"registered": True}
+        response = await second_worker.post("/register/", json=USER_DATA, headers=headers)
+        assert response.json() == {"registered": True} and response.headers["Idempotent-Replayed"] == "true"
+
+async def test_abandoned_claim_is_taken_over(db_session):
+    async def claim(fingerprint="f" * 64):
+        async with Database.get_session_factory()() as session:
+            state, _ = await IdempotencyService.claim(session, "ip:10.0.0.1", "key", fingerprint, ttl=60, lock_timeout=60)
+        return state
+
+    assert await claim() is ClaimState.CLAIMED
+    assert await claim() is ClaimState.IN_FLIGHT
+    # The worker running the first request died; once its lock expired the key can be claimed again.
+    await db_session.execute(update(IdempotencyKey).values(locked_until=func.now() - func.make_interval(0, 0, 0, 0, 1)))
+    await db_session.commit()
+    assert await claim("0" * 64) is ClaimState.MISMATCH
+    assert await claim() is ClaimState.CLAIMED
@@ -0,0 +1,215 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.database import Database
+from app.models.job_model import Job, JobStatus
+from app.services.job_service import JobService
+from app.utils.job_runner import RECURRING_KEY, JobRunner, JobType
+from app.utils.metrics import JOBS_FINISHED
+
+
+def make_runner(*types, **options):
+    return JobRunner({job.name: job for job in types}, **options)
+
+async def enqueue(name, payload=None, **options):
+    async with Database.get_session_factory()() as session:
+        job_id = await JobService.enqueue(session, name, payload, **options)
+        await session.commit()
+    return job_id
+
+async def get_job(db_session, job_id):
+    return await db_session.scalar(select(Job).where(Job.id == job_id).execution_options(populate_existing=True))
+
+async def drain(runner):
+    """Let the jobs the runner started finish and record their outcome."""
+    while runner._tasks:
+        await asyncio.wait(list(runner._tasks))
+
+async def test_job_runs_and_succeeds(db_session):
+    seen = []
+
+    async def handler(payload):
+        seen.append(payload)
+
+    runner = make_runner(JobType("greet", handler))
+    job_id = await enqueue("greet", {"name": "Ada"})
+    succeeded = JOBS_FINISHED.labels("greet", "succeeded")._value.get()
+    assert await runner.run_once() == 1
+    await drain(runner)
+    assert seen == [{"name": "Ada"}]
+    job = await get_job(db_session, job_id)
+    assert job.status is JobStatus.SUCCEEDED and job.attempts == 1 and job.finished_at is not None
+    assert JOBS_FINISHED.labels("greet", "succeeded")._value.get() == succeeded + 1
+    assert await runner.run_once() == 0
+
+async def test_failed_job_is_retried_with_backoff_then_fails(db_session):
+    async def handler(payload):
+        raise RuntimeError("mail server down")
+
+    runner = make_runner(JobType("flaky", handler, max_attempts=2, backoff=60))
+    job_id = await enqueue("flaky", max_attempts=2)
+    await runner.run_once()
+    await drain(runner)
+    job = await get_job(db_session, job_id)
+    assert job.status is JobStatus.QUEUED and job.attempts == 1 and "mail server down" in job.last_error
+    delay = await db_session.scalar(select(func.extract("epoch", Job.run_at - func.now())).where(Job.id == job_id))
+    assert 25 <= delay <= 60
+    # Not ready before its backoff is over.
+    assert await runner.run_once() == 0
+
+    await db_session.execute(update(Job).values(run_at=func.now()))
+    await db_session.commit()
+    await runner.run_once()
+    await drain(runner)
+    job = await get_job(db_session, job_id)
+    assert job.status is JobStatus.FAILED and job.attempts == 2 and job.finished_at is not None
+
+    # An administrator queues it again with fresh attempts.
+    assert await JobService.retry(db_session, job_id)
+    assert not await JobService.retry(db_session, job_id)
+    job = await get_job(db_session, job_id)
+    assert job.status is JobStatus.QUEUED and job.attempts == 0
+
+async def test_concurrency_is_limited_per_type(db_session):
+    release = asyncio.Event()
+    running = []
+
+    async def handler(payload):
+        running.append(payload["n"])
+        await release.wait()
+
+    runner = make_runner(JobType("report", handler, concurrency=2))
+    for n in range(5):
+        await enqueue("report", {"n": n})
+    assert await runner.run_once() == 2
+    await asyncio.sleep(0)
+    assert running == [0, 1] and runner.in_flight == {"report": 2}
+    assert await runner.run_once() == 0
+
+    # A runner-level override raises the limit; a second runner shares the queue without taking claimed jobs.
+    other = make_runner(JobType("report", handler, concurrency=2))
+    other.configure(poll_interval=1, lease=300, concurrency={"report": 10})
+    assert await other.run_once() == 3
+    release.set()
+    await drain(runner)
+    await drain(other)
+    assert sorted(running) == [0, 1, 2, 3, 4]
+
+async def test_scheduled_and_unique_jobs(db_session):
+    async def handler(payload):
+        pass
+
+    runner = make_runner(JobType("digest", handler))
+    assert await enqueue("digest", delay=3600) is not None
+    assert await runner.run_once() == 0
+
+    first = await enqueue("digest", {"user": 1}, unique_key="user-1")
+    assert await enqueue("digest", {"user": 1}, unique_key="user-1") is None
+    assert await runner.run_once() == 1
+    await drain(runner)
+    # Once the job finished, the key can be queued again.
+    assert await enqueue("digest", {"user": 1}, unique_key="user-1") not in (None, first)
+
+async def test_expired_lease_is_requeued(db_session):
+    async def handler(payload):
+        pass
+
+    runner = make_runner(JobType("sync", handler))
+    job_id = await enqueue("sync", max_attempts=1)
+    other_id = await enqueue("sync", max_attempts=2)
+    async with Database.get_session_factory()() as session:
+        # A worker that claims both jobs, then dies.
+        assert len(await JobService.claim(session, "sync", 10, "dead-worker", lease=300)) == 2
+    await db_session.execute(update(Job).values(locked_until=func.now() - func.make_interval(0, 0, 0, 0, 0, 0, 1)))
+    await db_session.commit()
+
+    assert await runner.run_once() == 1
+    await drain(runner)
+    job = await get_job(db_session, job_id)
+    assert job.status is JobStatus.FAILED and job.last_error == "Lease expired before the attempt finished"
+    other = await get_job(db_session, other_id)
+    assert other.status is JobStatus.SUCCEEDED and other.attempts == 2
+
+async def test_recurring_job_is_queued_again(db_session):
+    calls = []
+
+    async def handler(payload):
+        calls.append(payload)
+
+    runner = make_runner(JobType("cleanup", handler, every=600))
+    await runner.schedule_recurring()
+    await runner.schedule_recurring()
+    assert await runner.run_once() == 1
+    await drain(runner)
+    assert calls == [{}]
+    jobs = (await db_session.scalars(select(Job).order_by(Job.id).execution_options(populate_existing=True))).all()
+    assert [(job.status, job.unique_key) for job in jobs] == [
+        (JobStatus.SUCCEEDED, RECURRING_KEY), (JobStatus.QUEUED, RECURRING_KEY),
+    ]
+    delay = await db_session.scalar(select(func.extract("epoch", Job.run_at - func.now())).where(Job.id == jobs[1].id))
+    assert 590 <= delay <= 600
+
+async def test_stop_interrupts_running_jobs(db_session):
+    started = asyncio.Event()
+
+    async def handler(payload):
+        started.set()
+        await asyncio.sleep(60)
+
+    runner = make_runner(JobType("slow", handler), poll_interval=0.05)
+    job_id = await enqueue("slow")
+    runner.start()
+    await asyncio.wait_for(started.wait(), 5)
+    await runner.stop(timeout=0.1)
+    assert not runner.running and not runner._tasks
+    job = await get_job(db_session, job_id)
+    assert job.status is JobStatus.QUEUED and job.attempts == 1 and job.last_error == "Interrupted: CancelledError"
+
+async def test_started_runner_picks_up_notified_jobs(db_session):
+    done = asyncio.Event()
+
+    async def handler(payload):
+        done.set()
+
+    runner = make_runner(JobType("notify", handler), poll_interval=60)
+    runner.start()
+    try:
+        await asyncio.sleep(0.1)
+        await enqueue("notify")
+        runner.notify()
+        await asyncio.wait_for(done.wait(), 5)
+    finally:
+        await runner.stop(timeout=5)
+
+async def test_admin_job_endpoints(async_client, db_session, admin_token, user_token):
+    job_id = await enqueue("purge_finished_jobs", max_attempts=1)
+    await db_session.execute(update(Job).values(status=JobStatus.FAILED, attempts=1, last_error="boom",
+                                                finished_at=func.now()))
+    await db_session.commit()
+    await enqueue("purge_finished_jobs", delay=60)
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/admin/jobs", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["queues"] == [{"type": "purge_finished_jobs", "ready": 0, "scheduled": 1, "running": 0,
+                               "succeeded": 0, "failed": 1, "oldest_ready_age_seconds": None}]
+    assert [(job["id"], job["last_error"]) for job in body["failures"]] == [(job_id, "boom")]
+
+    with patch("app.routers.admin_routes.job_runner.notify") as notify:
+        assert (await async_client.post(f"/admin/jobs/{job_id}/retry", headers=headers)).status_code == 204
+    notify.assert_called_once()
+    assert (await async_client.post(f"/admin/jobs/{job_id}/retry", headers=headers)).status_code == 404
+    assert (await get_job(db_session, job_id)).status is JobStatus.QUEUED
+
+    response = await async_client.get("/admin/jobs", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+
+@pytest.mark.parametrize("attempts, bounds", [(1, (5, 10)), (3, (20, 40)), (20, (50, 100))])
+def test_retry_delay(attempts, bounds):
+    job = JobType("x", None, max_attempts=30, backoff=10, max_backoff=100)
+    assert bounds[0] <= job.retry_delay(attempts) <= bounds[1]
+    assert job.retry_delay(30) is None
@@ -6,7 +6,8 @@ from uuid import uuid4
 import pytest
 from fastapi import Request
 
-from app.utils.link_generation import create_link, create_pagination_link, create_user_links, generate_pagination_links
+from app.schemas.link_schema import LinkMode
+from app.utils.link_generation import build_pagination_links, create_link, create_pagination_link, create_user_links, generate_pagination_links, user_link_builder
 
 from urllib.parse import urlparse, parse_qs, urlunparse, urlencode
 
@@ -25,7 +26,8 @@ def normalize_url(url):
 @pytest.fixture
 def mock_request():
     request = MagicMock(spec=Request)
-    request.url_for = MagicMock(side_effect=lambda action, user_id: f"http://testserver/{action}/{user_id}")
+    request.app.url_path_for = MagicMock(side_effect=lambda action, user_id: f"/{action}/{user_id}")
+    request.base_url = "http://testserver/"
     request.url = "http://testserver/users"
     return request
 
@@ -49,3 +51,41 @@ def test_generate_pagination_links(mock_request):
     assert len(links) >= 4
     expected_self_url = "http://testserver/users?limit=5&skip=10"
     assert normalize_url(str(links[0].href)) == normalize_url(expected_self_url), "Self link should match expected URL"
+
+def test_user_link_templates_resolve_each_route_once(mock_request):
+    build = user_link_builder(mock_request)
+    first, second = uuid4(), uuid4()
+    assert [link["href"] for link in build(first)] == [
+        f"http://testserver/get_user/{first}",
+        f"http://testserver/update_user/{first}",
+        f"http://testserver/delete_user/{first}",
+    ]
+    build(second)
+    user_link_builder(mock_request)(second)
+    assert mock_request.app.url_path_for.call_count == 3
+
+def test_user_link_templates_follow_the_base_url(mock_request):
+    user_id = uuid4()
+    mock_request.base_url = "https://other.example/"
+    assert user_link_builder(mock_request)(user_id)[0]["href"] == f"https://other.example/get_user/{user_id}"
+    mock_request.base_url = "http://testserver/api/"
+    assert user_link_builder(mock_request)(user_id)[0]["href"] == f"http://testserver/api/get_user/{user_id}"
+    assert mock_request.app.url_path_for.call_count == 3
+
+def test_user_link_modes(mock_request):
+    user_id = uuid4()
+    assert user_link_builder(mock_request, LinkMode.NONE) is None
+    minimal = user_link_builder(mock_request, LinkMode.MINIMAL)(user_id)
+    assert [link["rel"] for link in minimal] == ["self"]
+
+def test_pagination_links_keep_search_filters(mock_request):
+    mock_request.url = "http://testserver/users/search?role=ADMIN&skip=10&limit=5&links=minimal"
+    links = build_pagination_links(mock_request, 10, 5, 50)
+    hrefs = {link["rel"]: parse_qs(urlparse(link["href"]).query) for link in links}
+    assert hrefs["next"] == {"role": ["ADMIN"], "links": ["minimal"], "skip": ["15"], "limit": ["5"]}
+    assert hrefs["prev"]["skip"] == ["5"]
+
+def test_pagination_link_modes(mock_request):
+    assert build_pagination_links(mock_request, 0, 5, 50, LinkMode.NONE) is None
+    minimal = build_pagination_links(mock_request, 5, 5, 50, LinkMode.MINIMAL)
+    assert [link["rel"] for link in minimal] == ["next", "prev"]
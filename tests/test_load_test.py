@@ -0,0 +1,59 @@
+import httpx
+import pytest
+
+from app.dependencies import get_db, get_email_service, get_settings
+from app.main import app
+from benchmarks.load_test import (ALL, ROUTES, LoadTest, RouteStats, evaluate_slos, format_report, parse_mix, parse_slo,
+                                  percentile, remove_accounts, seed_accounts, summarize)
+
+settings = get_settings()
+
+
+def test_percentile_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50 and percentile(values, 99) == 99 and percentile(values, 100) == 100
+    assert percentile([3.0, 1.0, 2.0], 50) == 2 and percentile([], 95) == 0
+
+def test_summary_and_slos():
+    fast, slow = RouteStats(), RouteStats()
+    for _ in range(99):
+        fast.add(0.010, "200", False)
+    fast.add(0.500, "500", True)
+    slow.add(0.200, "200", False)
+    summary = summarize({"GET /fast": fast, "GET /slow": slow}, elapsed=2.0)
+    assert summary["GET /fast"]["p99"] == 10.0 and summary["GET /fast"]["max"] == 500.0
+    assert summary["GET /fast"]["error_rate"] == 1.0
+    assert summary[ALL]["requests"] == 101 and summary[ALL]["rps"] == 50.5
+    assert summary[ALL]["statuses"] == {"200": 100, "500": 1}
+
+    slos = [parse_slo("p99<300"), parse_slo("GET /fast:error_rate<1"), parse_slo("GET /slow:p50 < 250"),
+            parse_slo("rps>100"), parse_slo("GET /missing:p95<1")]
+    assert slos[1] == ("GET /fast", "error_rate", "<", 1.0)
+    results = evaluate_slos(summary, slos)
+    assert [passed for *_, passed in results] == [True, False, True, False, False]
+    report = format_report(summary, results)
+    assert "GET /fast status codes: 200=99, 500=1" in report
+    assert "SLO GET /fast:error_rate<1: 1 FAIL" in report and "SLO all:p99<300: 200 PASS" in report
+
+    with pytest.raises(ValueError):
+        parse_slo("p97<100")
+    assert parse_mix("login=3,get_user") == {"login": 3.0, "get_user": 1.0}
+    with pytest.raises(ValueError):
+        LoadTest("http://testserver", [], ("admin", "secret"), mix={"delete_everything": 1})
+
+async def test_runs_every_scenario_against_the_app(db_session, email_service):
+    app.dependency_overrides[get_email_service] = lambda: email_service
+    app.dependency_overrides[get_db] = lambda: db_session
+    load_test = LoadTest("http://testserver", [], (settings.admin_user, settings.admin_password),
+                         mix={name: 1 for name in ROUTES}, transport=httpx.ASGITransport(app=app), seed=7)
+    try:
+        load_test.accounts = await seed_accounts(5, load_test.run_id)
+        summary = await load_test.run(requests=30, concurrency=1)
+    finally:
+        app.dependency_overrides.clear()
+        removed = await remove_accounts(load_test.run_id)
+
+    assert summary[ALL]["requests"] == 30
+    assert set(summary) == {*ROUTES.values(), ALL}
+    assert summary[ALL]["error_rate"] == 0, summary
+    assert removed == 5 + load_test._registered
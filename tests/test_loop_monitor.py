@@ -0,0 +1,119 @@
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from app.middleware.request_context import RequestContextMiddleware
+from app.utils.loop_monitor import LoopMonitor, loop_monitor
+from app.utils.metrics import EVENT_LOOP_BLOCKED
+
+
+def blocking_call(seconds):
+    time.sleep(seconds)
+
+@pytest.fixture
+async def monitor():
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    try:
+        yield monitor
+    finally:
+        await monitor.stop()
+
+async def test_no_events_without_blocking(monitor):
+    await asyncio.sleep(0.2)
+    assert monitor.recent() == [] and monitor.max_lag < 0.05
+
+async def test_blocking_request_is_attributed_to_route(monitor):
+    app = FastAPI()
+
+    @app.get("/reports/{report_id}")
+    async def slow_report(report_id: int):
+        blocking_call(0.3)
+        return {"id": report_id}
+
+    before = EVENT_LOOP_BLOCKED.labels("GET /reports/{report_id}")._value.get()
+    async with AsyncClient(app=RequestContextMiddleware(app), base_url="http://testserver") as client:
+        assert (await client.get("/reports/7")).status_code == 200
+    await asyncio.sleep(0.05)
+
+    [event] = monitor.recent()
+    assert event["route"] == "GET /reports/{report_id}"
+    assert event["blocked_ms"] >= 250
+    assert "blocking_call" in event["stack"][-1] and "time.sleep(seconds)" in event["stack"][-1]
+    assert monitor.max_lag >= 0.25
+    assert EVENT_LOOP_BLOCKED.labels("GET /reports/{report_id}")._value.get() == before + 1
+
+async def test_block_outside_request_and_completed_on_stop():
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    blocking_call(0.2)
+    await monitor.stop()
+    [event] = monitor.events
+    assert event["route"] is None and event["blocked_ms"] >= 150
+
+async def test_event_loop_endpoint(async_client, admin_token, user_token):
+    response = await async_client.get("/admin/event-loop", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+    loop_monitor.events.append({"route": "GET /users/", "blocked_ms": 120.0, "stack": []})
+    try:
+        response = await async_client.get("/admin/event-loop", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 200
+        assert response.json()["events"][0]["route"] == "GET /users/"
+        response = await async_client.delete("/admin/event-loop", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 204
+        assert loop_monitor.recent() == []
+    finally:
+        loop_monitor.clear()
+
+BLOCKING_TESTS = """
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from app.middleware.request_context import RequestContextMiddleware
+
+
+@pytest.fixture
+async def slow_fixture():
+    time.sleep(0.3)
+
+async def test_blocking_fixture(slow_fixture):
+    pass
+
+async def test_blocking_route():
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        time.sleep(0.3)
+
+    async with AsyncClient(app=RequestContextMiddleware(app), base_url="http://testserver") as client:
+        await client.get("/slow")
+"""
+
+def test_fail_tests_mode_only_counts_routes(tmp_path):
+    (tmp_path / "test_blocking.py").write_text(textwrap.dedent(BLOCKING_TESTS))
+    env = {**os.environ, "LOOP_MONITOR_FAIL_TESTS": "true", "LOOP_MONITOR_INTERVAL_MS": "10",
+           "LOOP_MONITOR_THRESHOLD_MS": "50"}
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-p", "tests.conftest", "-p", "no:cacheprovider", "-o", "asyncio_mode=auto",
+         "-rA", str(tmp_path / "test_blocking.py")],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env, capture_output=True, text=True,
+        timeout=120,
+    )
+    # The monitor's verdict comes at teardown: the blocking route errors there, the blocking fixture passes.
+    outcomes = re.findall(r"^(PASSED|FAILED|ERROR) \S*::(\w+)", result.stdout, re.MULTILINE)
+    assert sorted(outcomes) == [("ERROR", "test_blocking_route"), ("PASSED", "test_blocking_fixture"),
+                                ("PASSED", "test_blocking_route")], result.stdout
+    assert "ms in GET /slow" in result.stdout
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import tracemalloc
+
+import pytest
+
+from app.utils.memory import MemorySampler, TracemallocProfiler, module_name, tracemalloc_profiler
+
+_retained = []
+
+def _allocate():
+    _retained.append([bytearray(1024) for _ in range(500)])
+
+
+@pytest.fixture
+def profiler():
+    profiler = TracemallocProfiler(capacity=2)
+    try:
+        yield profiler
+    finally:
+        tracemalloc.stop()
+        _retained.clear()
+
+def test_module_name():
+    assert module_name(os.path.abspath(__file__)) == "tests.test_memory"
+    assert module_name(os.path.abspath("app/utils/__init__.py")) == "app.utils"
+    assert module_name(os.path.abspath("app/utils/memory.py"), depth=1) == "app"
+
+def test_diff_attributes_growth_to_module(profiler):
+    with pytest.raises(ValueError):
+        profiler.take_snapshot()
+    assert profiler.start()["tracing"] is True
+    before = profiler.take_snapshot()
+    _allocate()
+    after = profiler.take_snapshot()
+
+    top = profiler.top(after["id"], group_by="module")
+    assert "tests.test_memory" in {row["location"] for row in top}
+    diff = profiler.diff(before["id"], after["id"], group_by="module", limit=1)
+    assert diff[0]["location"] == "tests.test_memory"
+    assert diff[0]["size_diff"] >= 500 * 1024 and diff[0]["count_diff"] >= 500
+
+    lines = profiler.diff(before["id"], after["id"], group_by="lineno", limit=1)
+    assert lines[0]["location"].endswith("test_memory.py:12")
+
+    profiler.take_snapshot()
+    assert [info["id"] for info in profiler.list()] == [after["id"], after["id"] + 1]
+    with pytest.raises(KeyError):
+        profiler.top(before["id"])
+    assert profiler.stop()["tracing"] is False
+
+@pytest.mark.asyncio
+async def test_sampler_records_history():
+    sampler = MemorySampler(interval=0.01, history=3)
+    sampler.start()
+    await asyncio.sleep(0.1)
+    await sampler.stop()
+    assert len(sampler.samples) == 3
+    report = sampler.report()
+    assert report["running"] is False and report["pid"] == os.getpid()
+    assert report["current"]["rss_bytes"] > 0 and len(report["current"]["gc_collections"]) == 3
+    assert len(report["samples"]) == 3
+
+@pytest.mark.asyncio
+async def test_memory_endpoints(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    try:
+        response = await async_client.post("/admin/memory/snapshots", headers=headers)
+        assert response.status_code == 409
+        response = await async_client.post("/admin/memory/tracemalloc/start?frames=2", headers=headers)
+        assert response.json()["tracing"] is True and response.json()["frames"] == 2
+        first = (await async_client.post("/admin/memory/snapshots", headers=headers)).json()
+        _allocate()
+        second = (await async_client.post("/admin/memory/snapshots", headers=headers)).json()
+
+        response = await async_client.get(f"/admin/memory/snapshots/{second['id']}/top?depth=1&limit=5", headers=headers)
+        assert response.status_code == 200
+        assert "tests" in {row["location"] for row in response.json()["statistics"]}
+        response = await async_client.get(f"/admin/memory/snapshots/{second['id']}/diff/{first['id']}?limit=3",
+                                          headers=headers)
+        assert response.json()["statistics"][0]["location"] == "tests.test_memory"
+        response = await async_client.get(f"/admin/memory/snapshots/{second['id']}/top?group_by=frame", headers=headers)
+        assert response.status_code == 422
+        response = await async_client.get("/admin/memory/snapshots/0/top", headers=headers)
+        assert response.status_code == 404
+
+        response = await async_client.post("/admin/memory/tracemalloc/stop", headers=headers)
+        assert response.json()["tracing"] is False
+        response = await async_client.get("/admin/memory/stats", headers=headers)
+        assert response.json()["current"]["rss_bytes"] > 0
+    finally:
+        tracemalloc.stop()
+        tracemalloc_profiler.clear()
+        _retained.clear()
+
+@pytest.mark.asyncio
+async def test_memory_endpoints_require_admin(async_client, user_token):
+    response = await async_client.post("/admin/memory/tracemalloc/start", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
@@ -0,0 +1,114 @@
+import subprocess
+import sys
+from unittest.mock import MagicMock
+from urllib.parse import urlencode
+
+import pytest
+from prometheus_client import REGISTRY, multiprocess
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.services.email_service import EmailService
+from app.utils.metrics import DB_POOL_CAPACITY, instrument_pool, render_metrics
+from settings.config import settings
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+async def login(async_client, email, password):
+    return await async_client.post("/login/", data=urlencode({"username": email, "password": password}),
+                                   headers={"Content-Type": "application/x-www-form-urlencoded"})
+
+@pytest.mark.asyncio
+async def test_requests_are_labelled_by_route_template(async_client, admin_user, admin_token):
+    labels = {"method": "GET", "route": "/users/{user_id}", "status": "200"}
+    before = sample("http_requests_total", **labels)
+    response = await async_client.get(f"/users/{admin_user.id}", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert sample("http_requests_total", **labels) == before + 1
+    assert sample("http_request_duration_seconds_count", method="GET", route="/users/{user_id}") >= 1
+    assert sample("http_requests_in_progress") == 0
+
+    scrape = await async_client.get("/metrics", headers={"Authorization": f"Bearer {admin_token}"})
+    assert scrape.status_code == 200
+    assert 'http_requests_total{method="GET",route="/users/{user_id}",status="200"}' in scrape.text
+    assert f"/users/{admin_user.id}" not in scrape.text
+
+@pytest.mark.asyncio
+async def test_metrics_require_the_scrape_token_or_an_admin(async_client, user_token, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "scrape-secret")
+    assert (await async_client.get("/metrics")).status_code == 401
+    assert (await async_client.get("/metrics", headers={"Authorization": "Bearer wrong"})).status_code == 401
+    assert (await async_client.get("/metrics", headers={"Authorization": f"Bearer {user_token}"})).status_code == 403
+    assert (await async_client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})).status_code == 200
+
+@pytest.mark.asyncio
+async def test_login_outcomes_and_lockout(async_client, verified_user):
+    failures, lockouts = sample("login_attempts_total", result="failure"), sample("account_lockouts_total")
+    verifications = sample("password_hash_duration_seconds_count", operation="verify")
+    for _ in range(settings.max_login_attempts):
+        assert (await login(async_client, verified_user.email, "WrongPassword!1")).status_code == 401
+    assert (await login(async_client, verified_user.email, "MySuperPassword$1234")).status_code == 401
+    assert sample("login_attempts_total", result="failure") == failures + settings.max_login_attempts
+    assert sample("login_attempts_total", result="locked") >= 1
+    assert sample("account_lockouts_total") == lockouts + 1
+    assert sample("password_hash_duration_seconds_count", operation="verify") == verifications + settings.max_login_attempts
+
+@pytest.mark.asyncio
+async def test_email_send_failures(email_service):
+    service = EmailService(template_manager=MagicMock())
+    service.smtp_client = MagicMock()
+    service.smtp_client.send_email.side_effect = OSError("connection refused")
+    failures = sample("email_send_failures_total", email_type="email_verification")
+    with pytest.raises(OSError):
+        await service.send_user_email({"name": "A", "verification_url": "u", "email": "a@example.com"}, "email_verification")
+    assert sample("email_send_failures_total", email_type="email_verification") == failures + 1
+    assert sample("email_send_duration_seconds_count", email_type="email_verification") >= 1
+
+@pytest.mark.asyncio
+async def test_conditional_get_counts_cache_hits(async_client):
+    hits = sample("cache_requests_total", cache="openapi", result="hit")
+    etag = (await async_client.get("/openapi.json")).headers["etag"]
+    await async_client.get("/openapi.json", headers={"If-None-Match": etag})
+    assert sample("cache_requests_total", cache="openapi", result="hit") == hits + 1
+
+def test_multiprocess_aggregation(tmp_path, monkeypatch):
+    worker = (
+        "from app.utils.metrics import HTTP_REQUESTS, HTTP_REQUESTS_IN_PROGRESS\n"
+        "HTTP_REQUESTS.labels('GET', '/users/', '200').inc(3)\n"
+        "HTTP_REQUESTS_IN_PROGRESS.inc()\n"
+    )
+    pids = []
+    for _ in range(2):
+        process = subprocess.Popen([sys.executable, "-c", worker], env={"PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "PATH": ""})
+        assert process.wait() == 0
+        pids.append(process.pid)
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    body, content_type = render_metrics()
+    assert content_type.startswith("text/plain")
+    assert b'http_requests_total{method="GET",route="/users/",status="200"} 6.0' in body
+    assert b"http_requests_in_progress 2.0" in body
+
+    # What gunicorn's child_exit hook does: a dead worker's live gauges drop out, its counters stay.
+    multiprocess.mark_process_dead(pids[0])
+    body, _ = render_metrics()
+    assert b"http_requests_in_progress 1.0" in body
+    assert b'status="200"} 6.0' in body
+
+@pytest.mark.asyncio
+async def test_pool_utilization():
+    engine = create_async_engine(settings.database_url, pool_size=3, max_overflow=2)
+    instrument_pool(engine)
+    opened, checked_out = sample("db_pool_connections"), sample("db_pool_checked_out")
+    try:
+        assert sample("db_pool_capacity") == 5
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            assert sample("db_pool_checked_out") == checked_out + 1
+        assert sample("db_pool_checked_out") == checked_out
+        assert sample("db_pool_connections") == opened + 1
+    finally:
+        await engine.dispose()
+        DB_POOL_CAPACITY.set(0)
+    assert sample("db_pool_connections") == opened
@@ -0,0 +1,57 @@
+import orjson
+import pytest
+from fastapi import FastAPI
+from app.main import app
+from app.utils.openapi_cache import OpenAPISchema, load_openapi_schema, prepare_openapi_schema
+
+
+@pytest.mark.asyncio
+async def test_openapi_served_with_etag(async_client):
+    response = await async_client.get("/openapi.json")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert orjson.loads(response.content) == app.openapi()
+    assert "/openapi.json" not in response.json()["paths"]
+
+    cached = await async_client.get("/openapi.json", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == response.headers["etag"]
+    assert cached.content == b""
+
+@pytest.mark.asyncio
+async def test_compressed_schema_has_its_own_strong_etag(async_client):
+    etags = {}
+    for encoding in ("identity", "br", "gzip"):
+        response = await async_client.get("/openapi.json", headers={"Accept-Encoding": encoding})
+        assert response.headers.get("content-encoding", "identity") == encoding
+        etags[encoding] = response.headers["etag"]
+    assert etags["br"] == etags["identity"][:-1] + '-br"' and etags["gzip"] == etags["identity"][:-1] + '-gzip"'
+
+    # Revalidating either representation matches the schema and returns the ETag the client holds.
+    for encoding, etag in etags.items():
+        cached = await async_client.get("/openapi.json", headers={"Accept-Encoding": encoding, "If-None-Match": etag})
+        assert cached.status_code == 304 and cached.headers["etag"] == etag
+
+@pytest.mark.asyncio
+async def test_docs_pages(async_client):
+    for path in ("/docs", "/redoc"):
+        response = await async_client.get(path)
+        assert response.status_code == 200
+        assert "/openapi.json" in response.text
+
+def test_schema_is_built_once():
+    target = FastAPI()
+    schema = prepare_openapi_schema(target)
+    assert prepare_openapi_schema(target) is schema
+    assert orjson.loads(schema.body) == target.openapi()
+
+def test_schema_file_is_written_then_reused(tmp_path):
+    path = tmp_path / "openapi.json"
+    schema = load_openapi_schema(FastAPI(), str(path))
+    assert path.read_bytes() == schema.body
+
+    path.write_bytes(b'{"openapi": "3.1.0"}')
+    reloaded = load_openapi_schema(FastAPI(title="Other"), str(path))
+    assert reloaded.body == b'{"openapi": "3.1.0"}'
+    assert reloaded.etag == OpenAPISchema(b'{"openapi": "3.1.0"}').etag != schema.etag
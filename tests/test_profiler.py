@@ -0,0 +1,66 @@
+from collections import Counter
+
+import pytest
+from httpx import AsyncClient
+
+from app.dependencies import get_db, get_profile_store
+from app.main import app
+from app.middleware.profiling import ProfilingMiddleware
+from app.utils.profiler import AWAITING, ProfileStore, sign_profile_token, verify_profile_token
+from settings.config import settings
+
+
+def test_profile_tokens():
+    token = sign_profile_token("secret", 60, now=1000)
+    assert verify_profile_token("secret", token, now=1059)
+    assert not verify_profile_token("secret", token, now=1061)
+    assert not verify_profile_token("other", token, now=1000)
+    assert not verify_profile_token("secret", "9999999999.forged", now=1000)
+    assert not verify_profile_token("secret", "garbage", now=1000)
+
+def test_store_keeps_the_most_recent_profiles(tmp_path):
+    store = ProfileStore(str(tmp_path), capacity=2)
+    names = [store.save("GET", f"/users/{index}", 12.5, Counter({"a;b": 3})) for index in range(3)]
+    assert store.names() == names[:0:-1]
+    profile = store.list()[0]
+    assert (profile["method"], profile["route"], profile["duration"]) == ("GET", "users_2", "12ms")
+    assert (tmp_path / names[2]).read_text() == "a;b 3\n"
+    assert store.path(names[0]) is None
+    assert store.path("../" + names[2]) is None
+
+@pytest.fixture
+def profiled_client(db_session, tmp_path):
+    store = ProfileStore(str(tmp_path))
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_profile_store] = lambda: store
+    middleware = ProfilingMiddleware(app, store=store, secret=settings.secret_key, interval=0.0005)
+    yield AsyncClient(app=middleware, base_url="http://testserver"), store
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_signed_requests_are_profiled(profiled_client, admin_user, admin_token):
+    client, store = profiled_client
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    async with client:
+        assert (await client.get("/users/search?username=a", headers=headers)).status_code in (200, 404)
+        assert store.names() == []
+
+        token = (await client.post("/admin/profiles/token?ttl_seconds=60", headers=headers)).json()["value"]
+        response = await client.get("/users/search?role=ADMIN", headers={**headers, "X-Profile": token})
+        assert response.status_code == 200
+
+        profiles = (await client.get("/admin/profiles", headers=headers)).json()["profiles"]
+        assert [profile["route"] for profile in profiles] == ["users_search"]
+        download = await client.get(f"/admin/profiles/{profiles[0]['name']}", headers=headers)
+        assert download.status_code == 200
+        assert "search_users (user_routes.py" in download.text
+        stacks = [line.rsplit(" ", 1) for line in download.text.splitlines()]
+        assert all(count.isdigit() for _, count in stacks)
+        assert any(stack.endswith(AWAITING) for stack, _ in stacks)
+
+        assert (await client.get("/admin/profiles/missing.collapsed", headers=headers)).status_code == 404
+
+@pytest.mark.asyncio
+async def test_profiles_require_admin(async_client, user_token):
+    response = await async_client.get("/admin/profiles", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
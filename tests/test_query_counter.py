@@ -0,0 +1,43 @@
+import logging
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, text
+
+from app.dependencies import get_db
+from app.main import app
+from app.middleware.query_count import QueryCountMiddleware
+from app.utils.query_counter import count_queries, install_query_counter
+
+
+@pytest.mark.asyncio
+async def test_counts_statements_and_commits(db_session):
+    install_query_counter()
+    with count_queries() as outer:
+        await db_session.execute(text("SELECT 1"))
+        with count_queries() as inner:
+            await db_session.execute(select(text("2")))
+            await db_session.commit()
+    assert inner.statements == ["SELECT 2", "COMMIT"]
+    assert outer.statements == ["SELECT 1", "SELECT 2", "COMMIT"]
+
+@pytest.mark.asyncio
+async def test_assert_max_queries_reports_statements(db_session, assert_max_queries):
+    with pytest.raises(AssertionError, match=r"at most 1 queries, got 2:\n1\. SELECT 1\n2\. SELECT 2"):
+        with assert_max_queries(1):
+            await db_session.execute(text("SELECT 1"))
+            await db_session.execute(text("SELECT 2"))
+
+@pytest.mark.asyncio
+async def test_query_count_header_and_log(db_session, admin_user, admin_token, caplog):
+    install_query_counter()
+    app.dependency_overrides[get_db] = lambda: db_session
+    try:
+        async with AsyncClient(app=QueryCountMiddleware(app, warn_threshold=1), base_url="http://testserver") as client:
+            with caplog.at_level(logging.INFO, logger="app.middleware.query_count"):
+                response = await client.get(f"/users/{admin_user.id}", headers={"Authorization": f"Bearer {admin_token}"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert response.headers["x-query-count"] == "2"
+    assert f'"GET /users/{admin_user.id}" 200 issued 2 queries:\n1. SELECT' in caplog.text
@@ -0,0 +1,153 @@
+from unittest.mock import AsyncMock, patch
+from urllib.parse import urlencode
+
+import pytest
+
+from app.services.idempotency_service import IdempotencyService
+from app.services.user_service import UserService
+from app.utils.metrics import RATE_LIMIT_BACKEND_ERRORS, RATE_LIMIT_REQUESTS
+from app.utils.rate_limit import MemoryBackend, RateLimiter, SQLiteBackend, parse_rate, rate_limiter
+
+FORM = {"Content-Type": "application/x-www-form-urlencoded"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def limits():
+    """Apply tighter limits to the application's limiter for one test."""
+    saved = rate_limiter.enabled, rate_limiter.backend, dict(rate_limiter.limits)
+
+    def configure(ip="100/minute", account="100/minute", total="100/second"):
+        rate_limiter.configure(True, MemoryBackend(), ip, account, total)
+
+    yield configure
+    rate_limiter.enabled, rate_limiter.backend, rate_limiter.limits = saved
+
+async def login(async_client, email, password="WrongPassword!1"):
+    return await async_client.post("/login/", data=urlencode({"username": email, "password": password}), headers=FORM)
+
+def test_parse_rate():
+    assert parse_rate("10/minute") == (10.0, 10 / 60)
+    assert parse_rate("3 / Second") == (3.0, 3.0)
+    for rate in ("10", "10/fortnight", "0/second", "many/hour"):
+        with pytest.raises(ValueError):
+            parse_rate(rate)
+
+async def test_memory_buckets_refill_and_take_all_or_nothing():
+    clock = Clock()
+    backend = MemoryBackend(clock=clock)
+    assert await backend.take([("a", 2, 1.0)]) == [0.0]
+    assert await backend.take([("a", 2, 1.0)]) == [0.0]
+    assert await backend.take([("a", 2, 1.0)]) == [1.0]
+    clock.now += 0.75
+    assert await backend.take([("a", 2, 1.0)]) == pytest.approx([0.25])
+
+    # "b" has a token, but the request is rejected by "a" and takes none of it.
+    assert await backend.take([("b", 1, 1.0), ("a", 2, 1.0)]) == pytest.approx([0.0, 0.25])
+    clock.now += 0.25
+    assert await backend.take([("b", 1, 1.0), ("a", 2, 1.0)]) == [0.0, 0.0]
+    assert await backend.take([("b", 1, 1.0)]) == [1.0]
+
+async def test_memory_backend_drops_least_recently_used_buckets():
+    backend = MemoryBackend(max_keys=2, clock=Clock())
+    for key in ("a", "b", "a", "c"):
+        await backend.take([(key, 5, 1.0)])
+    assert list(backend.buckets) == ["a", "c"]
+
+async def test_sqlite_buckets_are_shared_between_backends(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "buckets.sqlite3")
+    first, second = SQLiteBackend(path, clock=clock), SQLiteBackend(path, clock=clock)
+    try:
+        assert await first.take([("ip", 2, 0.5), ("global", 10, 10.0)]) == [0.0, 0.0]
+        assert await second.take([("ip", 2, 0.5), ("global", 10, 10.0)]) == [0.0, 0.0]
+        assert await first.take([("ip", 2, 0.5), ("global", 10, 10.0)]) == [2.0, 0.0]
+        clock.now += 2
+        assert await second.take([("ip", 2, 0.5)]) == [0.0]
+
+        # Buckets that have refilled are purged.
+        first._takes = SQLiteBackend.PURGE_EVERY - 1
+        clock.now += 60
+        await first.take([("other", 1, 1.0)])
+        assert [key for key, in first._connect().execute("SELECT key FROM buckets")] == ["other"]
+        second.clear()
+        assert await first.take([("other", 1, 1.0)]) == [0.0]
+    finally:
+        await first.close()
+        await second.close()
+
+async def test_limiter_fails_open():
+    backend = MemoryBackend()
+    backend.take = AsyncMock(side_effect=OSError("store unavailable"))
+    errors = RATE_LIMIT_BACKEND_ERRORS.labels("memory")._value.get()
+    assert await RateLimiter(backend).hit("login", "10.0.0.1", "someone@example.com") is None
+    assert RATE_LIMIT_BACKEND_ERRORS.labels("memory")._value.get() == errors + 1
+
+async def test_limiter_disabled():
+    limiter = RateLimiter(ip="1/hour", enabled=False)
+    for _ in range(3):
+        assert await limiter.hit("login", "10.0.0.1", None) is None
+
+async def test_login_rejected_per_ip_before_any_work(async_client, limits):
+    limits(ip="2/minute")
+    with patch.object(UserService, "login_user", AsyncMock(return_value=None)) as login_user:
+        assert (await login(async_client, "first@example.com")).status_code == 401
+        assert (await login(async_client, "second@example.com")).status_code == 401
+        rejected = RATE_LIMIT_REQUESTS.labels("login", "ip")._value.get()
+        response = await login(async_client, "third@example.com")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    assert login_user.await_count == 2
+    assert RATE_LIMIT_REQUESTS.labels("login", "ip")._value.get() == rejected + 1
+
+async def test_login_rejected_per_account(async_client, verified_user, limits):
+    limits(account="1/minute")
+    assert (await login(async_client, verified_user.email, "MySuperPassword$1234")).status_code == 200
+    response = await login(async_client, verified_user.email.upper(), "MySuperPassword$1234")
+    assert response.status_code == 429 and response.headers["Retry-After"] == "60"
+    assert (await login(async_client, "someone.else@example.com")).status_code == 401
+
+async def test_register_rejected_globally(async_client, limits):
+    limits(total="1/second")
+    user_data = {"password": "AValid$Pass123", "role": "AUTHENTICATED"}
+    with patch.object(UserService, "register_user", AsyncMock(return_value=None)) as register_user:
+        first = await async_client.post("/register/", json={"email": "new@example.com", **user_data})
+        assert first.status_code == 400
+        response = await async_client.post("/register/", json={"email": "other@example.com", **user_data})
+    assert response.status_code == 429 and response.headers["Retry-After"] == "1"
+    assert register_user.await_count == 1
+    # The global bucket is shared with /login/.
+    assert (await login(async_client, "someone@example.com")).status_code == 429
+
+async def test_keyed_register_flood_is_rejected_before_the_key_is_claimed(async_client, limits):
+    limits(ip="1/minute")
+    user_data = {"password": "AValid$Pass123", "role": "AUTHENTICATED"}
+    with patch.object(UserService, "register_user", AsyncMock(return_value=None)) as register_user, \
+            patch.object(IdempotencyService, "claim", wraps=IdempotencyService.claim) as claim:
+        # One token per request: the middleware's check stands in for the route's own.
+        first = await async_client.post("/register/", json={"email": "new@example.com", **user_data},
+                                        headers={"Idempotency-Key": "flood-1"})
+        assert first.status_code == 400
+        for attempt in range(3):
+            response = await async_client.post("/register/", json={"email": f"flood{attempt}@example.com", **user_data},
+                                               headers={"Idempotency-Key": f"flood-{attempt + 2}"})
+            assert response.status_code == 429 and response.headers["Retry-After"] == "60"
+    assert register_user.await_count == claim.await_count == 1
+
+@pytest.mark.parametrize("content, headers", [
+    (b"", {}),
+    (b"", {"Content-Type": "application/json"}),
+    (b"{not json", {"Content-Type": "application/json"}),
+    (b"email=new%40example.com", FORM),
+])
+async def test_register_body_that_is_not_json_is_rejected_by_validation(async_client, limits, content, headers):
+    limits()
+    response = await async_client.post("/register/", content=content, headers=headers)
+    assert response.status_code == 422
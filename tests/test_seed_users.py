@@ -0,0 +1,53 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, text
+
+from app.models.user_model import User, UserRole
+from app.utils.security import hash_password, verify_password
+from benchmarks.seed_users import COLUMNS, NULL, _create_indexes, _drop_indexes, _dsn, build_templates, generate_rows, seed
+
+
+def test_generated_rows():
+    now = datetime.now(timezone.utc)
+    templates = build_templates(200, seed=1)
+    rows = [line.rstrip("\n").split("\t") for line in generate_rows(1000, 21000, templates, ["hash"], now, 2, seed=1)]
+    assert all(len(row) == len(COLUMNS) for row in rows)
+    records = [dict(zip(COLUMNS, row)) for row in rows]
+
+    assert len({record["nickname"] for record in records}) == len({record["email"] for record in records}) == 20000
+    assert records[0]["nickname"].endswith("_1000") and all(len(record["nickname"]) <= 50 for record in records)
+
+    roles = Counter(record["role"] for record in records)
+    assert set(roles) == {role.value for role in UserRole}
+    assert 0.07 < roles["ANONYMOUS"] / 20000 < 0.13 and 0.005 < roles["ADMIN"] / 20000 < 0.02
+    assert all(record["email_verified"] == "f" for record in records if record["role"] == "ANONYMOUS")
+    locked = [record for record in records if record["is_locked"] == "t"]
+    assert 0.01 < len(locked) / 20000 < 0.03
+    assert all(record["failed_login_attempts"] == "3" and record["last_login_at"] == NULL for record in locked)
+
+    created = sorted(datetime.fromisoformat(record["created_at"]) for record in records)
+    assert now - timedelta(days=2 * 365 + 1) <= created[0] and created[-1] <= now
+    # More recent registrations than old ones
+    assert sum(stamp > now - timedelta(days=365) for stamp in created) > 0.7 * 20000
+    assert all(record["updated_at"] >= record["created_at"] for record in records)
+
+    again = list(generate_rows(1000, 1010, build_templates(200, seed=1), ["hash"], now, 2, seed=1))
+    assert again == ["\t".join(row) + "\n" for row in rows[:10]]
+
+async def test_seed_copies_rows_that_can_log_in(db_session):
+    password_hash = hash_password("Seeded$1234", rounds=4)
+    dsn = _dsn()
+    indexes = await _drop_indexes(dsn)
+    try:
+        written = await asyncio.to_thread(seed, 3000, 2, [password_hash], dsn=dsn, templates=100)
+    finally:
+        await _create_indexes(dsn, indexes)
+    assert written == 3000
+
+    assert await db_session.scalar(select(func.count()).select_from(User)) == 3000
+    index_names = (await db_session.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'users'"))).scalars()
+    assert {"ix_users_email", "ix_users_nickname", "ix_users_verification_token_hash"} <= set(index_names)
+    user = await db_session.scalar(select(User).where(User.email_verified.is_(True), User.is_locked.is_(False)).limit(1))
+    assert verify_password("Seeded$1234", user.hashed_password)
@@ -0,0 +1,39 @@
+from builtins import len
+import json
+import pytest
+from sqlalchemy import select
+from app.models.user_model import User
+from app.schemas.user_schemas import UserListResponse, UserResponse
+from app.utils.serialization import UserJSONResponse, build_field_plan, serialize_user, serialize_user_list
+
+
+@pytest.mark.asyncio
+async def test_serialize_user_matches_user_response(verified_user):
+    expected = UserResponse.model_validate(verified_user).model_dump(mode="json", exclude={"links"})
+    assert json.loads(UserJSONResponse(serialize_user(verified_user)).body) == expected
+
+@pytest.mark.asyncio
+async def test_serialize_user_list_matches_user_list_response(users_with_same_role_50_users):
+    users = users_with_same_role_50_users[:10]
+    expected = UserListResponse(
+        items=[UserResponse.model_validate(user) for user in users], total=50, page=2, size=len(users)
+    ).model_dump(mode="json", exclude={"links": True, "items": {"__all__": {"links"}}})
+    assert json.loads(UserJSONResponse(serialize_user_list(users, 50, 10, 10)).body) == expected
+
+@pytest.mark.asyncio
+async def test_serialize_user_with_restricted_plan(verified_user):
+    plan = build_field_plan(UserResponse, ["id", "role"])
+    assert serialize_user(verified_user, plan) == {"id": str(verified_user.id), "role": "AUTHENTICATED"}
+
+def test_user_json_response_passes_bytes_through():
+    response = UserJSONResponse(b'{"items":[]}')
+    assert response.body == b'{"items":[]}'
+    assert response.media_type == "application/json"
+
+@pytest.mark.asyncio
+async def test_serialize_user_loaded_from_database(db_session, verified_user):
+    result = await db_session.execute(
+        select(User).where(User.id == verified_user.id).execution_options(populate_existing=True)
+    )
+    body = json.loads(UserJSONResponse(serialize_user(result.scalar_one())).body)
+    assert body["id"] == str(verified_user.id)
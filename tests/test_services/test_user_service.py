@@ -4,12 +4,12 @@ from sqlalchemy import select
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import uuid4
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from app.dependencies import get_settings
 from app.models.user_model import User, UserRole
 from app.services.user_service import UserService
 from app.utils.nickname_gen import generate_nickname
-from app.utils.security import generate_verification_token, hash_password
+from app.utils.security import generate_verification_token, hash_password, hash_verification_token
 from app.dependencies import get_db
 
 pytestmark = pytest.mark.asyncio
@@ -164,8 +164,38 @@ async def test_verify_email_with_token(db_session, user):
     invalid_token = "invalid_token_example"
     result = await UserService.verify_email_with_token(db_session, user.id, invalid_token)
     assert result is False, "User's email should not be verified with an invalid token"
-    refreshed_user = await UserService.get_by_id(db_session, user.id)
-    assert refreshed_user.verification_token is None, "The token should be cleared after verification"
+    await db_session.refresh(user)
+    assert user.email_verified, "The email should be marked as verified"
+    assert user.verification_token is None, "The token should no longer be pending after verification"
+
+# Test that repeated clicks on a verification link stay successful
+async def test_verify_email_with_token_is_idempotent(db_session, user):
+    token = generate_verification_token()
+    user.verification_token = token
+    await db_session.commit()
+    assert await UserService.verify_email_with_token(db_session, user.id, token) is True
+    assert await UserService.verify_email_with_token(db_session, user.id, token) is True
+    assert not db_session.in_transaction(), "The read-only path should not leave a transaction open"
+    await db_session.refresh(user)
+    assert user.role == UserRole.AUTHENTICATED
+
+# Test that expired verification tokens are rejected
+async def test_verify_email_with_expired_token(db_session, user):
+    token = generate_verification_token()
+    user.verification_token = token
+    user.verification_token_expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+    await db_session.commit()
+    assert await UserService.verify_email_with_token(db_session, user.id, token) is False
+    await db_session.refresh(user)
+    assert not user.email_verified
+
+# Test that only the hash of the verification token is stored
+async def test_verification_token_is_stored_hashed(db_session, user):
+    token = generate_verification_token()
+    user.verification_token = token
+    await db_session.commit()
+    assert user.verification_token_hash == hash_verification_token(token)
+    assert user.verification_token_expires_at > datetime.now(timezone.utc)
 
 # Test unlocking a user's account
 async def test_unlock_user_account(db_session, locked_user):
@@ -299,4 +329,31 @@ async def test_search_and_filter_users(db_session: AsyncSession):
     # Clean up the test users from the database
     for user in test_users:
         await db_session.delete(user)
-    await db_session.commit()
\ No newline at end of file
+    await db_session.commit()
+# Test that hot lookups reuse one cached statement per filter signature
+async def test_lookup_statements_are_cached(db_session, user):
+    await UserService.get_by_email(db_session, user.email)
+    statement = UserService._lookup_statement(("email",))
+    retrieved_user = await UserService.get_by_email(db_session, user.email)
+    assert retrieved_user.id == user.id
+    assert UserService._lookup_statement(("email",)) is statement
+    assert UserService._lookup_statement(("id",)) is not statement
+
+# Test looking up a user by id and verification token
+async def test_get_by_verification_token(db_session, user):
+    user.verification_token = generate_verification_token()
+    await db_session.commit()
+    retrieved_user = await UserService.get_by_verification_token(db_session, user.id, user.verification_token)
+    assert retrieved_user.id == user.id
+    assert await UserService.get_by_verification_token(db_session, user.id, "wrong_token") is None
+
+# Test that a sparse column list prunes the SELECT
+def test_select_users_with_columns():
+    sql = str(UserService._select_users(("email", "role")))
+    assert "users.email" in sql and "users.role" in sql and "users.id" in sql
+    assert "users.bio" not in sql and "users.hashed_password" not in sql
+
+# Test streaming every user
+async def test_stream_users(db_session, users_with_same_role_50_users):
+    streamed = [user.id async for user in UserService.stream_users(db_session, columns=("email",), batch_size=7)]
+    assert sorted(streamed) == sorted(user.id for user in users_with_same_role_50_users)
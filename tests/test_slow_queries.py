@@ -0,0 +1,66 @@
+import pytest
+
+from app.utils.slow_queries import REDACTED, redact_parameters, slow_query_recorder
+
+
+@pytest.fixture
+def recorder(db_session):
+    slow_query_recorder.configure(threshold_ms=0, capacity=50, explain=True, explain_timeout_ms=5000)
+    slow_query_recorder.install(db_session.bind)
+    try:
+        yield slow_query_recorder
+    finally:
+        slow_query_recorder.uninstall()
+        slow_query_recorder.clear()
+        slow_query_recorder.configure(threshold_ms=500, capacity=100, explain=True, explain_timeout_ms=5000)
+
+def test_redact_parameters():
+    values = ["%john@example.com%", "$2b$12$abcdefghijklmnopqrstuv", "a" * 64, "clever_fox", 10, None]
+    names = ["email_1", "param_1", "param_2", "nickname_1", "param_3", "param_4"]
+    assert redact_parameters(values, names) == [REDACTED, REDACTED, REDACTED, "clever_fox", 10, None]
+    assert redact_parameters({"hashed_password": "secret", "id": 1}) == [REDACTED, 1]
+
+@pytest.mark.asyncio
+async def test_records_route_parameters_and_plan(async_client, admin_user, admin_token, recorder):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/search?email=example&limit=5", headers=headers)
+    assert response.status_code == 200
+    await recorder.wait_for_plans()
+
+    entry = next(entry for entry in recorder.recent() if "ILIKE" in entry["statement"].upper() and "LIMIT" in entry["statement"])
+    assert entry["route"] == "GET /users/search"
+    assert entry["parameters"][0] == REDACTED and 5 in entry["parameters"]
+    assert "actual time=" in entry["plan"]
+
+    recorder.uninstall()
+    response = await async_client.get("/admin/slow-queries", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["threshold_ms"] == 0
+    assert any(item["id"] == entry["id"] for item in body["entries"])
+
+@pytest.mark.asyncio
+async def test_writes_are_explained_without_running_them(db_session, verified_user, recorder):
+    from app.services.user_service import UserService
+    await UserService.update(db_session, verified_user.id, {"first_name": "Explained"})
+    await recorder.wait_for_plans()
+    entry = next(entry for entry in recorder.recent() if entry["statement"].startswith("UPDATE"))
+    assert entry["route"] is None
+    assert "Update on users" in entry["plan"] and "actual time=" not in entry["plan"]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("lock", [{}, {"read": True}, {"key_share": True}, {"read": True, "key_share": True}])
+async def test_locking_selects_are_explained_without_running_them(db_session, verified_user, recorder, lock):
+    from sqlalchemy import select
+    from app.models.user_model import User
+    await db_session.execute(select(User.id).where(User.id == verified_user.id).with_for_update(**lock))
+    # The row is still locked: an analyzed plan would wait for it until the timeout.
+    await recorder.wait_for_plans()
+    await db_session.commit()
+    entry = next(entry for entry in recorder.recent() if " FOR " in entry["statement"])
+    assert "LockRows" in entry["plan"] and "actual time=" not in entry["plan"]
+
+@pytest.mark.asyncio
+async def test_slow_queries_require_admin(async_client, user_token):
+    response = await async_client.get("/admin/slow-queries", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
@@ -0,0 +1,21 @@
+import pytest
+from app.dependencies import get_settings
+from benchmarks.bench_startup import DEFERRED_MODULES, IMPORT_TIME_BUDGET_SECONDS, best_import_time
+from settings.config import settings
+
+
+@pytest.fixture(scope="module")
+def app_import():
+    return best_import_time("app.main")
+
+def test_import_time_within_budget(app_import):
+    seconds, _ = app_import
+    assert seconds < IMPORT_TIME_BUDGET_SECONDS, f"Importing app.main took {seconds:.2f}s"
+
+def test_rarely_used_modules_are_deferred(app_import):
+    _, timings = app_import
+    for module in DEFERRED_MODULES:
+        assert module not in timings, f"{module} should not be imported at startup"
+
+def test_settings_singleton():
+    assert get_settings() is get_settings() is settings
@@ -0,0 +1,90 @@
+import io
+import json
+import logging
+import queue
+import threading
+
+import pytest
+
+from app.utils.metrics import LOG_RECORDS_DROPPED, LOG_RECORDS_SAMPLED_OUT
+from app.utils.request_context import request_scope
+from app.utils.structured_logging import (DroppingQueueHandler, JSONFormatter, SamplingFilter, install_log_queue,
+                                          stop_log_queue)
+
+
+def _record(name="app.test", level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+@pytest.fixture
+def root_stream():
+    """Root logger writing JSON lines to a buffer, as configured by logging.conf."""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers, root.level
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JSONFormatter())
+    root.handlers = [handler]
+    root.setLevel(logging.DEBUG)
+    try:
+        yield stream
+    finally:
+        stop_log_queue()
+        root.handlers, root.level = saved_handlers, saved_level
+
+def test_json_formatter():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        import sys
+        record = _record(level=logging.ERROR, user_id=42)
+        record.exc_info = sys.exc_info()
+    entry = json.loads(JSONFormatter().format(record))
+    assert entry["message"] == "hello world" and entry["level"] == "ERROR" and entry["logger"] == "app.test"
+    assert entry["user_id"] == 42 and "ValueError: boom" in entry["exception"]
+    assert "args" not in entry and "msecs" not in entry
+
+def test_sampling_filter(monkeypatch):
+    sampling = SamplingFilter({"app.middleware": 0.25, "app.middleware.timing": 0})
+    before = LOG_RECORDS_SAMPLED_OUT.labels("app.middleware.timing")._value.get()
+    monkeypatch.setattr("random.random", lambda: 0.1)
+    assert sampling.filter(_record(name="app.other"))
+    kept = _record(name="app.middleware.query_count")
+    assert sampling.filter(kept) and kept.sample_rate == 0.25
+    assert not sampling.filter(_record(name="app.middleware.timing"))
+    assert sampling.filter(_record(name="app.middleware.timing", level=logging.WARNING))
+    assert LOG_RECORDS_SAMPLED_OUT.labels("app.middleware.timing")._value.get() == before + 1
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    before = LOG_RECORDS_DROPPED.labels("INFO")._value.get()
+    handler.handle(_record())
+    handler.handle(_record())
+    assert handler.queue.qsize() == 1
+    assert LOG_RECORDS_DROPPED.labels("INFO")._value.get() == before + 1
+
+def test_records_are_written_by_listener_thread(root_stream):
+    writers = set()
+    original_emit = logging.StreamHandler.emit
+
+    def emit(self, record):
+        writers.add(threading.current_thread().name)
+        original_emit(self, record)
+
+    install_log_queue(queue_size=100)
+    arguments = ["mutable"]
+    logging.StreamHandler.emit = emit
+    try:
+        with request_scope({"method": "GET", "route": type("Route", (), {"path": "/users/{user_id}"})()}):
+            logging.getLogger("app.services.user_service").info("User %s updated", arguments)
+        arguments.append("changed later")
+        stop_log_queue()
+    finally:
+        logging.StreamHandler.emit = original_emit
+
+    assert threading.current_thread().name not in writers
+    entry = json.loads(root_stream.getvalue())
+    assert entry["message"] == "User ['mutable'] updated"
+    assert entry["route"] == "GET /users/{user_id}"
+    assert isinstance(logging.getLogger().handlers[0], logging.StreamHandler)
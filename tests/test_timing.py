@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from unittest.mock import Mock
+from urllib.parse import urlencode
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.dependencies import get_db
+from app.main import app
+from app.middleware.timing import ServerTimingMiddleware
+from app.utils import timing
+from app.utils.timing import current_timings, install_sql_timing, request_timings, span, timed, uninstall_sql_timing
+
+
+@pytest.fixture
+def sql_timing():
+    install_sql_timing()
+    yield
+    uninstall_sql_timing()
+
+def metrics(header):
+    return {part.split(";")[0].strip() for part in header.split(",")}
+
+def test_spans_are_ignored_outside_a_request():
+    with span("db"):
+        pass
+    assert current_timings() is None
+
+def test_spans_accumulate_per_name():
+    @timed("jwt")
+    def sign():
+        return "token"
+
+    @timed("db")
+    async def query():
+        await asyncio.sleep(0)
+        return 1
+
+    with request_timings() as timings:
+        assert sign() == "token"
+        sign()
+        assert asyncio.run(query()) == 1
+        with span("render"):
+            pass
+    assert current_timings() is None
+    assert timings.spans["jwt"][1] == 2
+    assert timings.spans["db"][1] == 1
+    assert metrics(timings.header()) == {"jwt", "db", "render", "total"}
+    assert 'jwt;dur=' in timings.header() and 'desc="2x"' in timings.header()
+
+def test_disabled_timing_calls_through(monkeypatch):
+    calls = []
+
+    @timed("db")
+    def plain(value):
+        calls.append(value)
+        return value
+
+    @timed("db")
+    async def coroutine(value):
+        return value
+
+    # Without a timed request the wrappers call straight through and never read the clock.
+    monkeypatch.setattr(timing, "time", Mock(perf_counter=Mock(side_effect=AssertionError("clock read"))))
+    assert plain(1) == 1 and asyncio.run(coroutine(2)) == 2
+    with span("render"):
+        pass
+    assert calls == [1] and current_timings() is None
+
+@pytest.mark.asyncio
+async def test_server_timing_header_on_login(db_session, verified_user, caplog, sql_timing):
+    app.dependency_overrides[get_db] = lambda: db_session
+    try:
+        async with AsyncClient(app=ServerTimingMiddleware(app), base_url="http://testserver") as client:
+            with caplog.at_level(logging.INFO, logger="app.middleware.timing"):
+                response = await client.post(
+                    "/login/", data=urlencode({"username": verified_user.email, "password": "MySuperPassword$1234"}),
+                    headers={"Content-Type": "application/x-www-form-urlencoded"},
+                )
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert {"db", "bcrypt", "jwt", "total"} <= metrics(response.headers["server-timing"])
+    assert '"POST /login/" 200 server-timing: db;dur=' in caplog.text
+
+def test_sql_timing_can_be_removed(sql_timing):
+    assert event.contains(Engine, "before_cursor_execute", timing._before_cursor_execute)
+    uninstall_sql_timing()
+    assert not event.contains(Engine, "before_cursor_execute", timing._before_cursor_execute)
+    assert not event.contains(Engine, "after_cursor_execute", timing._after_cursor_execute)
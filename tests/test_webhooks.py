@@ -0,0 +1,201 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.models.webhook_model import DeliveryStatus, OutboxEvent, UserEvent, WebhookDelivery
+from app.services.user_service import UserService
+from app.services.webhook_service import WebhookService
+from app.utils.webhook_dispatcher import SIGNATURE_HEADER, TIMESTAMP_HEADER, WebhookDispatcher, sign_payload
+from settings.config import settings
+
+
+class Receiver:
+    """A local HTTP endpoint recording the batches it is sent and answering with the queued statuses."""
+
+    def __init__(self):
+        self.requests = []
+        self.statuses = []
+        self.delay = 0.0
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                receiver.requests.append((dict(self.headers), body))
+                time.sleep(receiver.delay)
+                self.send_response(receiver.statuses.pop(0) if receiver.statuses else 200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hooks"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def batches(self):
+        return [json.loads(body) for _, body in self.requests]
+
+    def event_types(self):
+        return [[event["type"] for event in batch["events"]] for batch in self.batches()]
+
+
+@pytest.fixture
+def receiver():
+    receiver = Receiver()
+    yield receiver
+    receiver.server.shutdown()
+    receiver.server.server_close()
+
+@pytest.fixture
+async def dispatcher():
+    dispatcher = WebhookDispatcher(poll_interval=0.05, backoff=60)
+    yield dispatcher
+    await dispatcher.stop()
+
+async def dispatch(dispatcher):
+    """Send whatever can be sent now and wait for the outcome of the batches."""
+    claimed = await dispatcher.run_once()
+    while dispatcher._tasks:
+        await asyncio.wait(list(dispatcher._tasks))
+    return claimed
+
+async def deliveries(db_session):
+    return (await db_session.scalars(
+        select(WebhookDelivery).order_by(WebhookDelivery.id).execution_options(populate_existing=True))).all()
+
+async def make_due(db_session):
+    await db_session.execute(update(WebhookDelivery).values(next_attempt_at=func.now()))
+    await db_session.commit()
+
+async def test_user_changes_are_delivered_signed_and_in_order(db_session, email_service, receiver, dispatcher):
+    endpoint = await WebhookService.create_endpoint(db_session, receiver.url)
+    deletions = await WebhookService.create_endpoint(db_session, receiver.url, [UserEvent.DELETED])
+    user = await UserService.create(db_session, {"email": "hooked@example.com", "password": "AValid$Pass123",
+                                                 "role": "AUTHENTICATED"}, email_service)
+    await UserService.update(db_session, user.id, {"first_name": "Hook"})
+    assert await UserService.delete(db_session, user.id)
+
+    assert await dispatch(dispatcher) == 2
+    batches = {request[0]["Webhook-Id"]: request for request in receiver.requests}
+    by_endpoint = {}
+    for delivery in await deliveries(db_session):
+        assert delivery.status is DeliveryStatus.DELIVERED and delivery.attempts == 1
+        by_endpoint.setdefault(delivery.endpoint_id, set()).add(str(delivery.batch_id))
+    assert all(len(batch_ids) == 1 for batch_ids in by_endpoint.values())
+
+    headers, body = batches[by_endpoint[endpoint.id].pop()]
+    assert headers[SIGNATURE_HEADER] == sign_payload(endpoint.secret, headers[TIMESTAMP_HEADER], body)
+    events = json.loads(body)["events"]
+    assert [event["type"] for event in events] == ["user.created", "user.updated", "user.deleted"]
+    assert [event["id"] for event in events] == sorted(event["id"] for event in events)
+    assert {event["user_id"] for event in events} == {str(user.id)}
+    assert events[1]["data"]["first_name"] == "Hook" and events[0]["data"]["email"] == "hooked@example.com"
+    assert "hashed_password" not in events[0]["data"]
+
+    headers, body = batches[by_endpoint[deletions.id].pop()]
+    assert headers[SIGNATURE_HEADER] == sign_payload(deletions.secret, headers[TIMESTAMP_HEADER], body)
+    assert [event["type"] for event in json.loads(body)["events"]] == ["user.deleted"]
+    assert await dispatch(dispatcher) == 0
+
+async def test_rolled_back_change_sends_nothing(db_session, user, receiver):
+    await WebhookService.create_endpoint(db_session, receiver.url)
+    user.first_name = "Never"
+    await WebhookService.record(db_session, UserEvent.UPDATED, user)
+    await db_session.rollback()
+    assert await db_session.scalar(select(func.count()).select_from(OutboxEvent)) == 0
+
+async def test_failed_batch_is_retried_without_reordering_the_user(db_session, user, verified_user, receiver, dispatcher):
+    await WebhookService.create_endpoint(db_session, receiver.url)
+    await WebhookService.record(db_session, UserEvent.UPDATED, user)
+    await db_session.commit()
+    receiver.statuses = [503]
+    assert await dispatch(dispatcher) == 1
+    first = (await deliveries(db_session))[0]
+    assert first.status is DeliveryStatus.PENDING and first.attempts == 1 and first.last_error.startswith("HTTP 503")
+
+    # While the first event waits for its retry, the user's next event is held back; other users' are not.
+    await WebhookService.record(db_session, UserEvent.LOCKED, user)
+    await WebhookService.record(db_session, UserEvent.UPDATED, verified_user)
+    await db_session.commit()
+    assert await dispatch(dispatcher) == 1
+    assert receiver.batches()[-1]["events"][0]["user_id"] == str(verified_user.id)
+
+    await make_due(db_session)
+    assert await dispatch(dispatcher) == 1
+    assert receiver.event_types()[-1] == ["user.updated", "user.locked"]
+    assert all(delivery.status is DeliveryStatus.DELIVERED for delivery in await deliveries(db_session))
+
+async def test_delivery_fails_for_good_after_max_attempts(db_session, user, receiver, dispatcher):
+    dispatcher.max_attempts = 2
+    await WebhookService.create_endpoint(db_session, f"http://127.0.0.1:{receiver.server.server_address[1] + 1}/closed")
+    await WebhookService.record(db_session, UserEvent.UPDATED, user)
+    await db_session.commit()
+    await dispatch(dispatcher)
+    await make_due(db_session)
+    await dispatch(dispatcher)
+    delivery = (await deliveries(db_session))[0]
+    assert delivery.status is DeliveryStatus.FAILED and delivery.attempts == 2
+    assert delivery.last_error.startswith("ConnectError")
+
+async def test_endpoint_concurrency_is_limited(db_session, user, verified_user, receiver, dispatcher):
+    receiver.delay = 0.3
+    await WebhookService.create_endpoint(db_session, receiver.url, max_concurrency=2)
+    for each in (user, verified_user, user):
+        await WebhookService.record(db_session, UserEvent.UPDATED, each)
+    await db_session.commit()
+    dispatcher.batch_size = 1
+    # A second worker finds no free slot while the first one sends both batches it may.
+    assert await dispatcher.run_once() == 2
+    assert await WebhookDispatcher(batch_size=1).run_once() == 0
+    await dispatch(dispatcher)
+    # The user's second event waited for the first, so it is sent now.
+    assert await dispatch(dispatcher) == 1
+    assert len(receiver.requests) == 3
+
+async def test_lockout_and_email_verification_are_recorded(db_session, verified_user, unverified_user):
+    for _ in range(settings.max_login_attempts):
+        assert await UserService.login_user(db_session, verified_user.email, "Wrong$Password1") is None
+    unverified_user.verification_token = "event-token"
+    await db_session.commit()
+    assert await UserService.verify_email_with_token(db_session, unverified_user.id, "event-token")
+
+    events = (await db_session.execute(select(OutboxEvent.type, OutboxEvent.user_id, OutboxEvent.payload)
+                                       .order_by(OutboxEvent.id))).all()
+    assert [(event.type, event.user_id) for event in events] == [
+        (UserEvent.LOCKED.value, verified_user.id), (UserEvent.EMAIL_VERIFIED.value, unverified_user.id),
+    ]
+    assert events[0].payload["is_locked"] is True
+    assert events[1].payload["email_verified"] is True and events[1].payload["role"] == "AUTHENTICATED"
+
+async def test_admin_webhook_endpoints(async_client, db_session, admin_token, user_token, user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.post("/admin/webhooks", json={"url": "https://crm.example.com/hooks",
+                                                                "events": ["user.created"]}, headers=headers)
+    assert response.status_code == 201
+    created = response.json()
+    assert created["events"] == ["user.created"] and created["max_concurrency"] == 1 and len(created["secret"]) >= 32
+
+    await WebhookService.record(db_session, UserEvent.CREATED, user)
+    await db_session.commit()
+    await db_session.execute(update(WebhookDelivery).values(status=DeliveryStatus.FAILED))
+    await db_session.commit()
+    listed = (await async_client.get("/admin/webhooks", headers=headers)).json()
+    assert [(item["id"], item["pending"], item["failed"]) for item in listed] == [(created["id"], 0, 1)]
+    assert "secret" not in listed[0]
+
+    response = await async_client.post(f"/admin/webhooks/{created['id']}/retry", headers=headers)
+    assert response.json() == {"retried": 1}
+    assert (await deliveries(db_session))[0].status is DeliveryStatus.PENDING
+
+    assert (await async_client.post("/admin/webhooks", json={"url": "not a url"}, headers=headers)).status_code == 422
+    assert (await async_client.get("/admin/webhooks", headers={"Authorization": f"Bearer {user_token}"})).status_code == 403
+    assert (await async_client.delete(f"/admin/webhooks/{created['id']}", headers=headers)).status_code == 204
+    assert (await async_client.delete(f"/admin/webhooks/{created['id']}", headers=headers)).status_code == 404
+    assert await db_session.scalar(select(func.count()).select_from(WebhookDelivery)) == 0